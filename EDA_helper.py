@@ -1,3 +1,5 @@
+import csv
+
 from database.models import (
     Usuario, Categoria, Producto, Orden, DetalleOrden,
     DireccionEnvio, 
@@ -5,7 +7,8 @@ from database.models import (
     MetodoPago, OrdenMetodoPago,
     ResenaProducto, HistorialPago
 )
-from sqlalchemy import select, func
+from database.models import Base
+from sqlalchemy import select, func, exists, literal, union_all
 
 
 def find_invalid_user_references(session):
@@ -49,9 +52,120 @@ def find_invalid_product_references(session):
  
 
 
-def check_duplicates(session, tables):
-    for table in tables:
-        result_distinct = session.execute(select(table).distinct()).all()
-        result = session.execute(select(table)).all()
-        print("Quantity of repeated values in table", table.__name__, ":", len(result) - len(result_distinct))
+def foreign_key_relationships(metadata=Base.metadata):
+    """Devuelve (nombre, columna hija, columna padre) por cada FK declarada en los modelos."""
+    relaciones = []
+    for table in metadata.sorted_tables:
+        for fk in sorted(table.foreign_keys, key=lambda fk: fk.parent.name):
+            nombre = f"{table.name}.{fk.parent.name} -> {fk.column.table.name}"
+            relaciones.append((nombre, fk.parent, fk.column))
+    return relaciones
+
+
+def orphan_rows(hija, padre):
+    """Filas de la tabla hija cuya FK no existe en la tabla padre (anti-join con NOT EXISTS)."""
+    return select(hija.table).where(hija.is_not(None), ~exists().where(padre == hija))
+
+
+def referential_integrity_query(sample_size=10):
+    """
+    Una sola consulta con todas las FKs de los modelos (UNION ALL de
+    anti-joins): por relación, a lo sumo sample_size ids inexistentes y el
+    total de huérfanos en cada fila.
+    """
+    consultas = []
+    for nombre, hija, padre in foreign_key_relationships():
+        huerfanos = (
+            orphan_rows(hija, padre)
+            .with_only_columns(
+                literal(nombre).label("relacion"),
+                hija.label("id_invalido"),
+                func.count().over().label("huerfanos"),  # se calcula antes del LIMIT
+            )
+            .limit(max(sample_size, 1))
+            .subquery()
+        )
+        consultas.append(select(huerfanos))
+    return union_all(*consultas)
+
+
+def scan_referential_integrity(session, sample_size=10):
+    """
+    Revisa todas las FKs de los modelos en una sola consulta (ver
+    referential_integrity_query). Devuelve, por relación, la cantidad de
+    filas huérfanas y una muestra de a lo sumo sample_size ids inexistentes.
+    """
+    resultados = {nombre: {"orphans": 0, "sample": []} for nombre, _, _ in foreign_key_relationships()}
+    for relacion, id_invalido, huerfanos in session.execute(referential_integrity_query(sample_size)):
+        resultados[relacion]["orphans"] = huerfanos
+        if len(resultados[relacion]["sample"]) < sample_size:
+            resultados[relacion]["sample"].append(id_invalido)
+    return resultados
 
+
+def export_orphans(session, path, chunk_size=10_000):
+    """
+    Escribe en un CSV todas las filas huérfanas (relación, primary key de la
+    fila, id inexistente), leyendo el resultado por partes para no cargarlo
+    entero en memoria. Devuelve la cantidad de filas escritas.
+    """
+    escritas = 0
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["relacion", "id_fila", "id_invalido"])
+        for nombre, hija, padre in foreign_key_relationships():
+            stmt = orphan_rows(hija, padre).with_only_columns(*hija.table.primary_key.columns, hija)
+            for partition in session.execute(stmt.execution_options(yield_per=chunk_size)).partitions():
+                writer.writerows((nombre, *fila) for fila in partition)
+                escritas += len(partition)
+    return escritas
+
+
+def duplicate_groups(table, columns=None):
+    """
+    Grupos de filas repetidas sobre las columnas indicadas, con su cantidad
+    de repeticiones. Por defecto usa todas las columnas menos la primary key,
+    que al ser autoincremental hace única a cada fila.
+    """
+    if columns is None:
+        columns = [c for c in table.__table__.columns if not c.primary_key]
+    columns = [table.__table__.c[c] if isinstance(c, str) else c for c in columns]
+    return (
+        select(*columns, func.count().label("repeticiones"))
+        .group_by(*columns)
+        .having(func.count() > 1)
+        .subquery()
+    )
+
+
+def find_duplicates(session, table, columns=None, sample_size=10):
+    """
+    Busca filas duplicadas sobre las columnas indicadas (ver duplicate_groups),
+    todo dentro de la base. Devuelve la cantidad de grupos repetidos, la
+    cantidad de filas sobrantes (las que exceden la primera de cada grupo) y
+    una muestra de a lo sumo sample_size claves repetidas.
+    """
+    grupos = duplicate_groups(table, columns)
+    cantidad_grupos, filas_sobrantes = session.execute(
+        select(func.count(), func.coalesce(func.sum(grupos.c.repeticiones - 1), 0))
+    ).one()
+    muestra = session.execute(
+        select(grupos).order_by(grupos.c.repeticiones.desc()).limit(sample_size)
+    ).all()
+    return {
+        "duplicate_groups": cantidad_grupos,
+        "duplicate_rows": int(filas_sobrantes),
+        "sample": [tuple(fila) for fila in muestra],
+    }
+
+
+def check_duplicates(session, tables, keys=None):
+    """
+    Imprime la cantidad de filas repetidas de cada tabla.
+    keys permite indicar, por modelo, las columnas que forman la clave natural
+    (por ejemplo {DetalleOrden: [DetalleOrden.orden_id, DetalleOrden.producto_id]}).
+    """
+    keys = keys or {}
+    for table in tables:
+        result = find_duplicates(session, table, keys.get(table))
+        print("Quantity of repeated values in table", table.__name__, ":", result["duplicate_rows"])
@@ -0,0 +1,5 @@
+-- Versión de datos de una tabla según load_manifest: los loaders la suben con cada recarga,
+-- carga reanudada o merge que cambia filas. NULL si la tabla no se cargó con los loaders.
+{% macro data_version(table_name) %}
+    (SELECT MAX(data_version) FROM load_manifest WHERE table_name = '{{ table_name }}')
+{% endmacro %}
@@ -1,15 +1,72 @@
-SELECT 
+{{
+    config(
+        materialized='incremental',
+        unique_key='usuario_id',
+        indexes=[{'columns': ['usuario_id'], 'unique': True}],
+        pre_hook="{% if is_incremental() %}DELETE FROM {{ this }}
+                  WHERE version_ordenes IS DISTINCT FROM {{ data_version('ordenes') }}
+                     OR version_usuarios IS DISTINCT FROM {{ data_version('usuarios') }}{% endif %}"
+    )
+}}
+
+-- Guarda la suma y la cantidad de órdenes de cada usuario en lugar del promedio,
+-- así las órdenes nuevas se suman sin releer las anteriores y el promedio sigue siendo exacto.
+-- La marca de agua es el mayor orden_id procesado: los ids solo crecen, las fechas pueden llegar atrasadas.
+-- Las órdenes ya procesadas pueden cambiar (recarga de ordenes, merge de usuarios): cada fila guarda la
+-- data_version de load_manifest con la que se calculó y el pre_hook borra el mart si alguna cambió,
+-- así esa corrida vuelve a sumar todas las órdenes. Las filas insertadas fuera de los loaders no suben
+-- la versión, solo se suman por la marca de agua.
+-- El ORDER BY final solo ordena las construcciones completas, las filas de una corrida incremental se agregan al final.
+
+WITH nuevas_ordenes AS (
+    SELECT
+        usuario_id,
+        SUM(total) AS suma_total,
+        COUNT(total) AS cantidad_ordenes,
+        MAX(orden_id) AS ultima_orden_id,
+        MAX(fecha_orden) AS ultima_fecha_orden
+    FROM
+        {{ref ('stg_ordenes')}}
+    {% if is_incremental() %}
+    WHERE
+        orden_id > (SELECT COALESCE(MAX(ultima_orden_id), 0) FROM {{ this }})
+    {% endif %}
+    GROUP BY
+        usuario_id
+),
+
+acumulado AS (
+    SELECT
+        n.usuario_id,
+        n.suma_total{% if is_incremental() %} + COALESCE(a.suma_total, 0){% endif %} AS suma_total,
+        n.cantidad_ordenes{% if is_incremental() %} + COALESCE(a.cantidad_ordenes, 0){% endif %} AS cantidad_ordenes,
+        n.ultima_orden_id,
+        {% if is_incremental() %}GREATEST(n.ultima_fecha_orden, a.ultima_fecha_orden){% else %}n.ultima_fecha_orden{% endif %} AS ultima_fecha_orden
+    FROM
+        nuevas_ordenes n
+    {% if is_incremental() %}
+    LEFT JOIN
+        {{ this }} a
+        ON a.usuario_id = n.usuario_id
+    {% endif %}
+)
+
+SELECT
     u.usuario_id,
     u.nombre,
     u.apellido,
-    ROUND(SUM(o.total), 2) AS total_acumulado,
-    ROUND(AVG(o.total), 2) AS promedio_total
-FROM 
+    ROUND(c.suma_total, 2) AS total_acumulado,
+    ROUND(c.suma_total / NULLIF(c.cantidad_ordenes, 0), 2) AS promedio_total,
+    c.suma_total,
+    c.cantidad_ordenes,
+    c.ultima_orden_id,
+    c.ultima_fecha_orden,
+    {{ data_version('ordenes') }} AS version_ordenes,
+    {{ data_version('usuarios') }} AS version_usuarios
+FROM
     {{ref ('stg_usuarios')}} u
-INNER JOIN 
-        {{ref ('stg_ordenes')}} o 
-        ON u.usuario_id = o.usuario_id
-GROUP BY 
-    u.usuario_id, u.nombre, u.apellido
-ORDER BY 
-    total_acumulado DESC
\ No newline at end of file
+INNER JOIN
+    acumulado c
+    ON u.usuario_id = c.usuario_id
+ORDER BY
+    total_acumulado DESC
@@ -0,0 +1,36 @@
+-- Cada línea de orden con el producto y el usuario tal como eran en la fecha de la orden.
+-- La versión vigente es la primera que termina después de fecha_orden: con el índice
+-- (clave, dbt_valid_to) de los snapshots es una búsqueda por rango por línea, sin recorrer el historial.
+-- Las órdenes anteriores al primer snapshot toman la versión más antigua.
+
+SELECT
+    d.detalle_id,
+    d.orden_id,
+    o.fecha_orden,
+    o.usuario_id,
+    u.email AS usuario_email,
+    d.producto_id,
+    p.nombre AS producto_nombre,
+    p.categoria_id,
+    d.cantidad,
+    d.precio_unitario,
+    p.precio AS precio_lista
+FROM
+    {{ref ('stg_detalle_ordenes')}} d
+INNER JOIN
+    {{ref ('stg_ordenes')}} o
+    ON o.orden_id = d.orden_id
+LEFT JOIN LATERAL (
+    SELECT s.nombre, s.categoria_id, s.precio
+    FROM {{ref ('snap_productos')}} s
+    WHERE s.producto_id = d.producto_id AND s.dbt_valid_to > o.fecha_orden
+    ORDER BY s.dbt_valid_to
+    LIMIT 1
+) p ON TRUE
+LEFT JOIN LATERAL (
+    SELECT s.email
+    FROM {{ref ('snap_usuarios')}} s
+    WHERE s.usuario_id = o.usuario_id AND s.dbt_valid_to > o.fecha_orden
+    ORDER BY s.dbt_valid_to
+    LIMIT 1
+) u ON TRUE
@@ -0,0 +1,58 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='detalle_id',
+        indexes=[{'columns': ['detalle_id'], 'unique': True}, {'columns': ['orden_id']}]
+    )
+}}
+
+-- Tabla de hechos desnormalizada: una fila por línea de orden con las claves de fecha, usuario,
+-- producto, categoría y método de pago ya resueltas, para no repetir los joins en cada gráfico.
+-- El método de pago de la orden es el de su pago más grande (una orden puede tener varios pagos).
+-- Igual que agg_user_expenses, la marca de agua es el mayor orden_id cargado: después de recargar
+-- o hacer merge de ordenes o detalle_ordenes correr dbt run --full-refresh -s fact_ventas+.
+
+WITH nuevas_lineas AS (
+    SELECT
+        d.detalle_id,
+        d.orden_id,
+        o.fecha_orden,
+        o.usuario_id,
+        d.producto_id,
+        d.cantidad,
+        d.precio_unitario
+    FROM
+        {{ref ('stg_detalle_ordenes')}} d
+    INNER JOIN
+        {{ref ('stg_ordenes')}} o
+        ON o.orden_id = d.orden_id
+    {% if is_incremental() %}
+    WHERE
+        d.orden_id > (SELECT COALESCE(MAX(orden_id), 0) FROM {{ this }})
+    {% endif %}
+)
+
+SELECT
+    l.detalle_id,
+    l.orden_id,
+    CAST(l.fecha_orden AS DATE) AS fecha,
+    l.fecha_orden,
+    l.usuario_id,
+    l.producto_id,
+    p.categoria_id,
+    pago.metodo_pago_id,
+    l.cantidad,
+    l.precio_unitario,
+    l.cantidad * l.precio_unitario AS importe
+FROM
+    nuevas_lineas l
+LEFT JOIN
+    {{ref ('stg_productos')}} p
+    ON p.producto_id = l.producto_id
+LEFT JOIN LATERAL (
+    SELECT m.metodo_pago_id
+    FROM {{ref ('stg_ordenes_metodos_pago')}} m
+    WHERE m.orden_id = l.orden_id
+    ORDER BY m.monto_pagado DESC, m.orden_metodo_id
+    LIMIT 1
+) pago ON TRUE
@@ -0,0 +1,123 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['fecha', 'metodo_pago_id'],
+        indexes=[{'columns': ['fecha', 'metodo_pago_id'], 'unique': True}]
+    )
+}}
+
+-- Rollup diario por método de pago: cantidad y total de las órdenes, unidades e importe de sus líneas.
+-- Los gráficos por día de la semana o por método de pago suman estas filas (unos miles) en lugar de
+-- recorrer las órdenes. Las órdenes se cuentan desde ordenes, no desde fact_ventas, porque hay
+-- órdenes sin líneas, y van al método de su mayor pago; metodo_pago_id 0 son las órdenes sin pago.
+-- cantidad_pagos cuenta en cambio cada par orden/método de ordenes_metodos_pago, como el gráfico de
+-- métodos de pago: una orden pagada con dos métodos suma en los dos.
+-- Se acumula como agg_user_expenses, con el mayor orden_id procesado como marca de agua.
+
+WITH nuevas_ordenes AS (
+    SELECT
+        o.orden_id,
+        CAST(o.fecha_orden AS DATE) AS fecha,
+        COALESCE(pago.metodo_pago_id, 0) AS metodo_pago_id,
+        o.total
+    FROM
+        {{ref ('stg_ordenes')}} o
+    LEFT JOIN LATERAL (
+        SELECT m.metodo_pago_id
+        FROM {{ref ('stg_ordenes_metodos_pago')}} m
+        WHERE m.orden_id = o.orden_id
+        ORDER BY m.monto_pagado DESC, m.orden_metodo_id
+        LIMIT 1
+    ) pago ON TRUE
+    {% if is_incremental() %}
+    WHERE
+        o.orden_id > (SELECT COALESCE(MAX(ultima_orden_id), 0) FROM {{ this }})
+    {% endif %}
+),
+
+lineas AS (
+    SELECT
+        orden_id,
+        SUM(cantidad) AS unidades,
+        SUM(importe) AS importe_lineas
+    FROM
+        {{ref ('fact_ventas')}}
+    {% if is_incremental() %}
+    WHERE
+        orden_id > (SELECT COALESCE(MAX(ultima_orden_id), 0) FROM {{ this }})
+    {% endif %}
+    GROUP BY
+        orden_id
+),
+
+nuevos_pagos AS (
+    SELECT
+        n.fecha,
+        m.metodo_pago_id,
+        COUNT(*) AS cantidad_pagos,
+        MAX(n.orden_id) AS ultima_orden_id
+    FROM
+        nuevas_ordenes n
+    INNER JOIN
+        {{ref ('stg_ordenes_metodos_pago')}} m
+        ON m.orden_id = n.orden_id
+    GROUP BY
+        n.fecha,
+        m.metodo_pago_id
+),
+
+ordenes_por_dia AS (
+    SELECT
+        n.fecha,
+        n.metodo_pago_id,
+        COUNT(*) AS cantidad_ordenes,
+        SUM(n.total) AS total_ordenes,
+        COALESCE(SUM(l.unidades), 0) AS unidades,
+        COALESCE(SUM(l.importe_lineas), 0) AS importe_lineas,
+        MAX(n.orden_id) AS ultima_orden_id
+    FROM
+        nuevas_ordenes n
+    LEFT JOIN
+        lineas l
+        ON l.orden_id = n.orden_id
+    GROUP BY
+        n.fecha,
+        n.metodo_pago_id
+),
+
+nuevas AS (
+    SELECT
+        COALESCE(o.fecha, p.fecha) AS fecha,
+        COALESCE(o.metodo_pago_id, p.metodo_pago_id) AS metodo_pago_id,
+        COALESCE(o.cantidad_ordenes, 0) AS cantidad_ordenes,
+        COALESCE(o.total_ordenes, 0) AS total_ordenes,
+        COALESCE(o.unidades, 0) AS unidades,
+        COALESCE(o.importe_lineas, 0) AS importe_lineas,
+        COALESCE(p.cantidad_pagos, 0) AS cantidad_pagos,
+        GREATEST(o.ultima_orden_id, p.ultima_orden_id) AS ultima_orden_id
+    FROM
+        ordenes_por_dia o
+    FULL OUTER JOIN
+        nuevos_pagos p
+        ON p.fecha = o.fecha
+        AND p.metodo_pago_id = o.metodo_pago_id
+)
+
+SELECT
+    n.fecha,
+    CAST(EXTRACT(DOW FROM n.fecha) AS INTEGER) AS dia_semana,
+    n.metodo_pago_id,
+    n.cantidad_ordenes{% if is_incremental() %} + COALESCE(a.cantidad_ordenes, 0){% endif %} AS cantidad_ordenes,
+    n.total_ordenes{% if is_incremental() %} + COALESCE(a.total_ordenes, 0){% endif %} AS total_ordenes,
+    n.unidades{% if is_incremental() %} + COALESCE(a.unidades, 0){% endif %} AS unidades,
+    n.importe_lineas{% if is_incremental() %} + COALESCE(a.importe_lineas, 0){% endif %} AS importe_lineas,
+    n.cantidad_pagos{% if is_incremental() %} + COALESCE(a.cantidad_pagos, 0){% endif %} AS cantidad_pagos,
+    n.ultima_orden_id
+FROM
+    nuevas n
+{% if is_incremental() %}
+LEFT JOIN
+    {{ this }} a
+    ON a.fecha = n.fecha
+    AND a.metodo_pago_id = n.metodo_pago_id
+{% endif %}
@@ -0,0 +1,28 @@
+{{
+    config(
+        materialized='table'
+    )
+}}
+
+-- Rollup mensual por método de pago, se rehace en cada corrida a partir de ventas_diarias
+-- (a lo sumo 366 filas por método por año), sin volver a leer las órdenes.
+
+SELECT
+    CAST(DATE_TRUNC('month', d.fecha) AS DATE) AS mes,
+    d.metodo_pago_id,
+    COALESCE(m.nombre, 'Sin pago') AS metodo_pago,
+    SUM(d.cantidad_ordenes) AS cantidad_ordenes,
+    SUM(d.total_ordenes) AS total_ordenes,
+    ROUND(SUM(d.total_ordenes) / NULLIF(SUM(d.cantidad_ordenes), 0), 2) AS promedio_orden,
+    SUM(d.unidades) AS unidades,
+    SUM(d.importe_lineas) AS importe_lineas,
+    SUM(d.cantidad_pagos) AS cantidad_pagos
+FROM
+    {{ref ('ventas_diarias')}} d
+LEFT JOIN
+    {{ref ('stg_metodos_pago')}} m
+    ON m.metodo_pago_id = d.metodo_pago_id
+GROUP BY
+    CAST(DATE_TRUNC('month', d.fecha) AS DATE),
+    d.metodo_pago_id,
+    COALESCE(m.nombre, 'Sin pago')
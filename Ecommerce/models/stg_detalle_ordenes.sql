@@ -0,0 +1,8 @@
+SELECT 
+    detalle_id, 
+    orden_id, 
+    producto_id, 
+    cantidad, 
+    precio_unitario
+FROM 
+    detalle_ordenes
@@ -0,0 +1,6 @@
+SELECT 
+    metodo_pago_id, 
+    nombre, 
+    descripcion
+FROM 
+    metodos_pago
\ No newline at end of file
@@ -0,0 +1,7 @@
+SELECT 
+    orden_metodo_id, 
+    orden_id, 
+    metodo_pago_id, 
+    monto_pagado
+FROM 
+    ordenes_metodos_pago
\ No newline at end of file
@@ -0,0 +1,30 @@
+{% snapshot snap_productos %}
+
+{{
+    config(
+        unique_key='producto_id',
+        strategy='check',
+        check_cols=['row_hash'],
+        hard_deletes='invalidate',
+        dbt_valid_to_current="'9999-12-31'::timestamp",
+        post_hook="CREATE INDEX IF NOT EXISTS snap_productos_vigencia ON {{ this }} (producto_id, dbt_valid_to)"
+    )
+}}
+
+-- Historial SCD2 de productos: cada cambio de precio, stock o categoría abre una versión nueva.
+-- dbt compara solo row_hash con la versión vigente en lugar de cada columna, cierra las versiones
+-- que cambiaron (dbt_valid_to) e inserta las nuevas con un MERGE por corrida.
+-- La versión vigente termina en 9999-12-31 en lugar de NULL, así la vigencia se busca por índice.
+
+SELECT
+    producto_id,
+    nombre,
+    descripcion,
+    precio,
+    stock,
+    categoria_id,
+    MD5(CAST(ROW(nombre, descripcion, precio, stock, categoria_id) AS TEXT)) AS row_hash
+FROM
+    {{ref ('stg_productos')}}
+
+{% endsnapshot %}
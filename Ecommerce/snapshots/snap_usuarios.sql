@@ -0,0 +1,27 @@
+{% snapshot snap_usuarios %}
+
+{{
+    config(
+        unique_key='usuario_id',
+        strategy='check',
+        check_cols=['row_hash'],
+        hard_deletes='invalidate',
+        dbt_valid_to_current="'9999-12-31'::timestamp",
+        post_hook="CREATE INDEX IF NOT EXISTS snap_usuarios_vigencia ON {{ this }} (usuario_id, dbt_valid_to)"
+    )
+}}
+
+-- Historial SCD2 de usuarios, igual que snap_productos. La contraseña no se guarda en el historial.
+
+SELECT
+    usuario_id,
+    nombre,
+    apellido,
+    dni,
+    email,
+    fecha_registro,
+    MD5(CAST(ROW(nombre, apellido, dni, email) AS TEXT)) AS row_hash
+FROM
+    {{ref ('stg_usuarios')}}
+
+{% endsnapshot %}
@@ -0,0 +1,31 @@
+-- Falla si agg_user_expenses no cuenta exactamente las órdenes hasta su marca de agua,
+-- por ejemplo después de recargar ordenes sin correr dbt run --full-refresh.
+WITH mart AS (
+    SELECT
+        COALESCE(SUM(cantidad_ordenes), 0) AS cantidad_ordenes,
+        COALESCE(SUM(suma_total), 0) AS suma_total,
+        COALESCE(MAX(ultima_orden_id), 0) AS ultima_orden_id
+    FROM
+        {{ref ('agg_user_expenses')}}
+),
+
+fuente AS (
+    SELECT
+        COUNT(o.total) AS cantidad_ordenes,
+        COALESCE(SUM(o.total), 0) AS suma_total
+    FROM
+        {{ref ('stg_ordenes')}} o
+    INNER JOIN
+        {{ref ('stg_usuarios')}} u
+        ON u.usuario_id = o.usuario_id
+    WHERE
+        o.orden_id <= (SELECT ultima_orden_id FROM mart)
+)
+
+SELECT
+    *
+FROM
+    mart, fuente
+WHERE
+    mart.cantidad_ordenes <> fuente.cantidad_ordenes
+    OR mart.suma_total <> fuente.suma_total
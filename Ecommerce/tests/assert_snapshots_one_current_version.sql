@@ -0,0 +1,20 @@
+-- Falla si algún producto o usuario tiene más de una versión vigente o versiones que se superponen.
+WITH versiones AS (
+    SELECT 'productos' AS snapshot, producto_id AS id, dbt_valid_from, dbt_valid_to
+    FROM {{ref ('snap_productos')}}
+    UNION ALL
+    SELECT 'usuarios', usuario_id, dbt_valid_from, dbt_valid_to
+    FROM {{ref ('snap_usuarios')}}
+)
+
+SELECT
+    a.snapshot,
+    a.id
+FROM
+    versiones a
+INNER JOIN
+    versiones b
+    ON a.snapshot = b.snapshot
+    AND a.id = b.id
+    AND a.dbt_valid_from < b.dbt_valid_from
+    AND b.dbt_valid_from < a.dbt_valid_to
@@ -0,0 +1,64 @@
+-- Falla si fact_ventas o ventas_diarias no cuentan exactamente las órdenes hasta su marca de agua,
+-- por ejemplo después de recargar o hacer merge de ordenes sin correr dbt run --full-refresh.
+WITH marcas AS (
+    SELECT
+        (SELECT COALESCE(MAX(orden_id), 0) FROM {{ref ('fact_ventas')}}) AS ultima_linea,
+        (SELECT COALESCE(MAX(ultima_orden_id), 0) FROM {{ref ('ventas_diarias')}}) AS ultima_orden
+),
+
+diferencias AS (
+    SELECT
+        'fact_ventas' AS modelo,
+        (SELECT COUNT(*) FROM {{ref ('fact_ventas')}}) AS en_mart,
+        COUNT(*) AS en_fuente
+    FROM
+        {{ref ('stg_detalle_ordenes')}} d
+    INNER JOIN
+        {{ref ('stg_ordenes')}} o
+        ON o.orden_id = d.orden_id
+    WHERE
+        d.orden_id <= (SELECT ultima_linea FROM marcas)
+
+    UNION ALL
+
+    SELECT
+        'ventas_diarias' AS modelo,
+        (SELECT COALESCE(SUM(cantidad_ordenes), 0) FROM {{ref ('ventas_diarias')}}) AS en_mart,
+        COUNT(*) AS en_fuente
+    FROM
+        {{ref ('stg_ordenes')}}
+    WHERE
+        orden_id <= (SELECT ultima_orden FROM marcas)
+
+    UNION ALL
+
+    SELECT
+        'ventas_diarias.total_ordenes' AS modelo,
+        (SELECT COALESCE(SUM(total_ordenes), 0) FROM {{ref ('ventas_diarias')}}) AS en_mart,
+        COALESCE(SUM(total), 0) AS en_fuente
+    FROM
+        {{ref ('stg_ordenes')}}
+    WHERE
+        orden_id <= (SELECT ultima_orden FROM marcas)
+
+    UNION ALL
+
+    SELECT
+        'ventas_diarias.cantidad_pagos' AS modelo,
+        (SELECT COALESCE(SUM(cantidad_pagos), 0) FROM {{ref ('ventas_diarias')}}) AS en_mart,
+        COUNT(*) AS en_fuente
+    FROM
+        {{ref ('stg_ordenes_metodos_pago')}} m
+    INNER JOIN
+        {{ref ('stg_ordenes')}} o
+        ON o.orden_id = m.orden_id
+    WHERE
+        m.orden_id <= (SELECT ultima_orden FROM marcas)
+)
+
+SELECT
+    *
+FROM
+    diferencias
+WHERE
+    en_mart <> en_fuente
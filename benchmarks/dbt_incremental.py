@@ -0,0 +1,104 @@
+"""
+Compares a full refresh of the agg_user_expenses dbt mart with an incremental
+run as the ordenes table grows.
+
+For each scale the ordenes table is grown to that many orders, the mart is
+rebuilt with --full-refresh, a batch of new orders (--new-orders, a fraction
+of the scale) is added, and the mart is updated incrementally. Both runs are
+timed with the execution time dbt reports for the model.
+
+WARNING: it empties usuarios and ordenes (and the tables that reference
+them) of the database in config.py, run it on a scratch database. The dbt
+profile "Ecommerce" must point to the same database.
+
+    python -m benchmarks.dbt_incremental --scales 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+
+from sqlalchemy import text
+
+from database.database_connection import get_engine
+from database.table_creator import create_tables
+
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Ecommerce")
+
+
+def reset_data(engine, users: int):
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE TABLE usuarios, ordenes RESTART IDENTITY CASCADE"))
+        conn.execute(text(
+            "INSERT INTO usuarios (nombre, apellido, dni, email, contrasena) "
+            "SELECT 'Nombre ' || g, 'Apellido ' || g, g::text, 'usuario' || g || '@mail.com', 'x' "
+            "FROM generate_series(1, :users) g"
+        ), {"users": users})
+
+
+def add_orders(engine, orders: int, users: int):
+    """Adds orders of random users, totals and dates."""
+    if orders <= 0:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO ordenes (usuario_id, total, estado, fecha_orden) "
+            "SELECT 1 + floor(random() * :users)::int, round((random() * 500)::numeric, 2), 'Completado', "
+            "timestamp '2024-01-01' + random() * interval '365 days' "
+            "FROM generate_series(1, :orders)"
+        ), {"orders": orders, "users": users})
+
+
+def run_mart(full_refresh: bool, project_dir: str = PROJECT_DIR, profiles_dir: str = None) -> float:
+    """Runs agg_user_expenses with dbt and returns the model execution time in seconds."""
+    from dbt.cli.main import dbtRunner
+
+    args = ["run", "--select", "agg_user_expenses", "--project-dir", project_dir, "--quiet"]
+    if full_refresh:
+        args.append("--full-refresh")
+    if profiles_dir:
+        args += ["--profiles-dir", profiles_dir]
+    result = dbtRunner().invoke(args)
+    if not result.success:
+        raise RuntimeError(f"dbt run failed: {result.exception or result.result}")
+    return result.result.results[0].execution_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Order counts to measure, in increasing order.")
+    parser.add_argument("--new-orders", type=float, default=0.01,
+                        help="Orders added before each incremental run, as a fraction of the scale.")
+    parser.add_argument("--orders-per-user", type=int, default=10)
+    parser.add_argument("--project-dir", default=PROJECT_DIR)
+    parser.add_argument("--profiles-dir", default=None)
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    create_tables(engine)
+    users = max(1, max(args.scales) // args.orders_per_user)
+    reset_data(engine, users)
+
+    results = []
+    current = 0
+    for scale in sorted(args.scales):
+        new_orders = max(1, int(scale * args.new_orders))
+        add_orders(engine, scale - new_orders - current, users)
+        full = run_mart(full_refresh=True, project_dir=args.project_dir, profiles_dir=args.profiles_dir)
+        add_orders(engine, new_orders, users)
+        incremental = run_mart(full_refresh=False, project_dir=args.project_dir, profiles_dir=args.profiles_dir)
+        current = scale
+        results.append({"orders": scale, "new_orders": new_orders,
+                        "full_refresh_s": round(full, 3), "incremental_s": round(incremental, 3)})
+        print(f"{scale:>12,} orders: full refresh {full:8.3f}s, incremental (+{new_orders:,}) {incremental:8.3f}s, "
+              f"{full / incremental if incremental else float('inf'):.1f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
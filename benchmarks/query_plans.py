@@ -0,0 +1,285 @@
+"""
+Query plan registry: captures the plan of every named analytics and
+integrity query and flags regressions against a saved JSON baseline.
+
+The registry collects the notebook aggregations (see run_suite), the
+EDA_helper and data_quality checks and the reads of the dbt marts that
+exist in the database. On PostgreSQL each query runs under
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON); on SQLite the plan comes from
+EXPLAIN QUERY PLAN and the time from running the query. Both become the
+same list of plan nodes (node type, relation, index, estimated and actual
+rows), saved with the timings.
+
+A query regresses when a table it read through an index is now scanned
+whole (Seq Scan / SCAN), when it is slower than the baseline by more than
+--tolerance (and --floor-ms), or when its row estimate goes more than
+MISESTIMATE times off while the baseline's was not. Plan shape changes
+are reported without failing.
+
+    python -m benchmarks.query_plans --save          # writes the baseline
+    python -m benchmarks.query_plans                 # compares, exit status 1 on regressions
+
+EXPLAIN ANALYZE runs the queries, all of them are SELECTs.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import sqlalchemy
+
+from sqlalchemy import Connection, column, create_engine, func, inspect, literal, select, table
+from sqlalchemy.sql import Executable
+
+import EDA_helper
+import data_quality
+from benchmarks.run_suite import notebook_queries
+from config import DATABASE_URL
+from database.models import DetalleOrden, Orden, Producto, Usuario
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+INDEX_ACCESS = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan", "SEARCH"}  # lectura de una tabla por índice
+FULL_SCANS = {"Seq Scan", "SCAN"}
+MISESTIMATE = 10  # veces entre filas estimadas y reales de la raíz a partir de las que se marca
+
+
+class PlannedQuery(NamedTuple):
+    source: str
+    statement: Executable
+
+
+def dbt_queries(conn: Connection) -> Dict[str, Executable]:
+    """Reads of the dbt marts the dashboards use, only for the marts built in this database."""
+    ventas_diarias = table("ventas_diarias", column("dia_semana"), column("cantidad_ordenes"), column("total_ordenes"))
+    ventas_mensuales = table("ventas_mensuales", column("mes"), column("metodo_pago"), column("cantidad_ordenes"))
+    agg_user_expenses = table("agg_user_expenses", column("usuario_id"), column("total_acumulado"))
+    detalle_ordenes_pit = table("detalle_ordenes_pit", column("orden_id"), column("producto_nombre"), column("precio_lista"))
+    queries = {
+        "ventas_diarias": (
+            select(ventas_diarias.c.dia_semana, func.sum(ventas_diarias.c.cantidad_ordenes), func.sum(ventas_diarias.c.total_ordenes))
+            .group_by(ventas_diarias.c.dia_semana)
+        ),
+        "ventas_mensuales": (
+            select(ventas_mensuales.c.metodo_pago, func.sum(ventas_mensuales.c.cantidad_ordenes))
+            .group_by(ventas_mensuales.c.metodo_pago)
+        ),
+        "agg_user_expenses": select(agg_user_expenses).order_by(agg_user_expenses.c.total_acumulado.desc()).limit(10),
+        "detalle_ordenes_pit": select(detalle_ordenes_pit).where(detalle_ordenes_pit.c.orden_id == literal(1)),
+    }
+    names = set(inspect(conn).get_table_names()) | set(inspect(conn).get_view_names())
+    return {name: stmt for name, stmt in queries.items() if name in names}
+
+
+def registry(conn: Connection) -> Dict[str, PlannedQuery]:
+    """Every named query, as {"<source>:<name>": PlannedQuery}."""
+    queries = {f"notebook:{name}": PlannedQuery("notebook", stmt) for name, stmt in notebook_queries().items()}
+    queries["EDA_helper:referential_integrity"] = PlannedQuery("EDA_helper", EDA_helper.referential_integrity_query())
+    for model in (Usuario, Orden, DetalleOrden, Producto):
+        grupos = EDA_helper.duplicate_groups(model)
+        queries[f"EDA_helper:duplicates_{model.__tablename__}"] = PlannedQuery("EDA_helper", select(func.count()).select_from(grupos))
+    queries["EDA_helper:precio_unitario_igual_precio"] = PlannedQuery("EDA_helper", (
+        select(func.count()).select_from(DetalleOrden).join(DetalleOrden.producto)
+        .where(DetalleOrden.precio_unitario == Producto.precio)
+    ))
+    for model, rules in data_quality.rules_by_table(data_quality.DEFAULT_RULES).items():
+        queries[f"data_quality:{model.__tablename__}"] = PlannedQuery("data_quality", data_quality.rule_pass(model, rules))
+    for name, stmt in dbt_queries(conn).items():
+        queries[f"dbt:{name}"] = PlannedQuery("dbt", stmt)
+    return queries
+
+
+def driver_sql(conn: Connection, statement: Executable):
+    """SQL and parameters of a statement as the driver receives them."""
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if compiled.positional:
+        return str(compiled), tuple(compiled.params[name] for name in compiled.positiontup)
+    return str(compiled), compiled.params
+
+
+def postgres_nodes(plan: Dict[str, Any], depth: int = 0) -> List[Dict[str, Any]]:
+    nodes = [{
+        "depth": depth,
+        "node": plan["Node Type"],
+        "relation": plan.get("Relation Name"),
+        "index": plan.get("Index Name"),
+        "estimated_rows": plan.get("Plan Rows"),
+        "actual_rows": plan.get("Actual Rows"),
+        "loops": plan.get("Actual Loops"),
+    }]
+    for child in plan.get("Plans", []):
+        nodes += postgres_nodes(child, depth + 1)
+    return nodes
+
+
+def capture_postgres(conn: Connection, statement: Executable, repeat: int) -> Dict[str, Any]:
+    sql, params = driver_sql(conn, statement)
+    best = None
+    for _ in range(repeat):
+        explain = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params).scalar_one()[0]
+        if best is None or explain["Execution Time"] < best["Execution Time"]:
+            best = explain
+    root = best["Plan"]
+    return {
+        "plan": postgres_nodes(root),
+        "execution_ms": round(best["Execution Time"], 3),
+        "planning_ms": round(best["Planning Time"], 3),
+        "estimated_rows": root["Plan Rows"],
+        "actual_rows": root["Actual Rows"],
+        "shared_hit_blocks": root.get("Shared Hit Blocks"),
+        "shared_read_blocks": root.get("Shared Read Blocks"),
+    }
+
+
+SQLITE_ACCESS = re.compile(r"^(SCAN|SEARCH) (\S+)(?: AS \S+)?(?: USING (?:COVERING )?INDEX (\S+)| USING (INTEGER PRIMARY KEY|PRIMARY KEY))?")
+
+
+def sqlite_nodes(rows) -> List[Dict[str, Any]]:
+    """The rows of EXPLAIN QUERY PLAN (id, parent, notused, detail) as plan nodes."""
+    depths = {0: -1}
+    nodes = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        access = SQLITE_ACCESS.match(detail)
+        node = {"depth": depths[node_id], "node": detail, "relation": None, "index": None,
+                "estimated_rows": None, "actual_rows": None, "loops": None}
+        if access:
+            node.update(node=access.group(1), relation=access.group(2), index=access.group(3) or access.group(4))
+        nodes.append(node)
+    return nodes
+
+
+def capture_sqlite(conn: Connection, statement: Executable, repeat: int) -> Dict[str, Any]:
+    sql, params = driver_sql(conn, statement)
+    plan = sqlite_nodes(conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params).all())
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(conn.exec_driver_sql(sql, params).all())
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return {"plan": plan, "execution_ms": round(best, 3), "planning_ms": None,
+            "estimated_rows": None, "actual_rows": rows, "shared_hit_blocks": None, "shared_read_blocks": None}
+
+
+def capture(conn: Connection, queries: Dict[str, PlannedQuery], repeat: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Plan and best time of repeat runs of every query."""
+    capture_query = capture_postgres if conn.dialect.name == "postgresql" else capture_sqlite
+    captures = {}
+    for name, query in queries.items():
+        captures[name] = {"source": query.source, **capture_query(conn, query.statement, repeat)}
+        print(f"{name:<50} {captures[name]['execution_ms']:10.3f} ms  {plan_shape(captures[name]['plan'])[:60]}")
+    return captures
+
+
+def plan_shape(plan: List[Dict[str, Any]]) -> str:
+    """The plan without its numbers: node types, relations and indexes in order."""
+    return " > ".join(
+        node["node"] + (f"({node['relation']}" + (f" using {node['index']}" if node["index"] else "") + ")"
+                        if node["relation"] else "")
+        for node in plan
+    )
+
+
+def access_methods(plan: List[Dict[str, Any]]) -> Dict[str, set]:
+    """How each table is read in a plan, {relation: {node types}}."""
+    methods = {}
+    for node in plan:
+        if node["relation"] and node["node"] in INDEX_ACCESS | FULL_SCANS:
+            methods.setdefault(node["relation"], set()).add(node["node"])
+    return methods
+
+
+def estimate_error(entry: Dict[str, Any]) -> Optional[float]:
+    if entry["estimated_rows"] is None or entry["actual_rows"] is None:
+        return None
+    return max(entry["estimated_rows"], 1) / max(entry["actual_rows"], 1)
+
+
+class Flag(NamedTuple):
+    query: str
+    kind: str
+    message: str
+    regression: bool
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]],
+            tolerance: float = 1.0, floor_ms: float = 10.0) -> List[Flag]:
+    """
+    Flags of every query of current against the baseline: seq_scan, slower
+    and misestimate are regressions; plan_changed, new and missing are not.
+    """
+    flags = []
+    for name, entry in current.items():
+        before = baseline.get(name)
+        if before is None:
+            flags.append(Flag(name, "new", "not in the baseline", False))
+            continue
+        old_methods, new_methods = access_methods(before["plan"]), access_methods(entry["plan"])
+        for relation, methods in new_methods.items():
+            if old_methods.get(relation, set()) & INDEX_ACCESS and not methods & INDEX_ACCESS:
+                flags.append(Flag(name, "seq_scan", f"{relation} read by {', '.join(sorted(methods))} instead of "
+                                                    f"{', '.join(sorted(old_methods[relation]))}", True))
+        limit = max(before["execution_ms"] * (1 + tolerance), floor_ms)
+        if entry["execution_ms"] > limit:
+            flags.append(Flag(name, "slower", f"{before['execution_ms']:.3f} ms -> {entry['execution_ms']:.3f} ms "
+                                              f"(limit {limit:.3f} ms)", True))
+        old_error, new_error = estimate_error(before), estimate_error(entry)
+        if new_error is not None and not 1 / MISESTIMATE <= new_error <= MISESTIMATE \
+                and (old_error is None or 1 / MISESTIMATE <= old_error <= MISESTIMATE):
+            flags.append(Flag(name, "misestimate", f"estimated {entry['estimated_rows']} rows, got {entry['actual_rows']}", True))
+        if plan_shape(before["plan"]) != plan_shape(entry["plan"]):
+            flags.append(Flag(name, "plan_changed", plan_shape(entry["plan"]), False))
+    for name in baseline.keys() - current.keys():
+        flags.append(Flag(name, "missing", "in the baseline but not captured", False))
+    return flags
+
+
+def baseline_path(dialect: str) -> str:
+    return os.path.join(BASELINE_DIR, f"query_plans_{dialect}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=None, help="SQLAlchemy URL, by default DATABASE_URL from config.py.")
+    parser.add_argument("--baseline", default=None, help="Baseline file, by default baselines/query_plans_<dialect>.json.")
+    parser.add_argument("--save", action="store_true", help="Write the captured plans as the new baseline.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each query, the fastest is kept.")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed slowdown over the baseline, 1.0 = twice as slow.")
+    parser.add_argument("--floor-ms", type=float, default=10.0, help="Queries under this many ms are never flagged as slower.")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database or DATABASE_URL)
+    path = args.baseline or baseline_path(engine.dialect.name)
+    with engine.connect() as conn:
+        captures = capture(conn, registry(conn), args.repeat)
+
+    if args.save:
+        report = {
+            "meta": {"date": datetime.now().isoformat(timespec="seconds"), "dialect": engine.dialect.name,
+                     "sqlalchemy": sqlalchemy.__version__},
+            "queries": captures,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nBaseline written to {path}")
+        return
+
+    with open(path, encoding="utf-8") as file:
+        baseline = json.load(file)["queries"]
+    flags = compare(baseline, captures, args.tolerance, args.floor_ms)
+    print(f"\nCompared with {path}:")
+    for flag in flags:
+        print(f"{'REGRESSION' if flag.regression else 'note':<10} {flag.query:<50} {flag.kind:<12} {flag.message}")
+    if any(flag.regression for flag in flags):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Benchmark suite: generates a synthetic dataset and times every loader,
+load_all end to end (threaded and asyncio), the EDA_helper checks, the data_quality rules and the notebook aggregations,
+recording rows/s and peak memory of each step.
+
+The results are written as JSON (benchmarks/results/<date>_<dialect>_<orders>.json
+by default) and --compare prints the change against a previous run.
+
+    python -m benchmarks.run_suite --orders 100000 --database sqlite:///downloads/bench.db
+    python -m benchmarks.run_suite --orders 1000000 --compare benchmarks/results/previous.json
+
+Without --database it uses DATABASE_URL from config.py. It drops and
+recreates every table of that database, run it on a scratch database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import threading
+import time
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+import sqlalchemy
+
+from sqlalchemy import create_engine, extract, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+import EDA_helper
+import data_quality
+from config import DATABASE_URL, LOAD_WORKERS
+from database import insertion_helper
+from database.async_insertion import async_url, load_all_async
+from database.database_insertion import LOADERS, load_all, load_table
+from database.models import Base, Orden, MetodoPago, OrdenMetodoPago, Producto, Usuario, DetalleOrden
+from database.table_creator import create_tables, drop_tables
+from benchmarks.synthetic_data import generate
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class PeakMemory:
+    """Samples the RSS of the process in a background thread and keeps the maximum."""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self.running = False
+
+    def _sample(self):
+        while self.running:
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = self.process.memory_info().rss
+        self.running = True
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def measure(name: str, step: Callable[[], Any], rows: Optional[int] = None, repeat: int = 1) -> Dict[str, Any]:
+    """Runs a step (the best of repeat runs) and returns its timing, rows/s and peak RSS."""
+    best = None
+    with PeakMemory() as memory:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = step()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    if rows is None and isinstance(result, int):
+        rows = result
+    entry = {"name": name, "seconds": round(best, 4), "peak_rss_mb": round(memory.peak / 2**20, 1)}
+    if rows is not None:
+        entry["rows"] = rows
+        entry["rows_per_second"] = round(rows / best) if best else None
+    print(f"{name:<45} {best:9.3f}s" + (f" {entry['rows_per_second']:>12,} rows/s" if rows else "")
+          + f" {entry['peak_rss_mb']:>9,.1f} MB")
+    return entry
+
+
+def notebook_queries() -> Dict[str, Any]:
+    """The aggregations of the business-question and storytelling notebooks."""
+    return {
+        "ventas_por_dia_semana": (
+            select(extract("dow", Orden.fecha_orden).label("dia_semana"), func.count().label("cantidad"))
+            .group_by("dia_semana").order_by(func.count().desc())
+        ),
+        "productos_sin_stock": select(Producto).where(Producto.stock == 0),
+        "promedio_por_orden": select(func.avg(Orden.total)),
+        "metodos_de_pago": (
+            select(MetodoPago.nombre, func.count().label("count"))
+            .select_from(OrdenMetodoPago)
+            .join(MetodoPago, OrdenMetodoPago.metodo_pago_id == MetodoPago.metodo_pago_id)
+            .group_by(MetodoPago.nombre)
+        ),
+        "total_por_metodo_de_pago": (
+            select(MetodoPago.nombre.label("payment_method"), Orden.total.label("order_total"))
+            .select_from(OrdenMetodoPago)
+            .join(Orden, OrdenMetodoPago.orden_id == Orden.orden_id)
+            .join(MetodoPago, OrdenMetodoPago.metodo_pago_id == MetodoPago.metodo_pago_id)
+        ),
+        "top_usuarios_por_gasto": (
+            select(Usuario.usuario_id, func.sum(Orden.total).label("total"))
+            .join(Orden, Orden.usuario_id == Usuario.usuario_id)
+            .group_by(Usuario.usuario_id).order_by(func.sum(Orden.total).desc()).limit(10)
+        ),
+    }
+
+
+def reset_database(engine: Engine):
+    drop_tables(engine)
+    create_tables(engine)
+
+
+def run_load_all_async(engine: Engine, workers: int) -> int:
+    """load_all_async on the same database as engine, through its asyncio driver."""
+    async def load():
+        async_engine = create_async_engine(async_url(engine.url))
+        try:
+            return await load_all_async(workers=workers, bind=async_engine)
+        finally:
+            await async_engine.dispose()
+    return sum(loader.rows_loaded for loader in asyncio.run(load()).values())
+
+
+def run_suite(engine: Engine, data_dir: str, workers: int, repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    insertion_helper.CSV_DIR = data_dir
+
+    reset_database(engine)
+    order = {table.name: i for i, table in enumerate(Base.metadata.sorted_tables)}
+    for loader_class in sorted(LOADERS, key=lambda c: order[c(None).get_model_class().__tablename__]):
+        results.append(measure(f"load:{loader_class.__name__}",
+                               lambda: load_table(loader_class, engine).rows_loaded))
+
+    reset_database(engine)
+    results.append(measure(f"load_all:{workers}_workers", lambda: sum(
+        loader.rows_loaded for loader in load_all(bind=engine, workers=workers).values())))
+
+    reset_database(engine)
+    results.append(measure(f"load_all_async:{workers}_workers", lambda: run_load_all_async(engine, workers)))
+
+    with Session(engine) as session:
+        tables = [Usuario, Orden, DetalleOrden, Producto]
+        checks = {
+            "find_invalid_user_references": lambda: EDA_helper.find_invalid_user_references(session),
+            "find_invalid_product_references": lambda: EDA_helper.find_invalid_product_references(session),
+            "scan_referential_integrity": lambda: EDA_helper.scan_referential_integrity(session),
+            "check_duplicates": lambda: [EDA_helper.find_duplicates(session, table) for table in tables],
+            "data_quality_rules": lambda: data_quality.run_rules(session),
+        }
+        for name, check in checks.items():
+            results.append(measure(f"eda:{name}", check, repeat=repeat))
+
+        for name, stmt in notebook_queries().items():
+            results.append(measure(f"query:{name}", lambda: session.execute(stmt).all(), repeat=repeat))
+    return results
+
+
+def compare(results: List[Dict[str, Any]], previous_path: str):
+    """Prints the time of every step relative to a previous results file."""
+    with open(previous_path, encoding="utf-8") as file:
+        previous = {entry["name"]: entry for entry in json.load(file)["results"]}
+    print(f"\nCompared with {previous_path}:")
+    for entry in results:
+        before = previous.get(entry["name"])
+        if before and before["seconds"]:
+            change = (entry["seconds"] - before["seconds"]) / before["seconds"] * 100
+            print(f"{entry['name']:<45} {before['seconds']:9.3f}s -> {entry['seconds']:9.3f}s ({change:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10_000, help="Scale of the synthetic dataset, 10k to 10M.")
+    parser.add_argument("--database", default=None, help="SQLAlchemy URL, by default DATABASE_URL from config.py.")
+    parser.add_argument("--data-dir", default=None, help="Where the CSVs are generated, reused if they exist.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each query and check, the best is kept.")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="Previous results file to compare with.")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database or DATABASE_URL)
+    # SQLite admite un solo escritor a la vez
+    workers = args.workers or (1 if engine.dialect.name == "sqlite" else LOAD_WORKERS)
+    data_dir = args.data_dir or os.path.join("downloads", f"synthetic_{args.orders}")
+
+    if not os.path.exists(os.path.join(data_dir, LOADERS[-1](None).get_csv_name())):
+        generation = measure("generate", lambda: sum(generate(data_dir, args.orders).values()))
+    else:
+        generation = None
+    results = run_suite(engine, data_dir, workers, args.repeat)
+    if generation:
+        results.insert(0, generation)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "orders": args.orders,
+            "dialect": engine.dialect.name,
+            "workers": workers,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{engine.dialect.name}_{args.orders}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
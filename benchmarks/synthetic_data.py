@@ -0,0 +1,212 @@
+"""
+Writes the 11 CSVs of the dataset with synthetic data, at any scale.
+
+The headers come from the loaders' ColumnSpecs, so the files have exactly the
+format insertion_helper expects. Every FK points to an existing row (ids are
+the row numbers, as after a load into empty tables), and order totals,
+payments and payment history add up to the order lines. Orders are generated
+in chunks, so memory use does not grow with the scale.
+
+    python -m benchmarks.synthetic_data downloads/synthetic --orders 1000000
+"""
+import argparse
+import csv
+import os
+
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from database.database_insertion import LOADERS
+from database.insertion_helper import (
+    UsuarioLoader, CategoriaLoader, ProductoLoader, OrdenLoader, DetalleOrdenLoader, DireccionEnvioLoader,
+    CarritoLoader, MetodoPagoLoader, OrdenMetodoPagoLoader, ResenaProductoLoader, HistorialPagoLoader
+)
+
+
+NOMBRES = ["Ana", "Luis", "María", "Jorge", "Lucía", "Carlos", "Sofía", "Miguel", "Valeria", "Diego"]
+APELLIDOS = ["García", "Pérez", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Torres", "Ramírez", "Flores"]
+CIUDADES = ["Lima", "Arequipa", "Cusco", "Trujillo", "Piura", "Bogotá", "Quito", "Santiago"]
+ESTADOS_ORDEN = ["Pendiente", "Enviado", "Completado", "Cancelado"]
+ESTADOS_PAGO = ["Procesando", "Pagado", "Fallido", "Reembolsado"]
+METODOS_PAGO = ["Tarjeta de crédito", "Tarjeta de débito", "PayPal", "Transferencia bancaria", "Efectivo"]
+START = np.datetime64("2023-01-01T00:00:00", "s")
+SECONDS = 2 * 365 * 24 * 3600  # las fechas se reparten en dos años
+
+
+def scale_sizes(orders: int) -> Dict[str, int]:
+    """Rows of every table for a number of orders."""
+    return {
+        "usuarios": max(100, orders // 10),
+        "categorias": 20,
+        "productos": min(100_000, max(100, orders // 100)),
+        "metodos_pago": len(METODOS_PAGO),
+        "ordenes": orders,
+        "carrito": max(10, orders // 4),
+        "resenas_productos": max(10, orders // 5),
+    }
+
+
+def header(loader_class: type) -> List[str]:
+    return [spec.header for spec in loader_class.columns]
+
+
+def money(cents: np.ndarray) -> List[str]:
+    return [f"{c // 100}.{c % 100:02d}" for c in cents.tolist()]
+
+
+def timestamps(rng: np.random.Generator, n: int, start: np.ndarray = None) -> np.ndarray:
+    """Random datetime64[s] in the two years after START, or a few days after start."""
+    if start is None:
+        return START + rng.integers(0, SECONDS, n).astype("timedelta64[s]")
+    return start + rng.integers(0, 7 * 24 * 3600, n).astype("timedelta64[s]")
+
+
+def date_strings(values: np.ndarray) -> List[str]:
+    return [value.replace("T", " ") for value in np.datetime_as_string(values, unit="s").tolist()]
+
+
+def choice(rng: np.random.Generator, options: Sequence[str], n: int) -> List[str]:
+    return np.asarray(options, dtype=object)[rng.integers(0, len(options), n)].tolist()
+
+
+def ids(rng: np.random.Generator, count: int, n: int) -> np.ndarray:
+    """n random ids between 1 and count."""
+    return rng.integers(1, count + 1, n)
+
+
+class SyntheticWriter:
+    """Keeps one csv.writer open per loader CSV."""
+    def __init__(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.files = {}
+        self.writers = {}
+        self.rows = {}
+        for loader_class in LOADERS:
+            name = loader_class(None).get_csv_name()
+            self.files[loader_class] = open(os.path.join(out_dir, name), "w", newline="", encoding="utf-8")
+            self.writers[loader_class] = csv.writer(self.files[loader_class])
+            self.writers[loader_class].writerow(header(loader_class))
+            self.rows[loader_class] = 0
+
+    def write(self, loader_class: type, columns: Dict[str, Iterable]):
+        """Writes rows given as {CSV header: values}, in the order of the loader's columns."""
+        values = [list(columns[name]) for name in header(loader_class)]
+        self.writers[loader_class].writerows(zip(*values))
+        self.rows[loader_class] += len(values[0])
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+
+def generate(out_dir: str, orders: int, seed: int = 0, chunk_size: int = 500_000) -> Dict[str, int]:
+    """Writes every CSV for the given number of orders and returns the rows written per file."""
+    rng = np.random.default_rng(seed)
+    sizes = scale_sizes(orders)
+    writer = SyntheticWriter(out_dir)
+    try:
+        users, products = sizes["usuarios"], sizes["productos"]
+        for start in range(0, users, chunk_size):
+            n = min(chunk_size, users - start)
+            numbers = np.arange(start + 1, start + n + 1).tolist()
+            writer.write(UsuarioLoader, {
+                "Nombre": choice(rng, NOMBRES, n),
+                "Apellido": choice(rng, APELLIDOS, n),
+                "DNI": [str(10_000_000 + i) for i in numbers],
+                "Email": [f"usuario{i}@mail.com" for i in numbers],
+                "Contraseña": [f"hash{i:08x}" for i in rng.integers(0, 2**31, n).tolist()],
+            })
+            writer.write(DireccionEnvioLoader, {
+                "UsuarioID": numbers,
+                "Calle": [f"Av. Principal {i % 999 + 1}" for i in numbers],
+                "Ciudad": choice(rng, CIUDADES, n),
+                "Departamento": choice(rng, ["", "A", "B", "C"], n),
+                "Provincia": choice(rng, CIUDADES, n),
+                "Distrito": choice(rng, ["", "Centro", "Norte", "Sur"], n),
+                "Estado": [""] * n,
+                "CodigoPostal": rng.integers(10_000, 99_999, n).tolist(),
+                "Pais": choice(rng, ["Perú", "Colombia", "Ecuador", "Chile"], n),
+            })
+
+        writer.write(CategoriaLoader, {
+            "Nombre": [f"Categoría {i}" for i in range(1, sizes["categorias"] + 1)],
+            "Descripcion": [f"Productos de la categoría {i}" for i in range(1, sizes["categorias"] + 1)],
+        })
+        writer.write(MetodoPagoLoader, {"Nombre": METODOS_PAGO, "Descripcion": [""] * len(METODOS_PAGO)})
+
+        prices = rng.integers(100, 50_000, products)  # en centavos
+        writer.write(ProductoLoader, {
+            "Nombre": [f"Producto {i}" for i in range(1, products + 1)],
+            "Descripcion": choice(rng, ["", "Nuevo", "Oferta", "Importado"], products),
+            "Precio": money(prices),
+            "Stock": rng.integers(0, 500, products).tolist(),
+            "CategoriaID": ids(rng, sizes["categorias"], products).tolist(),
+        })
+
+        for start in range(0, orders, chunk_size):
+            n = min(chunk_size, orders - start)
+            order_ids = np.arange(start + 1, start + n + 1)
+            lines = rng.integers(1, 6, n)
+            line_orders = np.repeat(order_ids, lines)
+            line_products = ids(rng, products, len(line_orders))
+            quantities = rng.integers(1, 4, len(line_orders))
+            line_totals = quantities * prices[line_products - 1]
+            totals = np.add.reduceat(line_totals, np.concatenate([[0], np.cumsum(lines)[:-1]]))
+            order_dates = timestamps(rng, n)
+            methods = ids(rng, len(METODOS_PAGO), n).tolist()
+            order_ids = order_ids.tolist()
+
+            writer.write(OrdenLoader, {
+                "UsuarioID": ids(rng, users, n).tolist(),
+                "Total": money(totals),
+                "Estado": choice(rng, ESTADOS_ORDEN, n),
+                "FechaOrden": date_strings(order_dates),
+            })
+            writer.write(DetalleOrdenLoader, {
+                "OrdenID": line_orders.tolist(),
+                "ProductoID": line_products.tolist(),
+                "Cantidad": quantities.tolist(),
+                "PrecioUnitario": money(prices[line_products - 1]),
+            })
+            writer.write(OrdenMetodoPagoLoader, {"OrdenID": order_ids, "MetodoPagoID": methods, "MontoPagado": money(totals)})
+            writer.write(HistorialPagoLoader, {
+                "OrdenID": order_ids,
+                "MetodoPagoID": methods,
+                "Monto": money(totals),
+                "EstadoPago": choice(rng, ESTADOS_PAGO, n),
+                "FechaPago": date_strings(timestamps(rng, n, order_dates)),
+            })
+
+        for loader_class, size, extra in ((CarritoLoader, sizes["carrito"], "Cantidad"),
+                                          (ResenaProductoLoader, sizes["resenas_productos"], "Calificacion")):
+            for start in range(0, size, chunk_size):
+                n = min(chunk_size, size - start)
+                columns = {
+                    "UsuarioID": ids(rng, users, n).tolist(),
+                    "ProductoID": ids(rng, products, n).tolist(),
+                    extra: rng.integers(1, 6, n).tolist(),
+                }
+                if loader_class is CarritoLoader:
+                    columns["FechaAgregado"] = date_strings(timestamps(rng, n))
+                else:
+                    columns["Comentario"] = choice(rng, ["", "Muy bueno", "Llegó tarde", "Recomendado"], n)
+                    columns["Fecha"] = date_strings(timestamps(rng, n))
+                writer.write(loader_class, columns)
+    finally:
+        writer.close()
+    return {loader_class(None).get_csv_name(): rows for loader_class, rows in writer.rows.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for name, rows in generate(args.out_dir, args.orders, args.seed).items():
+        print(f"{name}: {rows:,} rows")
+
+
+if __name__ == "__main__":
+    main()
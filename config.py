@@ -30,3 +30,28 @@ DATABASE_URL = URL.create(
 
 CSV_DIR = "downloads/csv" #Common prefix to all CSV paths
 
+
+# Carga de CSVs
+BATCH_SIZE = 10_000 #Rows sent to the database per insert when streaming a CSV.
+COMMIT_EVERY = 10 #Commit every N batches, an interrupted load resumes from the last commit. None commits once at the end of each file.
+LOAD_METHOD = "copy" #"copy" uses COPY FROM STDIN on PostgreSQL (falls back to inserts elsewhere), "insert" always uses inserts.
+LOAD_WORKERS = 4 #Tables loaded at the same time by load_all, each with its own connection.
+VALIDATE_FOREIGN_KEYS = False #Check FKs against the loaded parent ids before inserting, sending bad rows to REJECT_DIR.
+TOLERANT_LOAD = False #Isolate rows that fail to convert or insert by splitting the batch, sending them to REJECT_DIR instead of aborting.
+PARSE_PROCESSES = 0 #Processes that parse and convert big CSVs in byte-range chunks while one connection writes them in order, 0 parses in the loading thread.
+PARSE_MIN_BYTES = 64 * 1024 * 1024 #Only CSVs at least this big are parsed in parallel, smaller ones are not worth starting the processes.
+PARSE_CHUNK_BYTES = 8 * 1024 * 1024 #Size of the byte ranges given to each parsing process, cut at record boundaries.
+CSV_CACHE = False #Keep every converted CSV as memory-mapped columns in <CSV_DIR>/.cache/<csv>/<sha256>/ and load from them while the CSV is unchanged.
+ASYNC_QUEUE_SIZE = 4 #Blocks buffered between the read, convert and write stages of load_all_async; a full queue pauses the stage before it.
+PARTITIONED_TABLES = False #PostgreSQL: create ordenes and historial_pagos with monthly range partitions for the dates in their CSVs (FKs to ordenes are then not created, load_all counts their orphans instead and fails if there are any).
+REJECT_DIR = "downloads/rejects" #Where rejected CSV rows are written, one <csv>.rejects.csv per file (<csv>.parse_errors.csv for unparseable rows).
+METRICS_ENABLED = False #Time every SQL statement of the engines and export per table/phase metrics after load_all (opt-in, writes to METRICS_DIR).
+METRICS_DIR = "downloads/metrics" #Where load_all writes metrics.jsonl (structured records) and metrics.prom (Prometheus text format).
+SLOW_STATEMENTS = 10 #How many of the slowest SQL statements are kept in the metrics.
+
+# Consultas analíticas
+ANALYTICS_BACKEND = "database" #"database" runs the notebook aggregations on the loaded database, "duckdb" on an embedded columnar copy.
+ANALYTICS_SOURCE = "csv" #What the duckdb backend reads: "csv" the files in CSV_DIR directly, "cache" their columnar cache (see CSV_CACHE), "database" a snapshot of the loaded tables.
+DUCKDB_PATH = ":memory:" #DuckDB database file, ":memory:" keeps it in memory and rebuilds it every session.
+QUERY_CHUNK_SIZE = 50_000 #Rows fetched per round trip by query_stream's server-side cursors, one chunk of rows is in memory at a time.
+QUERY_CACHE_MAX_BYTES = 256 * 1024 * 1024 #Memory cap of the cached analytics results, the least recently used are evicted first.
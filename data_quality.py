@@ -0,0 +1,208 @@
+import time
+
+from database.models import (
+    Usuario, Producto, Orden, DetalleOrden,
+    DireccionEnvio, ResenaProducto, HistorialPago
+)
+from sqlalchemy import and_, func, or_, select
+
+
+# Valores que generan los CSVs (ver benchmarks/synthetic_data.py)
+ESTADOS_ORDEN = ["Pendiente", "Enviado", "Completado", "Cancelado"]
+ESTADOS_PAGO = ["Procesando", "Pagado", "Fallido", "Reembolsado"]
+
+
+class Rule:
+    """
+    Regla de calidad sobre una columna de un modelo. violation() es la
+    condición que cumple cada fila que la rompe; las filas con la columna
+    nula no la rompen salvo en NotNull.
+    """
+
+    def __init__(self, column, name=None):
+        self.column = column
+        self.model = column.class_
+        self.name = name or self.default_name()
+
+    def default_name(self):
+        return f"{self.model.__tablename__}.{self.column.key}"
+
+    def violation(self):
+        raise NotImplementedError
+
+    def joins(self):
+        """Relaciones muchos-a-uno que la pasada necesita (LEFT JOIN, no cambian la cantidad de filas)."""
+        return []
+
+    def sample_columns(self):
+        return [self.column]
+
+    def counts(self):
+        """Conteos extra de la misma pasada, {etiqueta: condición}."""
+        return {}
+
+
+class NotNull(Rule):
+    def default_name(self):
+        return f"{super().default_name()} not null"
+
+    def violation(self):
+        return self.column.is_(None)
+
+
+class Range(Rule):
+    """Valores entre minimum y maximum, ambos incluidos; None deja ese lado abierto."""
+
+    def __init__(self, column, minimum=None, maximum=None, name=None):
+        self.minimum = minimum
+        self.maximum = maximum
+        super().__init__(column, name)
+
+    def default_name(self):
+        bounds = [f">= {self.minimum}"] if self.minimum is not None else []
+        bounds += [f"<= {self.maximum}"] if self.maximum is not None else []
+        return f"{super().default_name()} {' '.join(bounds)}"
+
+    def violation(self):
+        conditions = []
+        if self.minimum is not None:
+            conditions.append(self.column < self.minimum)
+        if self.maximum is not None:
+            conditions.append(self.column > self.maximum)
+        return or_(*conditions)
+
+
+class AllowedValues(Rule):
+    """Valores dentro de una lista. Cuenta también cada valor permitido, la distribución sale de la misma pasada."""
+
+    def __init__(self, column, values, name=None):
+        self.values = list(values)
+        super().__init__(column, name)
+
+    def default_name(self):
+        return f"{super().default_name()} in allowed values"
+
+    def violation(self):
+        return self.column.not_in(self.values)
+
+    def counts(self):
+        return {value: self.column == value for value in self.values}
+
+
+class Matches(Rule):
+    """
+    La columna coincide con otra de una tabla relacionada, por ejemplo
+    DetalleOrden.precio_unitario con Producto.precio. relationship es la
+    relación muchos-a-uno que lleva a esa tabla.
+    """
+
+    def __init__(self, column, other, relationship, name=None):
+        self.other = other
+        self.relationship = relationship
+        super().__init__(column, name)
+
+    def default_name(self):
+        return f"{super().default_name()} = {self.other.class_.__tablename__}.{self.other.key}"
+
+    def violation(self):
+        # sin fila relacionada es una FK huérfana, eso lo revisa scan_referential_integrity
+        return and_(self.other.is_not(None), self.column != self.other)
+
+    def joins(self):
+        return [self.relationship]
+
+    def sample_columns(self):
+        return [self.column, self.other]
+
+
+DEFAULT_RULES = [
+    NotNull(Producto.descripcion),
+    Range(Producto.precio, minimum=0),
+    Range(Producto.stock, minimum=0),
+    Range(Producto.stock, minimum=1, name="productos sin stock"),
+    AllowedValues(Orden.estado, ESTADOS_ORDEN),
+    Range(Orden.total, minimum=0),
+    Matches(DetalleOrden.precio_unitario, Producto.precio, DetalleOrden.producto),
+    Range(DetalleOrden.cantidad, minimum=1),
+    AllowedValues(HistorialPago.estado_pago, ESTADOS_PAGO),
+    Range(HistorialPago.monto, minimum=0),
+    Range(ResenaProducto.calificacion, minimum=1, maximum=5),
+    NotNull(DireccionEnvio.codigo_postal),
+    NotNull(Usuario.email),
+]
+
+
+def rules_by_table(rules):
+    """Agrupa las reglas por modelo, en el orden en que aparece cada modelo."""
+    grupos = {}
+    for rule in rules:
+        grupos.setdefault(rule.model, []).append(rule)
+    return grupos
+
+
+def rule_pass(model, rules):
+    """
+    Una sola consulta con todas las reglas de una tabla: COUNT(*) total más
+    un COUNT(*) FILTER (WHERE <violación>) por regla y uno por cada conteo
+    extra, así la tabla se recorre una vez sin importar cuántas reglas tenga.
+    """
+    columnas = [func.count().label("rows")]
+    for i, rule in enumerate(rules):
+        columnas.append(func.count().filter(rule.violation()).label(f"rule_{i}"))
+        columnas += [func.count().filter(condicion).label(f"rule_{i}_{j}")
+                     for j, condicion in enumerate(rule.counts().values())]
+    stmt = select(*columnas).select_from(model)
+    unidas = []
+    for rule in rules:
+        for relationship in rule.joins():
+            if relationship not in unidas:
+                unidas.append(relationship)
+                stmt = stmt.outerjoin(relationship)
+    return stmt
+
+
+def violation_sample(model, rule, sample_size):
+    """Primary key y columnas de a lo sumo sample_size filas que rompen la regla."""
+    stmt = select(*model.__table__.primary_key.columns, *rule.sample_columns()).select_from(model)
+    for relationship in rule.joins():
+        stmt = stmt.outerjoin(relationship)
+    return stmt.where(rule.violation()).limit(sample_size)
+
+
+def run_rules(session, rules=DEFAULT_RULES, sample_size=5):
+    """
+    Corre las reglas con una pasada por tabla (ver rule_pass). Devuelve, por
+    tabla, la cantidad de filas, los segundos que tardó la pasada y, por
+    regla, la cantidad de violaciones, sus conteos extra y una muestra. La
+    muestra se pide aparte y solo para las reglas que fallaron.
+    """
+    reporte = {}
+    for model, reglas in rules_by_table(rules).items():
+        inicio = time.perf_counter()
+        fila = session.execute(rule_pass(model, reglas)).one()._mapping
+        segundos = time.perf_counter() - inicio
+
+        resultados = {}
+        for i, rule in enumerate(reglas):
+            violaciones = fila[f"rule_{i}"]
+            resultado = {"violations": violaciones, "sample": []}
+            if rule.counts():
+                resultado["counts"] = {etiqueta: fila[f"rule_{i}_{j}"] for j, etiqueta in enumerate(rule.counts())}
+            if violaciones and sample_size:
+                resultado["sample"] = [tuple(muestra) for muestra in session.execute(violation_sample(model, rule, sample_size))]
+            resultados[rule.name] = resultado
+        reporte[model.__tablename__] = {"rows": fila["rows"], "seconds": segundos, "rules": resultados}
+    return reporte
+
+
+def check_rules(session, rules=DEFAULT_RULES, sample_size=5):
+    """Imprime el reporte de run_rules, una línea por regla."""
+    reporte = run_rules(session, rules, sample_size)
+    for tabla, resultado in reporte.items():
+        print(f"{tabla}: {resultado['rows']} rows checked in {resultado['seconds']:.3f}s")
+        for nombre, regla in resultado["rules"].items():
+            estado = "OK" if not regla["violations"] else f"{regla['violations']} violations, e.g. {regla['sample']}"
+            print(f"  {nombre}: {estado}")
+            for etiqueta, cantidad in regla.get("counts", {}).items():
+                print(f"    {etiqueta}: {cantidad}")
+    return reporte
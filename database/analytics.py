@@ -0,0 +1,219 @@
+import os
+import tempfile
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from sqlalchemy import Table, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Executable
+
+from config import ANALYTICS_BACKEND, ANALYTICS_SOURCE, DUCKDB_PATH, BATCH_SIZE
+from database import insertion_helper
+from database.column_spec import ColumnSpec
+from database.csv_cache import read_frame
+from database.database_connection import get_engine
+from database.database_insertion import loaders_by_table
+from database.load_manifest import data_versions
+from database.models import Base
+
+
+class AnalyticsBackend(ABC):
+    """
+    Runs the aggregations of the notebooks, written as SQLAlchemy statements,
+    and returns their result as a DataFrame.
+    """
+    @abstractmethod
+    def compile(self, statement: Executable) -> Tuple[str, Any]:
+        """Returns the SQL the backend runs for a statement and its parameters."""
+        pass
+
+    @abstractmethod
+    def execute(self, statement: Executable) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def data_versions(self, tables: Iterable[str]) -> Dict[str, Any]:
+        """Version of the data the backend reads for each table, it changes whenever the table does."""
+        pass
+
+
+class DatabaseBackend(AnalyticsBackend):
+    """Sends the queries to the loaded database itself, as the notebooks do with get_session()."""
+    def __init__(self, bind: Optional[Engine] = None):
+        self.bind = bind or get_engine()
+
+    def compile(self, statement: Executable) -> Tuple[str, Any]:
+        compiled = statement.compile(dialect=self.bind.dialect)
+        return str(compiled), compiled.params
+
+    def execute(self, statement: Executable) -> pd.DataFrame:
+        with self.bind.connect() as conn:
+            return pd.read_sql(statement, conn, coerce_float=False)
+
+    def data_versions(self, tables: Iterable[str]) -> Dict[str, Any]:
+        """The versions the loaders stamp in load_manifest."""
+        with Session(self.bind) as session:
+            return data_versions(session, tables)
+
+
+class DuckDBBackend(AnalyticsBackend):
+    """
+    Runs the queries on an embedded DuckDB database, a columnar engine that
+    scans and aggregates whole columns instead of rows.
+
+    The tables are filled once, when the backend is created or refresh() is
+    called: with source="csv" straight from the files in CSV_DIR, converted
+    like the loaders do, with source="cache" from the memory-mapped columnar
+    cache of those files (see csv_cache.py), with source="database" from a
+    snapshot of the loaded tables. The statements are compiled with the PostgreSQL dialect,
+    whose SQL DuckDB understands.
+    """
+    dialect = postgresql.dialect(paramstyle="numeric_dollar")
+
+    def __init__(self, source: str = ANALYTICS_SOURCE, path: str = DUCKDB_PATH, bind: Optional[Engine] = None):
+        import duckdb  # opcional, solo hace falta con este backend
+
+        if source not in ("csv", "cache", "database"):
+            raise ValueError(f"Unknown analytics source {source!r}, expected 'csv', 'cache' or 'database'")
+        self.source = source
+        self.bind = bind
+        self.conn = duckdb.connect(path)
+        self.versions: Dict[str, Any] = {}
+        self.refresh()
+
+    def refresh(self):
+        """
+        (Re)creates every table from the CSV files, their cache or the loaded
+        database, and records the version of what was read: the size and
+        mtime of each CSV, or the load_manifest versions of the snapshot.
+        """
+        loaders = loaders_by_table()
+        if self.source == "database":
+            with Session(self.bind or get_engine()) as session:
+                self.versions = data_versions(session, [table.name for table in Base.metadata.sorted_tables])
+        for table in Base.metadata.sorted_tables:
+            if self.source != "database" and table.name not in loaders:
+                continue
+            self.conn.execute(f"DROP TABLE IF EXISTS {table.name}")
+            self.conn.execute(create_table_sql(table))
+            if self.source == "csv":
+                self.load_csv(table, loaders[table.name](None))
+            elif self.source == "cache":
+                self.load_cache(table, loaders[table.name](None))
+            else:
+                self.load_snapshot(table)
+
+    def load_csv(self, table: Table, loader: insertion_helper.CSVLoader):
+        """
+        Reads a CSV with DuckDB's own reader. The ids are the row numbers,
+        as when the loaders insert the file into an empty table. A missing
+        CSV leaves its table empty.
+        """
+        path = os.path.join(insertion_helper.CSV_DIR, loader.get_csv_name())
+        if not os.path.exists(path):
+            self.versions[table.name] = None
+            return
+        stat = os.stat(path)
+        self.versions[table.name] = (stat.st_size, stat.st_mtime_ns)
+        self.conn.execute(f"CREATE OR REPLACE TEMP TABLE raw_csv AS "
+                          f"SELECT * FROM read_csv({quote_literal(path)}, header = true, all_varchar = true)")
+        header = [row[0] for row in self.conn.execute("SELECT name FROM pragma_table_info('raw_csv')").fetchall()]
+        pk = table.primary_key.columns[0].name
+        columns = [pk] + [spec.column for spec in loader.columns]
+        values = ["rowid + 1"] + [csv_expression(spec, header) for spec in loader.columns]
+        self.conn.execute(f"INSERT INTO {table.name} ({', '.join(columns)}) SELECT {', '.join(values)} FROM raw_csv")
+        self.conn.execute("DROP TABLE raw_csv")
+
+    def load_cache(self, table: Table, loader: insertion_helper.CSVLoader):
+        """
+        Reads the converted columns of a CSV from its cache, building the
+        cache first if the CSV changed. Ids are the row numbers as in load_csv.
+        """
+        path = loader.get_csv_path()
+        if not os.path.exists(path):
+            self.versions[table.name] = None
+            return
+        stat = os.stat(path)
+        self.versions[table.name] = (stat.st_size, stat.st_mtime_ns)
+        frame = read_frame(loader)
+        pk = table.primary_key.columns[0].name
+        frame.insert(0, pk, range(1, len(frame) + 1))
+        self.conn.register("cached_csv", frame)
+        self.conn.execute(f"INSERT INTO {table.name} ({', '.join(frame.columns)}) "
+                          f"SELECT {', '.join(frame.columns)} FROM cached_csv")
+        self.conn.unregister("cached_csv")
+
+    def load_snapshot(self, table: Table):
+        """
+        Copies a table from the loaded database. PostgreSQL streams it with
+        COPY TO STDOUT into a temporary CSV that DuckDB reads natively; other
+        databases go through pandas in chunks of BATCH_SIZE rows.
+        """
+        bind = self.bind or get_engine()
+        if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+            with tempfile.TemporaryDirectory() as tmp, bind.connect() as conn:
+                path = os.path.join(tmp, f"{table.name}.csv")
+                with open(path, "w", encoding="utf-8") as csvfile, conn.connection.cursor() as cursor:
+                    cursor.copy_expert(f"COPY {table.name} TO STDOUT WITH (FORMAT csv)", csvfile)
+                types = ", ".join(f"{quote_literal(c.name)}: {quote_literal(c.type.compile(dialect=postgresql.dialect()))}"
+                                  for c in table.columns)
+                self.conn.execute(f"INSERT INTO {table.name} SELECT * FROM read_csv({quote_literal(path)}, "
+                                  f"header = false, allow_quoted_nulls = false, columns = {{{types}}})")
+            return
+        with bind.connect() as conn:
+            for chunk in pd.read_sql(select(table), conn, chunksize=BATCH_SIZE):
+                self.conn.register("chunk", chunk)
+                self.conn.execute(f"INSERT INTO {table.name} SELECT * FROM chunk")
+                self.conn.unregister("chunk")
+
+    def compile(self, statement: Executable) -> Tuple[str, List[Any]]:
+        compiled = statement.compile(dialect=self.dialect)
+        return str(compiled), [compiled.params[name] for name in compiled.positiontup]
+
+    def execute(self, statement: Executable) -> pd.DataFrame:
+        sql, params = self.compile(statement)
+        return self.conn.execute(sql, params).df()
+
+    def data_versions(self, tables: Iterable[str]) -> Dict[str, Any]:
+        """The versions recorded by the last refresh()."""
+        return {table: self.versions.get(table) for table in tables}
+
+
+def quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def create_table_sql(table: Table) -> str:
+    """CREATE TABLE with the columns of a model, typed as in PostgreSQL, without constraints."""
+    columns = ", ".join(f"{column.name} {column.type.compile(dialect=postgresql.dialect())}" for column in table.columns)
+    return f"CREATE TABLE {table.name} ({columns})"
+
+
+def csv_expression(spec: ColumnSpec, header: List[str]) -> str:
+    """
+    SQL that converts one raw CSV column like convert_column does: empty
+    values become the default, NULL or stay "" in text columns without a
+    default. DuckDB reads empty fields as NULL.
+    """
+    if spec.header not in header:
+        return quote_literal(str(spec.default)) if spec.default is not None else "NULL"
+    raw = f'NULLIF("{spec.header}", \'\')'
+    if spec.default is not None:
+        return f"COALESCE({raw}, {quote_literal(str(spec.default))})"
+    if spec.type is str:
+        return f"COALESCE(\"{spec.header}\", '')"
+    return raw
+
+
+def get_backend(name: str = ANALYTICS_BACKEND, **options) -> AnalyticsBackend:
+    """Returns the analytics backend selected in config.py."""
+    if name == "database":
+        return DatabaseBackend(**options)
+    if name == "duckdb":
+        return DuckDBBackend(**options)
+    raise ValueError(f"Unknown analytics backend {name!r}, expected 'database' or 'duckdb'")
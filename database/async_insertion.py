@@ -0,0 +1,182 @@
+import asyncio
+import time
+
+from typing import Any, Dict, Iterator, Optional, Type, Union
+
+import numpy as np
+
+from sqlalchemy import insert
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from config import DATABASE_URL, BATCH_SIZE, COMMIT_EVERY, LOAD_METHOD, LOAD_WORKERS, ASYNC_QUEUE_SIZE
+from database.column_spec import block_length, block_to_records, convert_block
+from database.copy_engine import relies_on_server_defaults
+from database.database_insertion import loaders_by_table
+from database.insertion_helper import CSVLoader
+from database.instrumentation import instrumentation
+from database.load_manifest import COMPLETED, FAILED, start_entry, sync_identity
+from database.load_scheduler import run_async_in_dependency_order, table_dependencies
+from database.models import Base
+from database.partitioning import check_partitioned_references
+
+
+# Driver asyncio de cada base de datos
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_url(url: Union[str, URL]) -> URL:
+    """The same database URL with the asyncio driver of its dialect."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend!r}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def get_async_engine(url: Union[str, URL] = DATABASE_URL) -> AsyncEngine:
+    return create_async_engine(async_url(url))
+
+
+async def produce(queue: asyncio.Queue, items: Iterator[Any]):
+    """
+    Puts the items of a blocking iterator in the queue, advancing it in a
+    worker thread so the event loop keeps serving the writers. put() waits
+    while the queue is full, which pauses the reading. None marks the end.
+    """
+    try:
+        while (item := await asyncio.to_thread(next, items, None)) is not None:
+            await queue.put(item)
+    except Exception:
+        await queue.put(None)
+        raise
+    await queue.put(None)
+
+
+async def convert(source: asyncio.Queue, target: asyncio.Queue, loader: CSVLoader):
+    """Converts the raw blocks of source in a worker thread and puts them in target."""
+    table = loader.get_model_class().__tablename__
+
+    def convert_timed(header, rows):
+        with instrumentation.phase(table, "convert"):
+            return convert_block(loader.columns, header, rows)
+
+    try:
+        while (item := await source.get()) is not None:
+            await target.put(await asyncio.to_thread(convert_timed, *item))
+    except Exception:
+        await target.put(None)
+        raise
+    await target.put(None)
+
+
+async def write_block_async(session: AsyncSession, model: Type[Base], block: Dict[str, np.ndarray], use_copy: bool):
+    """
+    Sends a block through the session's connection: with asyncpg's binary
+    COPY (copy_records_to_table) on PostgreSQL, with insert() elsewhere.
+    insert() goes through the model, like CSVLoader.write_block, so a None
+    in a column with a server default is left out and the default applies.
+    """
+    if not block_length(block):
+        return
+    table = model.__table__
+    if use_copy and not relies_on_server_defaults(table, block):
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        start = time.perf_counter()
+        await raw.driver_connection.copy_records_to_table(
+            table.name, records=zip(*(values.tolist() for values in block.values())), columns=list(block))
+        instrumentation.record_statement(f"COPY {table.name} ({', '.join(block)}) FROM STDIN (binary)",
+                                         time.perf_counter() - start, table=table.name)
+    else:
+        await session.execute(insert(model), block_to_records(block))
+
+
+async def load_table_async(loader_class: Type[CSVLoader], engine: AsyncEngine, batch_size: int = BATCH_SIZE,
+                           commit_every: Optional[int] = COMMIT_EVERY, method: str = LOAD_METHOD,
+                           queue_size: int = ASYNC_QUEUE_SIZE) -> CSVLoader:
+    """
+    Loads one CSV as a pipeline of three stages joined by bounded queues:
+    a thread reads raw blocks, another converts them, and the event loop
+    writes them to the database. While a block is being written the next
+    ones are already being read and converted; when the writer falls
+    behind, the full queues stop the other stages, so at most about
+    2 * queue_size blocks are in memory. Progress is recorded in
+    load_manifest like load_table does.
+    """
+    loader = loader_class(None)
+    table = loader.get_model_class().__table__
+    use_copy = method == "copy" and engine.dialect.name == "postgresql"
+    raw_blocks: asyncio.Queue = asyncio.Queue(queue_size)
+    blocks: asyncio.Queue = asyncio.Queue(queue_size)
+
+    print(f"▶ Loading (async): {loader_class.__name__}")
+    start = time.perf_counter()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        entry = await session.run_sync(start_entry, loader, 0)
+        await session.commit()
+        stages = [asyncio.create_task(produce(raw_blocks, loader.iter_raw_blocks(batch_size))),
+                  asyncio.create_task(convert(raw_blocks, blocks, loader))]
+        try:
+            batch_number = 0
+            while (block := await blocks.get()) is not None:
+                with instrumentation.phase(table.name, "execute"):
+                    await write_block_async(session, loader.get_model_class(), block, use_copy)
+                loader.rows_loaded += block_length(block)
+                batch_number += 1
+                if commit_every and batch_number % commit_every == 0:
+                    with instrumentation.phase(table.name, "commit"):
+                        entry.rows_loaded = loader.rows_loaded
+                        await session.commit()
+            await asyncio.gather(*stages)  # relanza el error de una etapa que terminó antes de tiempo
+        except BaseException:
+            for stage in stages:
+                stage.cancel()
+            await session.rollback()
+            entry.status = FAILED
+            await session.commit()
+            raise
+        await session.run_sync(sync_identity, table.name)
+        entry.rows_loaded = loader.rows_loaded
+        entry.status = COMPLETED
+        entry.data_version += 1
+        with instrumentation.phase(table.name, "commit"):
+            await session.commit()
+    loader.elapsed = time.perf_counter() - start
+    instrumentation.count(table.name, rows=loader.rows_loaded)
+    print(f"✔ {loader_class.__name__} Loaded Succesfully. "
+          f"{loader.rows_loaded} rows in {loader.elapsed:.2f}s ({loader.rows_per_second:,.0f} rows/s)")
+    return loader
+
+
+async def load_all_async(batch_size: int = BATCH_SIZE, commit_every: Optional[int] = COMMIT_EVERY,
+                         method: str = LOAD_METHOD, workers: int = LOAD_WORKERS,
+                         bind: Optional[AsyncEngine] = None, queue_size: int = ASYNC_QUEUE_SIZE) -> Dict[str, CSVLoader]:
+    """
+    Asyncio version of load_all for empty tables: up to workers tables are
+    loaded at the same time, each through its own pipeline and connection,
+    as soon as the tables they reference are loaded. Without bind it uses
+    DATABASE_URL with asyncpg (aiosqlite for SQLite).
+    """
+    engine = bind or get_async_engine()
+    start = time.perf_counter()
+    tasks = {
+        table: (lambda loader_class=loader_class: load_table_async(
+            loader_class, engine, batch_size=batch_size, commit_every=commit_every,
+            method=method, queue_size=queue_size))
+        for table, loader_class in loaders_by_table().items()
+    }
+    try:
+        results = await run_async_in_dependency_order(tasks, table_dependencies(), workers)
+        async with AsyncSession(engine) as session:
+            await session.run_sync(check_partitioned_references)
+    finally:
+        if bind is None:
+            await engine.dispose()
+    print(f"{len(results)} table(s) loaded in {time.perf_counter() - start:.2f}s using {workers} async worker(s).")
+    return results
+
+
+def run_load_all_async(**options) -> Dict[str, CSVLoader]:
+    """Runs load_all_async from synchronous code, e.g. DatabaseFacade or a notebook without a running loop."""
+    return asyncio.run(load_all_async(**options))
@@ -0,0 +1,149 @@
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+
+class ColumnSpec(NamedTuple):
+    """Describes how one CSV column is mapped and converted into a table column."""
+    header: str               # nombre de la columna en el CSV
+    column: str               # nombre de la columna en la tabla
+    type: type = str          # str, int, Decimal o datetime
+    nullable: bool = False    # si es True, la columna ausente y los vacíos no-texto se cargan como NULL (un texto vacío queda "")
+    default: Any = None       # valor para vacíos o columna ausente, tiene prioridad sobre NULL
+    scale: int = 2            # máximo de decimales de las columnas Decimal
+
+
+def parse_decimals(values: np.ndarray, scale: int) -> np.ndarray:
+    """
+    Parses decimal strings into exact Decimal objects, never through float.
+    The precision check runs over the whole block at once, and only the
+    values with more decimals than scale are rounded, half up, to scale,
+    as NUMERIC(p, scale) would store them.
+    """
+    if not len(values):
+        return np.empty(0, dtype=object)
+    text = np.char.strip(values.astype(str))
+    fraction = np.char.partition(text, ".")[:, 2]
+    too_precise = np.char.str_len(fraction) > scale
+    parsed = np.empty(len(text), dtype=object)
+    try:
+        parsed[:] = list(map(Decimal, text.tolist()))
+    except InvalidOperation:
+        raise ValueError(f"Invalid decimal values: {[v for v in text.tolist() if not is_decimal(v)][:5]}") from None
+    if too_precise.any():
+        step = Decimal(1).scaleb(-scale)
+        parsed[too_precise] = [value.quantize(step, rounding=ROUND_HALF_UP) for value in parsed[too_precise].tolist()]
+    return parsed
+
+
+def is_decimal(value: str) -> bool:
+    try:
+        Decimal(value)
+    except InvalidOperation:
+        return False
+    return True
+
+
+def parse_datetimes(values: np.ndarray) -> np.ndarray:
+    """Parses ISO dates and timestamps ("2024-05-01 10:00:00") into a datetime64[us] array."""
+    try:
+        return values.astype(str).astype("datetime64[us]")
+    except ValueError:
+        raise ValueError(f"Invalid dates: {[v for v in values.tolist() if not is_datetime(v)][:5]}") from None
+
+
+def is_datetime(value: str) -> bool:
+    try:
+        np.datetime64(value, "us")
+    except ValueError:
+        return False
+    return True
+
+
+def convert_column(spec: ColumnSpec, raw: np.ndarray) -> np.ndarray:
+    """
+    Converts a whole block of raw CSV strings of one column.
+    int columns become int64 arrays, datetime columns datetime64[us] arrays
+    and Decimal columns object arrays of Decimal. If there are empty values
+    the result is an object array with the default (or None) in their place,
+    except in text columns without a default, where they stay "" as the
+    row-by-row loaders always sent them.
+    """
+    if spec.type is str and spec.default is None:
+        return raw
+    empty = raw == ""
+    if not empty.any():
+        if spec.type is int:
+            return raw.astype(np.int64)
+        if spec.type is datetime:
+            return parse_datetimes(raw)
+        if spec.type is Decimal:
+            return parse_decimals(raw, spec.scale)
+        return raw
+
+    if spec.default is None and not spec.nullable:
+        raise ValueError(f"Empty values in non-nullable column {spec.header!r}")
+    filled = np.empty(len(raw), dtype=object)
+    filled[empty] = spec.default
+    present = ~empty
+    if spec.type is Decimal:
+        filled[present] = parse_decimals(raw[present], spec.scale)
+    elif spec.type is int:
+        filled[present] = raw[present].astype(np.int64).tolist()
+    elif spec.type is datetime:
+        filled[present] = parse_datetimes(raw[present]).tolist()
+    else:
+        filled[present] = raw[present]
+    return filled
+
+
+def convert_block(specs: Sequence[ColumnSpec], header: Sequence[str], rows: List[List[str]]) -> Dict[str, np.ndarray]:
+    """
+    Converts a block of CSV rows column by column.
+    Returns {table column: array}. Optional columns missing from the CSV are
+    filled with their default (or None).
+    """
+    positions = {name: i for i, name in enumerate(header)}
+    if set(map(len, rows)) - {len(header)}:
+        ragged = next(row for row in rows if len(row) != len(header))
+        raise ValueError(f"Rows do not have {len(header)} fields, e.g. {ragged}")
+    raw_columns = list(zip(*rows)) if rows else [() for _ in header]
+    block = {}
+    for spec in specs:
+        if spec.header in positions:
+            raw = np.array(raw_columns[positions[spec.header]], dtype=object)
+            block[spec.column] = convert_column(spec, raw)
+        elif spec.nullable or spec.default is not None:
+            block[spec.column] = np.full(len(rows), spec.default, dtype=object)
+        else:
+            raise KeyError(spec.header)
+    return block
+
+
+def records_to_block(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Builds a block from already mapped rows, for loaders that map row by row."""
+    names = list(records[0]) if records else []
+    return {name: np.array([record[name] for record in records], dtype=object) for name in names}
+
+
+def block_to_records(block: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Turns a converted block into the list of dicts insert() expects."""
+    names = list(block)
+    return [dict(zip(names, row)) for row in zip(*(values.tolist() for values in block.values()))]
+
+
+def block_length(block: Dict[str, np.ndarray]) -> int:
+    """Number of rows in a block."""
+    return len(next(iter(block.values()))) if block else 0
+
+
+def slice_block(block: Dict[str, np.ndarray], start: int, stop: int) -> Dict[str, np.ndarray]:
+    """Rows start:stop of a block."""
+    return {name: values[start:stop] for name, values in block.items()}
+
+
+def concat_blocks(first: Dict[str, np.ndarray], second: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Rows of both blocks, one after the other."""
+    return {name: np.concatenate([first[name], second[name]]) for name in first}
@@ -0,0 +1,86 @@
+import io
+import time
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from sqlalchemy import Table
+from sqlalchemy.orm import Session
+
+from database.column_spec import block_length
+from database.instrumentation import instrumentation
+
+
+def supports_copy(session: Session) -> bool:
+    """COPY FROM STDIN is only available through psycopg2 on PostgreSQL."""
+    dialect = session.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def relies_on_server_defaults(table: Table, block: Dict[str, np.ndarray]) -> bool:
+    """
+    True if the block has None in a NOT NULL column with a server default.
+    insert() leaves those values out so the default applies, COPY would send NULL.
+    """
+    for name, values in block.items():
+        column = table.c[name]
+        if not column.nullable and column.server_default is not None and values.dtype == object:
+            if None in values.tolist():
+                return True
+    return False
+
+
+def format_copy_value(value: Any) -> str:
+    """
+    Formats a value as a field of COPY's CSV format.
+    None is written unquoted (NULL) and strings are always quoted, so an
+    empty string is not confused with NULL.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def format_copy_column(values: np.ndarray) -> List[str]:
+    """Formats a whole column of a block; int64 and datetime64 columns need no quoting or NULL checks."""
+    if values.dtype == np.int64:
+        return list(map(str, values.tolist()))
+    if values.dtype.kind == "M":
+        return np.datetime_as_string(values).tolist()
+    return list(map(format_copy_value, values.tolist()))
+
+
+def copy_block(session: Session, table: Table, block: Dict[str, np.ndarray]) -> int:
+    """
+    Sends a block of converted columns to the table with COPY FROM STDIN.
+
+    The block is written column by column to an in-memory CSV buffer and
+    streamed through the session's own connection, so it is part of the
+    session transaction. copy_expert bypasses the engine events, so the
+    statement is reported to instrumentation here.
+    """
+    columns = list(block)
+    if not block_length(block):
+        return 0
+
+    formatted = [format_copy_column(block[column]) for column in columns]
+    buffer = io.StringIO()
+    buffer.write("\n".join(map(",".join, zip(*formatted))))
+    buffer.write("\n")
+    buffer.seek(0)
+
+    preparer = session.get_bind().dialect.identifier_preparer
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        preparer.format_table(table),
+        ", ".join(preparer.quote(column) for column in columns),
+    )
+
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        start = time.perf_counter()
+        cursor.copy_expert(sql, buffer)
+        instrumentation.record_statement(sql, time.perf_counter() - start)
+    return len(formatted[0])
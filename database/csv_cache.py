@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from database.column_spec import ColumnSpec, block_length
+
+
+CACHE_FORMAT = 2  # cambia si cambia la forma de guardar o de convertir las columnas (2: textos vacíos como "")
+TMP_MARKER = ".tmp"  # las carpetas de caches a medio escribir llevan esto en el nombre
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_root(csv_path: str) -> str:
+    """Folder with the caches of a CSV, next to it: <dir>/.cache/<csv name>/."""
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), ".cache", os.path.basename(csv_path))
+
+
+def columns_key(columns: Sequence[ColumnSpec]) -> str:
+    """Identifies the conversion, a cache written with other ColumnSpecs is not reused."""
+    return repr([tuple(spec._replace(type=spec.type.__name__)) for spec in columns])
+
+
+def decode_decimals(raw: np.ndarray, scale: int) -> np.ndarray:
+    """
+    Scaled int64 values back to Decimal objects. Building a Decimal is the
+    slow part, so when values repeat (prices, amounts) each distinct value
+    is built once; Decimals are immutable and can be shared.
+    """
+    distinct, inverse = np.unique(raw, return_inverse=True)
+    decoded = np.empty(len(distinct), dtype=object)
+    decoded[:] = [Decimal(value).scaleb(-scale) for value in distinct.tolist()]
+    return decoded[inverse]
+
+
+class CachedCSV:
+    """
+    A converted CSV stored as one memory-mapped file per column.
+
+    Every column is a flat little-endian array: int64 for int columns,
+    microseconds since the epoch for datetime columns, the value times
+    10**scale for Decimal columns, and UTF-8 bytes plus an int64 offsets
+    array for text. Columns that can be NULL have a bool mask as well.
+    Only the rows being read are paged in and decoded.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as file:
+            self.meta = json.load(file)
+        self.rows = self.meta["rows"]
+        self.specs = {column["column"]: column for column in self.meta["column_types"]}
+
+    def array(self, column: str, suffix: str, dtype: Any) -> np.ndarray:
+        path = os.path.join(self.path, f"{column}.{suffix}")
+        if not os.path.getsize(path):
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def decode(self, column: str, start: int, stop: int) -> np.ndarray:
+        """Rows start:stop of a column, as convert_column returns them."""
+        kind = self.specs[column]["type"]
+        if kind == "str":
+            offsets = self.array(column, "offsets", np.int64)[start:stop + 1]
+            data = bytes(self.array(column, "data", np.uint8)[offsets[0]:offsets[-1]]) if stop > start else b""
+            bounds = (offsets - offsets[0]).tolist()
+            values = np.empty(stop - start, dtype=object)
+            values[:] = [data[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+        else:
+            raw = np.asarray(self.array(column, "data", np.int64)[start:stop])
+            if kind == "int":
+                values = raw.copy()
+            elif kind == "datetime":
+                values = raw.view("datetime64[us]").copy()
+            else:
+                values = decode_decimals(raw, self.specs[column]["scale"])
+        if self.specs[column]["mask"]:
+            nulls = np.asarray(self.array(column, "mask", np.bool_)[start:stop])
+            if nulls.any():
+                values = values.astype(object) if kind == "str" else np.array(values.tolist(), dtype=object)
+                values[nulls] = None
+        return values
+
+    def block(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        return {column: self.decode(column, start, stop) for column in self.specs}
+
+    def iter_blocks(self, batch_size: int, skip_rows: int = 0) -> Iterator[Dict[str, np.ndarray]]:
+        for start in range(skip_rows, self.rows, batch_size):
+            yield self.block(start, min(start + batch_size, self.rows))
+
+    def frame(self) -> pd.DataFrame:
+        """The whole CSV as a DataFrame; int and datetime columns without NULLs are read straight from the map."""
+        columns = {}
+        for column, spec in self.specs.items():
+            if spec["type"] in ("int", "datetime") and not spec["mask"]:
+                raw = self.array(column, "data", np.int64)
+                columns[column] = raw if spec["type"] == "int" else raw.view("datetime64[us]")
+            else:
+                columns[column] = self.decode(column, 0, self.rows)
+        return pd.DataFrame(columns)
+
+
+class CacheWriter:
+    """
+    Appends converted blocks to the column files of a new cache. The cache
+    is written in a temporary folder and only renamed into place by close(),
+    so a load that stops halfway never leaves a partial cache behind. Each
+    writer has its own temporary folder, other writers of the same CSV
+    (other processes or threads) keep theirs.
+    """
+    def __init__(self, csv_path: str, columns: Sequence[ColumnSpec], digest: str):
+        stat = os.stat(csv_path)
+        self.root = cache_root(csv_path)
+        self.final_path = os.path.join(self.root, digest)
+        os.makedirs(self.root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=f"{digest}{TMP_MARKER}", dir=self.root)
+        self.rows = 0
+        self.meta = {
+            "format": CACHE_FORMAT,
+            "source": os.path.basename(csv_path),
+            "sha256": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "columns": columns_key(columns),
+            "column_types": [{"column": spec.column, "type": spec.type.__name__, "scale": spec.scale,
+                              "mask": spec.nullable} for spec in columns],
+        }
+        self.specs = {spec.column: spec for spec in columns}
+        self.files = {}
+        self.offsets = {}
+        for spec in columns:
+            suffixes = ["data"] + (["offsets"] if spec.type is str else []) + (["mask"] if spec.nullable else [])
+            for suffix in suffixes:
+                self.files[spec.column, suffix] = open(os.path.join(self.path, f"{spec.column}.{suffix}"), "wb")
+            if spec.type is str:
+                self.offsets[spec.column] = 0
+                self.files[spec.column, "offsets"].write(np.zeros(1, dtype="<i8").tobytes())
+
+    def append(self, block: Dict[str, np.ndarray]):
+        for column, values in block.items():
+            spec = self.specs[column]
+            items = values.tolist() if values.dtype == object else None
+            if spec.nullable:
+                nulls = np.array([value is None for value in items], dtype=bool) if items is not None \
+                    else np.zeros(len(values), dtype=bool)
+                self.files[column, "mask"].write(nulls.tobytes())
+            if spec.type is str:
+                encoded = [(value or "").encode("utf-8") for value in items]
+                lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+                offsets = self.offsets[column] + np.cumsum(lengths)
+                self.files[column, "data"].write(b"".join(encoded))
+                self.files[column, "offsets"].write(offsets.astype("<i8").tobytes())
+                self.offsets[column] = int(offsets[-1]) if len(offsets) else self.offsets[column]
+            else:
+                self.files[column, "data"].write(self.encode_numbers(spec, values, items).astype("<i8").tobytes())
+        self.rows += block_length(block)
+
+    @staticmethod
+    def encode_numbers(spec: ColumnSpec, values: np.ndarray, items: Optional[List[Any]]) -> np.ndarray:
+        """int, datetime and Decimal columns as int64, NULLs as 0 (the mask tells them apart)."""
+        if items is None:
+            return values.view(np.int64) if spec.type is datetime else values.astype(np.int64)
+        if spec.type is datetime:
+            return np.array([value or datetime(1970, 1, 1) for value in items], dtype="datetime64[us]").view(np.int64)
+        if spec.type is Decimal:
+            return np.array([int(value.scaleb(spec.scale)) if value is not None else 0 for value in items], dtype=np.int64)
+        return np.array([value if value is not None else 0 for value in items], dtype=np.int64)
+
+    def close(self) -> CachedCSV:
+        """
+        Finishes the cache, replacing the finished caches of older versions of
+        the CSV. If another writer already finished this version, its cache is
+        kept and this one is dropped.
+        """
+        for file in self.files.values():
+            file.close()
+        self.meta["rows"] = self.rows
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(self.meta, file, indent=2)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if TMP_MARKER not in name and not (path == self.final_path and self.same_cache(path)):
+                shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(self.path, self.final_path)
+        except OSError:
+            if not self.same_cache(self.final_path):
+                raise
+            shutil.rmtree(self.path, ignore_errors=True)
+        return CachedCSV(self.final_path)
+
+    def same_cache(self, path: str) -> bool:
+        """Whether path holds a finished cache with this writer's format and columns."""
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path, encoding="utf-8") as file:
+            meta = json.load(file)
+        return meta["format"] == self.meta["format"] and meta["columns"] == self.meta["columns"]
+
+    def abort(self):
+        for file in self.files.values():
+            file.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def open_cache(csv_path: str, columns: Sequence[ColumnSpec]) -> Optional[CachedCSV]:
+    """
+    The cache of a CSV if its content has not changed since it was written.
+    Like the load manifest, the hash is only computed when the size matches
+    but the mtime does not.
+    """
+    root = cache_root(csv_path)
+    if not os.path.isdir(root):
+        return None
+    stat = os.stat(csv_path)
+    for name in os.listdir(root):
+        meta_path = os.path.join(root, name, "meta.json")
+        if TMP_MARKER in name or not os.path.exists(meta_path):
+            continue
+        with open(meta_path, encoding="utf-8") as file:
+            meta = json.load(file)
+        if (meta["format"] != CACHE_FORMAT or meta["columns"] != columns_key(columns)
+                or meta["size"] != stat.st_size):
+            continue
+        if meta["mtime_ns"] != stat.st_mtime_ns:
+            if file_hash(csv_path) != meta["sha256"]:
+                continue
+            meta["mtime_ns"] = stat.st_mtime_ns
+            with open(meta_path, "w", encoding="utf-8") as file:
+                json.dump(meta, file, indent=2)
+        return CachedCSV(os.path.join(root, name))
+    return None
+
+
+def write_through(csv_path: str, columns: Sequence[ColumnSpec],
+                  blocks: Iterable[Dict[str, np.ndarray]]) -> Iterator[Dict[str, np.ndarray]]:
+    """Yields the blocks while writing them to a new cache, kept only if the whole CSV was read."""
+    writer = CacheWriter(csv_path, columns, file_hash(csv_path))
+    try:
+        for block in blocks:
+            writer.append(block)
+            yield block
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def read_frame(loader: Any) -> pd.DataFrame:
+    """
+    The converted CSV of a loader as a DataFrame with the table's column
+    names, from its cache, which is built first if it is missing or stale.
+    """
+    path = loader.get_csv_path()
+    cached = open_cache(path, loader.columns)
+    if cached is None:
+        for _ in write_through(path, loader.columns, loader.parse_blocks()):
+            pass
+        cached = open_cache(path, loader.columns)
+    return cached.frame()
@@ -3,12 +3,17 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.engine import Engine
 
-from config import DATABASE_URL
+from config import DATABASE_URL, METRICS_ENABLED
+from database.instrumentation import instrumentation
 
 
 # Engine singleton (echo=True es útil solo en dev)
 engine = create_engine(DATABASE_URL, echo=False)
 
+# Tiempos de cada sentencia SQL por tabla, ver database/instrumentation.py
+if METRICS_ENABLED:
+    instrumentation.attach(engine)
+
 # Creador de sesiones moderno
 SessionLocal = sessionmaker(bind=engine, class_=Session)
 
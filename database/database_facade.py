@@ -1,6 +1,9 @@
+import time
+
 from database.database_connection import get_session, get_engine
-from database.table_creator import create_tables,drop_tables
+from database.table_creator import create_tables,drop_tables,finalize_tables
 from database.database_insertion import load_all
+from database.async_insertion import run_load_all_async
 
 
 
@@ -12,23 +15,77 @@ class DatabaseFacade:
         self.engine = engine
         self.session = session
 
-    def create_tables(self):
-        create_tables(self.engine)
+    def create_tables(self, deferred: bool = False):
+        create_tables(self.engine, deferred=deferred)
+
+    def finalize_tables(self):
+        finalize_tables(self.engine)
 
     def drop_tables(self):
         drop_tables(self.engine)
 
-    def load_all_data(self):
-        load_all()
+    def load_all_data(self, incremental: bool = False):
+        load_all(incremental=incremental)
 
         return self.session
 
-    def run(self):
-        """Run the entire database setup and data loading process."""
+    def run(self, incremental: bool = False):
+        """
+        Run the entire database setup and data loading process.
+        With incremental=True the tables are kept and only the CSVs that
+        changed (or did not finish loading) since the last run are loaded.
+        """
+        if not incremental:
+            self.drop_tables()
+        self.create_tables()
+        self.load_all_data(incremental=incremental)
+        print("Database setup and data loading completed successfully.")
+
+    def run_merge(self):
+        """
+        Applies the CSVs that changed since the last load as a delta: nothing
+        is dropped, their rows are merged into the existing tables.
+        """
+        self.create_tables()
+        load_all(merge=True)
+        print("Database merge completed successfully.")
+
+    def run_async(self):
+        """
+        Full reload through the asyncio pipeline (asyncpg, aiosqlite for
+        SQLite), which reads, converts and writes each CSV at the same time.
+        """
         self.drop_tables()
         self.create_tables()
+        run_load_all_async()
+        print("Database setup and async data loading completed successfully.")
+
+    def run_bulk(self):
+        """
+        Full reload optimized for large loads: the tables are created without
+        FKs, unique constraints and indexes, the data is loaded, and then the
+        constraints and FK indexes are added in parallel. Prints and returns
+        the seconds spent in each phase.
+        """
+        timings = {}
+
+        start = time.perf_counter()
+        self.drop_tables()
+        self.create_tables(deferred=True)
+        timings["create"] = time.perf_counter() - start
+
+        start = time.perf_counter()
         self.load_all_data()
-        print("Database setup and data loading completed successfully.")
+        timings["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.finalize_tables()
+        timings["constraints_and_indexes"] = time.perf_counter() - start
+
+        for phase, seconds in timings.items():
+            print(f"{phase}: {seconds:.2f}s")
+        print("Bulk database setup and data loading completed successfully.")
+        return timings
 
     def close_session(self):
         self.session.close()
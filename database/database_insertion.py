@@ -1,10 +1,26 @@
+import time
+
+from functools import partial
+from typing import Dict, Optional, Type
+
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from sqlalchemy import insert
 from database.database_connection import engine
 
-from config import CSV_DIR
+from config import (
+    CSV_DIR, BATCH_SIZE, COMMIT_EVERY, LOAD_METHOD, LOAD_WORKERS, VALIDATE_FOREIGN_KEYS, TOLERANT_LOAD,
+    METRICS_ENABLED, METRICS_DIR, PARSE_PROCESSES, CSV_CACHE
+)
 
+from database.fk_validation import ForeignKeyValidator
+from database.instrumentation import instrumentation
+from database.rejects import RejectWriter
+from database.load_manifest import COMPLETED, FAILED, plan_merge, plan_reload, reset_tables, start_entry, sync_identity
+from database.load_scheduler import run_in_dependency_order, table_dependencies
+from database.partitioning import check_partitioned_references
 from database.insertion_helper import(
+    CSVLoader,
     UsuarioLoader,
     CategoriaLoader,
     ProductoLoader,
@@ -19,31 +35,161 @@ from database.insertion_helper import(
 )
 
 
-def load_all():
-    """Loads all data from CSV files into the database."""
-    with Session(engine) as session:
-        for loader_class in [
-            UsuarioLoader,          # usuarios
-            CategoriaLoader,        # categorias
-            ProductoLoader,         # productos → requiere categorias
-            OrdenLoader,            # ordenes → requiere usuarios
-            DetalleOrdenLoader,     # detalle_ordenes → requiere ordenes y productos
-            DireccionEnvioLoader,   # direcciones_envio → requiere usuarios
-            CarritoLoader,          # carrito → requiere usuarios y productos
-            MetodoPagoLoader,       # metodos_pago
-            OrdenMetodoPagoLoader,  # ordenes_metodos_pago → requiere ordenes y metodos_pago
-            ResenaProductoLoader,   # resenas_productos → requiere usuarios y productos
-            HistorialPagoLoader     # historial_pagos → requiere ordenes y metodos_pago
-        ]:
-            print(f"▶ Loading: {loader_class.__name__}")
-            loader = loader_class(session)
-            loader.load()
-            print(f"✔ {loader_class.__name__} Loaded Succesfully.\n")
+# Las dependencias entre tablas se derivan de las FKs de Base.metadata,
+# el orden de esta lista solo define el orden de carga con un único worker.
+LOADERS = [
+    UsuarioLoader,          # usuarios
+    CategoriaLoader,        # categorias
+    ProductoLoader,         # productos → requiere categorias
+    OrdenLoader,            # ordenes → requiere usuarios
+    DetalleOrdenLoader,     # detalle_ordenes → requiere ordenes y productos
+    DireccionEnvioLoader,   # direcciones_envio → requiere usuarios
+    CarritoLoader,          # carrito → requiere usuarios y productos
+    MetodoPagoLoader,       # metodos_pago
+    OrdenMetodoPagoLoader,  # ordenes_metodos_pago → requiere ordenes y metodos_pago
+    ResenaProductoLoader,   # resenas_productos → requiere usuarios y productos
+    HistorialPagoLoader     # historial_pagos → requiere ordenes y metodos_pago
+]
+
+
+def loaders_by_table() -> Dict[str, Type[CSVLoader]]:
+    """Maps each table name to the loader that fills it."""
+    return {loader_class(None).get_model_class().__tablename__: loader_class for loader_class in LOADERS}
+
+
+def load_table(loader_class: Type[CSVLoader], bind: Engine, start_row: int = 0, merge: bool = False,
+               **load_options) -> CSVLoader:
+    """
+    Loads one CSV in its own session, so it uses its own pooled connection.
+    Progress is recorded in load_manifest with every commit, and start_row
+    resumes a load that stopped after committing that many CSV rows.
+    With merge=True the CSV is merged into the existing rows, and the data
+    version of the table only changes if some row was inserted or updated.
+    """
+    with Session(bind) as session:
+        print(f"▶ {'Merging' if merge else 'Loading'}: {loader_class.__name__}"
+              + (f" (resuming at row {start_row})" if start_row else ""))
+        loader = loader_class(session)
+        entry = start_entry(session, loader, start_row, bump=not merge)
+        session.commit()
+
+        def record_progress(rows: int):
+            entry.rows_loaded = rows
+
+        try:
+            loader.load(skip_rows=start_row, on_commit=record_progress, merge=merge, **load_options)
+        except Exception:
+            session.rollback()
+            entry.status = FAILED
+            session.commit()
+            raise
+        sync_identity(session, loader.get_model_class().__tablename__)  # los ids explícitos no avanzan la secuencia
+        entry.status = COMPLETED
+        if not merge or loader.rows_inserted or loader.rows_updated:
+            entry.data_version += 1
+        session.commit()
+        print(f"✔ {loader_class.__name__} Loaded Succesfully. "
+              f"{loader.rows_loaded} rows in {loader.elapsed:.2f}s ({loader.rows_per_second:,.0f} rows/s)"
+              + (f", {loader.rows_rejected} rejected" if loader.rows_rejected else "")
+              + (f": {loader.rows_inserted} inserted, {loader.rows_updated} updated, "
+                 f"{loader.rows_unchanged} unchanged" if merge else "")
+              + (f", {loader.rows_duplicated} repeated keys" if loader.rows_duplicated else ""))
+        print(f"  {instrumentation.table(loader.get_model_class().__tablename__).summary()}\n")
+    return loader
+
+
+def load_all(batch_size: int = BATCH_SIZE, commit_every: Optional[int] = COMMIT_EVERY,
+             method: str = LOAD_METHOD, workers: int = LOAD_WORKERS, bind: Optional[Engine] = None,
+             incremental: bool = False, validate: bool = VALIDATE_FOREIGN_KEYS,
+             tolerant: bool = TOLERANT_LOAD, parse_processes: int = PARSE_PROCESSES,
+             use_cache: bool = CSV_CACHE, merge: bool = False):
+    """
+    Loads all data from CSV files into the database, streaming each file in batches.
+
+    Each table is loaded as soon as the tables it references are loaded, with
+    up to workers tables loading at the same time.
+
+    With incremental=True the load manifest decides what to do: unchanged and
+    completed CSVs are skipped, interrupted loads resume from their last
+    commit, and changed CSVs are reloaded together with the tables that
+    reference them.
 
+    With validate=True child rows are checked against the ids of their
+    parent tables before being sent, and the orphans go to REJECT_DIR.
+    With tolerant=True rows that fail to convert or to insert go there too,
+    with the error, instead of aborting the table.
+    With parse_processes, CSVs of at least PARSE_MIN_BYTES are parsed by that
+    many processes while the table's connection writes them.
+    With use_cache unchanged CSVs are read from their columnar cache instead
+    of being parsed again.
 
+    With merge=True nothing is emptied: the CSVs that changed since their
+    last load are merged into the existing rows (INSERT ... ON CONFLICT DO
+    UPDATE on each loader's natural_key), so a daily delta rewrites only the
+    rows that differ and readers keep seeing the other tables untouched.
+    Changed CSVs of tables without a natural_key are reported and left alone.
 
+    With partitioned tables the FKs that point to them are not enforced by
+    the database, their orphans are counted when the load ends and a
+    ValueError is raised if there are any (see check_partitioned_references).
 
+    With METRICS_ENABLED the time of every table and phase is written to
+    METRICS_DIR when the load ends (see database/instrumentation.py).
+    """
+    bind = bind or engine
+    if METRICS_ENABLED:
+        instrumentation.reset()
+        instrumentation.attach(bind)
+    start = time.perf_counter()
+    loaders = loaders_by_table()
+    dependencies = table_dependencies()
+    start_rows = {table: 0 for table in loaders}
+    rejects = RejectWriter()
+    validator = ForeignKeyValidator(rejects) if validate else None
 
+    if merge:
+        with Session(bind) as session:
+            changed = plan_merge(session, loaders)
+            session.commit()
+        start_rows = {table: 0 for table in loaders if table in changed and loaders[table].natural_key}
+        for table, loader_class in loaders.items():
+            if table not in changed:
+                print(f"= {loader_class.__name__} unchanged, skipped.")
+            elif not loader_class.natural_key:
+                print(f"! {loader_class.__name__} changed but has no natural key, not merged: reload it with run().")
+    elif incremental:
+        with Session(bind) as session:
+            start_rows = plan_reload(session, loaders, dependencies)
+            reset_tables(session, [table for table, row in start_rows.items() if row == 0])
+            for table, row in start_rows.items():
+                if row:
+                    sync_identity(session, table)
+            session.commit()
+        for table, loader_class in loaders.items():
+            if table not in start_rows:
+                print(f"= {loader_class.__name__} unchanged, skipped.")
 
+    tasks = {
+        table: partial(load_table, loaders[table], bind, start_row=row, merge=merge,
+                       batch_size=batch_size, commit_every=commit_every, method=method,
+                       validator=validator, tolerant=tolerant, rejects=rejects,
+                       parse_processes=parse_processes, use_cache=use_cache)
+        for table, row in start_rows.items()
+    }
+    results = run_in_dependency_order(tasks, dependencies, workers)
+    with Session(bind) as session:
+        check_partitioned_references(session)  # las FKs a tablas particionadas no existen en la base
+    print(f"{len(results)} table(s) loaded in {time.perf_counter() - start:.2f}s using {workers} worker(s).")
+    if METRICS_ENABLED:
+        export_metrics(results)
+    return results
 
 
+def export_metrics(results: Dict[str, CSVLoader], metrics_dir: Optional[str] = None):
+    """Writes the load metrics to metrics_dir (METRICS_DIR by default) and prints the slowest table and phase."""
+    jsonl_path, prom_path = instrumentation.export(metrics_dir or METRICS_DIR)
+    loaded = {table: instrumentation.table(table) for table in results}
+    if loaded:
+        table, metrics = max(loaded.items(), key=lambda item: item[1].load_seconds)
+        print(f"Slowest table: {table} ({metrics.load_seconds:.2f}s, mostly {metrics.bottleneck}). "
+              f"Metrics written to {jsonl_path} and {prom_path}.")
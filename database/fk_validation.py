@@ -0,0 +1,92 @@
+import threading
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+
+from database.column_spec import block_length
+from database.rejects import RejectWriter
+
+
+class IdIndex:
+    """
+    Compact set of the ids of one table. Dense ids (the usual autoincrement
+    1..N) are kept as a bitmap of one byte per id, sparse ids as a sorted
+    int64 array searched with binary search.
+    """
+    def __init__(self, ids: np.ndarray):
+        self.size = len(ids)
+        self.max_id = int(ids.max()) if len(ids) else -1
+        if len(ids) and ids.min() >= 0 and self.max_id < 4 * len(ids) + 1024:
+            self.bitmap = np.zeros(self.max_id + 1, dtype=bool)
+            self.bitmap[ids] = True
+            self.sorted_ids = None
+        else:
+            self.bitmap = None
+            self.sorted_ids = np.sort(ids)
+
+    def contains(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized membership test of an int64 array."""
+        if self.bitmap is not None:
+            found = np.zeros(len(values), dtype=bool)
+            in_range = (values >= 0) & (values <= self.max_id)
+            found[in_range] = self.bitmap[values[in_range]]
+            return found
+        if not len(self.sorted_ids):
+            return np.zeros(len(values), dtype=bool)
+        positions = np.searchsorted(self.sorted_ids, values).clip(max=len(self.sorted_ids) - 1)
+        return self.sorted_ids[positions] == values
+
+
+class ForeignKeyValidator:
+    """
+    Checks the FK columns of each block against the ids of the parent tables
+    before the block is sent, and writes the rows that would fail to a
+    reject CSV instead. The ids of a parent are read once, the first time a
+    child needs them; the scheduler only starts a child after its parents
+    are loaded.
+    """
+    def __init__(self, rejects: Optional[RejectWriter] = None):
+        self.rejects = rejects or RejectWriter()
+        self.indexes: Dict[str, IdIndex] = {}
+        self.lock = threading.Lock()
+
+    def index_for(self, session: Session, table: Table) -> IdIndex:
+        with self.lock:
+            if table.name not in self.indexes:
+                pk = table.primary_key.columns[0]
+                result = session.execute(select(pk).execution_options(yield_per=100_000)).scalars()
+                self.indexes[table.name] = IdIndex(np.fromiter(result, dtype=np.int64))
+            return self.indexes[table.name]
+
+    def filter_block(self, session: Session, table: Table, block: Dict[str, np.ndarray],
+                     csv_name: str) -> Dict[str, np.ndarray]:
+        """Returns the rows of the block whose FKs exist and rejects the others."""
+        n = block_length(block)
+        valid = np.ones(n, dtype=bool)
+        errors = np.full(n, "", dtype=object)
+
+        for fk in table.foreign_keys:
+            values = block.get(fk.parent.name)
+            if values is None:
+                continue
+            index = self.index_for(session, fk.column.table)
+            found = np.ones(n, dtype=bool)  # los NULL no referencian nada
+            present = np.not_equal(values, None) if values.dtype == object else np.ones(n, dtype=bool)
+            found[present] = index.contains(values[present].astype(np.int64))
+            errors[~found & valid] = f"{fk.parent.name} not found in {fk.column.table.name}"
+            valid &= found
+
+        if valid.all():
+            return block
+        rejected = zip(*(values[~valid].tolist() for values in block.values()))
+        self.rejects.write(rejects_file(csv_name), list(block), rejected, errors[~valid].tolist())
+        return {name: values[valid] for name, values in block.items()}
+
+
+def rejects_file(csv_name: str) -> str:
+    """Reject file of the rows of a CSV that could not be inserted."""
+    return csv_name.replace(".csv", ".rejects.csv")
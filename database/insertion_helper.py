@@ -1,13 +1,33 @@
 import csv
 import os
+import time
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 
-from config import CSV_DIR
+from config import (
+    CSV_DIR, BATCH_SIZE, COMMIT_EVERY, LOAD_METHOD, TOLERANT_LOAD, PARSE_PROCESSES, PARSE_MIN_BYTES, CSV_CACHE
+)
+from database.copy_engine import supports_copy, copy_block, relies_on_server_defaults
+from database.column_spec import (
+    ColumnSpec, convert_block, block_to_records, block_length, records_to_block, slice_block, concat_blocks
+)
+from database.csv_cache import open_cache, write_through
+from database.fk_validation import ForeignKeyValidator, rejects_file
+from database.instrumentation import instrumentation
+from database.merge import merge_block, unique_conflicts
+from database.parallel_parse import iter_parallel_blocks
+from database.partitioning import leaf_partitions, partition_key, route_block
+from database.rejects import RejectWriter
 from database.models import Base
 
 from database.models import (
@@ -26,8 +46,23 @@ from database.models import (
 
 class CSVLoader(ABC):
     """Abstract base class for loading data from CSV files into the database."""
+
+    # Columnas del CSV y cómo se convierten, se procesan por bloques en lugar de fila a fila.
+    columns: Sequence[ColumnSpec] = ()
+    # Columnas con restricción única que identifican una fila en las cargas merge; sin ellas la tabla no se puede
+    # mergear, el número de fila de un delta no dice a qué fila guardada corresponde.
+    natural_key: Sequence[str] = ()
+
     def __init__(self, session: Session):
         self.session = session
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+        self.rows_inserted = 0
+        self.rows_updated = 0
+        self.rows_unchanged = 0
+        self.rows_duplicated = 0
+        self.elapsed = 0.0
+        self.partitions = None  # particiones de la tabla si está particionada, ver load()
 
     @abstractmethod
     def get_csv_name(self) -> str:
@@ -42,193 +77,451 @@ class CSVLoader(ABC):
         """Retorna la clase del modelo ORM al que se va a insertar"""
         pass
 
-    @abstractmethod
     def map_row(self, row: Dict[str, str]) -> Dict[str, Any]:
         """
-        Mapea una fila del CSV a un diccionario compatible con insert().
+        Mapea una fila del CSV a un diccionario compatible con insert(), según columns.
+        Un loader sin columns puede sobreescribirlo para mapear fila a fila.
         """
-        pass
-
-    def load(self):
-        """Iterates through the CSV file and inserts data bulkly into the database."""
-        file_path = self.get_csv_path()
-        model = self.get_model_class()
+        block = convert_block(self.columns, list(row), [list(row.values())])
+        return block_to_records(block)[0]
 
-        with open(file_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            data = [self.map_row(row) for row in reader]
+    def iter_rows(self, skip_rows: int = 0) -> Iterator[Dict[str, Any]]:
+        """Lee el CSV como generador, devolviendo cada fila ya mapeada con map_row."""
+        with open(self.get_csv_path(), newline='', encoding='utf-8') as csvfile:
+            for row in islice(csv.DictReader(csvfile), skip_rows, None):
+                yield self.map_row(row)
 
-        self.session.execute(insert(model), data)
-        self.session.commit()
+    def iter_raw_blocks(self, batch_size: int = BATCH_SIZE, skip_rows: int = 0) -> Iterator[Tuple[List[str], List[List[str]]]]:
+        """
+        Lee el CSV en bloques de a lo sumo batch_size filas sin convertir, junto con el encabezado.
+        El tiempo de lectura y los bytes leídos se registran en instrumentation.
+        """
+        table = self.get_model_class().__tablename__
+        with open(self.get_csv_path(), newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader, [])
+            rows = islice(filter(None, reader), skip_rows, None)
+            position = 0
+            while True:
+                with instrumentation.phase(table, "read"):
+                    block = list(islice(rows, batch_size))
+                # posición en el archivo binario, avanza de a un buffer de lectura
+                read, position = csvfile.buffer.tell() - position, csvfile.buffer.tell()
+                instrumentation.count(table, bytes_read=read)
+                if not block:
+                    return
+                yield header, block
+
+    def iter_blocks(self, batch_size: int = BATCH_SIZE, skip_rows: int = 0,
+                    rejects: Optional[RejectWriter] = None, parse_processes: int = 0,
+                    use_cache: bool = False) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Devuelve el CSV en bloques de a lo sumo batch_size filas, como {columna: array}, ver parse_blocks.
+        Con use_cache los bloques se leen de la caché columnar del CSV (ver csv_cache.py) mientras su
+        hash no cambie; si no la hay, una lectura completa la escribe mientras convierte.
+        """
+        table = self.get_model_class().__tablename__
+        if use_cache and self.columns and rejects is None:
+            cached = open_cache(self.get_csv_path(), self.columns)
+            if cached is not None:
+                blocks = cached.iter_blocks(batch_size, skip_rows)
+                while True:
+                    with instrumentation.phase(table, "read"):
+                        block = next(blocks, None)
+                    if block is None:
+                        return
+                    yield block
+            if not skip_rows:
+                yield from write_through(self.get_csv_path(), self.columns,
+                                         self.parse_blocks(batch_size, 0, None, parse_processes))
+                return
+        yield from self.parse_blocks(batch_size, skip_rows, rejects, parse_processes)
+
+    def parse_blocks(self, batch_size: int = BATCH_SIZE, skip_rows: int = 0,
+                     rejects: Optional[RejectWriter] = None,
+                     parse_processes: int = 0) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Lee y convierte el CSV en bloques de a lo sumo batch_size filas, como {columna: array}.
+        Con columns cada bloque se convierte columna por columna; si no, fila a fila con map_row.
+        Con rejects, las filas que no se pueden convertir se descartan en lugar de abortar la carga
+        y cada fila lleva como id su número de fila en el CSV, que es lo que referencian las tablas hijas.
+        Con parse_processes, un CSV de al menos PARSE_MIN_BYTES se lee y convierte en ese número de
+        procesos (ver parallel_parse.py); los bloques llegan en el mismo orden del archivo.
+        """
+        table = self.get_model_class().__tablename__
+        if (parse_processes and self.columns and rejects is None
+                and os.path.getsize(self.get_csv_path()) >= PARSE_MIN_BYTES):
+            yield from iter_parallel_blocks(self.columns, self.get_csv_path(), table, batch_size,
+                                            skip_rows, parse_processes)
+            return
+        if self.columns:
+            first_id = skip_rows + 1
+            for header, rows in self.iter_raw_blocks(batch_size, skip_rows):
+                with instrumentation.phase(table, "convert"):
+                    if rejects is None:
+                        block = convert_block(self.columns, header, rows)
+                    else:
+                        block = self.convert_tolerant(header, rows, rejects, first_id)
+                yield block
+                first_id += len(rows)
+            return
+        rows = self.iter_rows(skip_rows)
+        while True:
+            # fila a fila la lectura y el mapeo no se pueden separar, se cuentan como convert
+            with instrumentation.phase(table, "convert"):
+                batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield records_to_block(batch)
+
+    def iter_batches(self, batch_size: int = BATCH_SIZE, skip_rows: int = 0) -> Iterator[List[Dict[str, Any]]]:
+        """Agrupa las filas mapeadas en listas de a lo sumo batch_size elementos."""
+        for block in self.iter_blocks(batch_size, skip_rows):
+            yield block_to_records(block)
+
+    def write_block(self, block: Dict[str, np.ndarray], use_copy: bool = False):
+        """Sends one converted block to the database, with COPY or with insert()."""
+        if not block_length(block):
+            return
+        model = self.get_model_class()
+        if use_copy and not relies_on_server_defaults(model.__table__, block):
+            key = partition_key(model.__table__)
+            if self.partitions and block[key].dtype.kind == "M":
+                # cada mes va directo a su partición, sin pasar por el ruteo de la tabla padre
+                for partition, rows in route_block(block, key, self.partitions):
+                    copy_block(self.session, partition, rows)
+            else:
+                copy_block(self.session, model.__table__, block)
+        else:
+            self.session.execute(insert(model), block_to_records(block))
+
+    def reject_unique_conflicts(self, block: Dict[str, np.ndarray], rejects: RejectWriter) -> Dict[str, np.ndarray]:
+        """Rows of a merge block that would take a unique value of another row go to rejects (see unique_conflicts)."""
+        errors = unique_conflicts(self.session, self.get_model_class().__table__, block, self.natural_key)
+        conflicts = errors != ""
+        if not conflicts.any():
+            return block
+        rows = zip(*(values[conflicts].tolist() for values in block.values()))
+        rejects.write(rejects_file(self.get_csv_name()), list(block), rows, errors[conflicts].tolist())
+        self.rows_rejected += int(conflicts.sum())
+        return {name: values[~conflicts] for name, values in block.items()}
+
+    def convert_tolerant(self, header: List[str], rows: List[List[str]], rejects: RejectWriter,
+                         first_id: int) -> Dict[str, np.ndarray]:
+        """
+        Converts a block, splitting it in halves while it fails until the bad
+        rows are isolated. Those are written, raw, to the parse error file.
+        The primary key is set explicitly from first_id, so a rejected row
+        leaves a gap instead of shifting the ids of the rows after it.
+        """
+        pk = self.get_model_class().__table__.primary_key.columns[0].name
+        try:
+            block = convert_block(self.columns, header, rows)
+            block[pk] = np.arange(first_id, first_id + len(rows), dtype=np.int64)
+            return block
+        except ValueError as error:
+            if len(rows) == 1:
+                rejects.write(self.get_csv_name().replace(".csv", ".parse_errors.csv"), header, rows, [str(error)])
+                self.rows_rejected += 1
+                return self.convert_tolerant(header, [], rejects, first_id)
+            half = len(rows) // 2
+            return concat_blocks(self.convert_tolerant(header, rows[:half], rejects, first_id),
+                                 self.convert_tolerant(header, rows[half:], rejects, first_id + half))
+
+    def write_tolerant(self, block: Dict[str, np.ndarray], use_copy: bool, rejects: RejectWriter) -> int:
+        """
+        Writes a block inside a savepoint. If the database rejects it, the
+        savepoint is rolled back and the block is split in halves until the
+        failing rows are isolated; those go to the reject file with the
+        database error. A block with k bad rows costs about k*log2(n) extra
+        statements, a clean block just the savepoint. Returns the rows written.
+        """
+        n = block_length(block)
+        if not n:
+            return 0
+        errors = (DBAPIError, self.session.get_bind().dialect.loaded_dbapi.Error)
+        try:
+            with self.session.begin_nested():
+                self.write_block(block, use_copy)
+            return n
+        except errors as error:
+            if n == 1:
+                message = str(getattr(error, "orig", error)).strip().splitlines()[0]
+                row = [values.tolist()[0] for values in block.values()]
+                rejects.write(rejects_file(self.get_csv_name()), list(block), [row], [message])
+                self.rows_rejected += 1
+                return 0
+            half = n // 2
+            return (self.write_tolerant(slice_block(block, 0, half), use_copy, rejects)
+                    + self.write_tolerant(slice_block(block, half, n), use_copy, rejects))
+
+    def load(self, batch_size: int = BATCH_SIZE, commit_every: Optional[int] = COMMIT_EVERY,
+             method: str = LOAD_METHOD, skip_rows: int = 0,
+             on_commit: Optional[Callable[[int], None]] = None,
+             validator: Optional[ForeignKeyValidator] = None,
+             tolerant: bool = TOLERANT_LOAD, rejects: Optional[RejectWriter] = None,
+             parse_processes: int = PARSE_PROCESSES, use_cache: bool = CSV_CACHE,
+             merge: bool = False) -> int:
+        """
+        Streams the CSV file into the database in batches of batch_size rows.
+
+        Only one batch is kept in memory at a time. If commit_every is set the
+        transaction is committed every commit_every batches, otherwise it is
+        committed once at the end. With method="copy" the batches are sent with
+        COPY FROM STDIN when the dialect supports it.
+
+        skip_rows resumes a previous load after its first skip_rows CSV rows.
+        on_commit is called right before every commit with the number of CSV
+        rows committed so far, so it can record progress in the same transaction.
+        With a validator, rows whose FKs do not exist are written to a reject
+        file instead of being sent, and the ids are the CSV row numbers so the
+        rows after a rejected one keep the ids their children reference
+        (load_table moves the sequence past them with sync_identity). With tolerant=True rows that cannot be
+        converted or that the database refuses (duplicates, NOT NULL, ...) are
+        written to rejects as well, with the error, and the load goes on.
+        With parse_processes, big CSVs are parsed by a pool of processes while
+        this session writes the blocks in file order (not in tolerant mode,
+        which numbers the rows as it converts them).
+        With use_cache the converted columns are read from the CSV's cache
+        instead of parsing the text again (not in tolerant mode either).
+        Into a partitioned table, COPY sends each month straight to its partition,
+        with the CSV row numbers as ids.
+        With merge=True the rows are upserted on natural_key instead of
+        appended (see merge.py): new keys are inserted, changed rows updated and
+        identical rows left alone, counted in rows_inserted, rows_updated and
+        rows_unchanged; earlier rows of a key repeated in the same batch count
+        in rows_duplicated. Tables without a natural_key cannot be merged. Rows
+        that would take a unique value (an email) of another row go to rejects.
+        Returns the number of rows inserted by this call (processed, when merging).
+
+        The time of every phase (read, convert, validate, execute, commit) and
+        the SQL statements run are recorded per table in instrumentation.
+        """
+        use_copy = method == "copy" and supports_copy(self.session)
+        start = time.perf_counter()
+        table = self.get_model_class().__table__
+        self.partitions = leaf_partitions(self.session, table) if use_copy else None
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+        self.rows_inserted = self.rows_updated = self.rows_unchanged = self.rows_duplicated = 0
+        if merge and tolerant:
+            raise ValueError("Merge loads cannot be tolerant, the whole block is merged in one statement")
+        if merge and not self.natural_key:
+            raise ValueError(f"{table.name} has no natural_key, it cannot be merged, only reloaded")
+        pk = table.primary_key.columns[0].name
+        next_id = skip_rows + 1
+        if tolerant or merge:
+            rejects = rejects or (validator.rejects if validator is not None else RejectWriter())
+
+        with instrumentation.loading(table.name):
+            blocks = self.iter_blocks(batch_size, skip_rows, rejects if tolerant else None,
+                                      parse_processes, use_cache)
+            for batch_number, block in enumerate(blocks, start=1):
+                if (self.partitions or validator is not None) and not tolerant:
+                    # al repartir el bloque por mes o al descartar huérfanos la secuencia numeraría las filas en
+                    # otro orden que el CSV, el id sale del número de fila como en la carga tolerante (antes de
+                    # filtrar, así un rechazo deja un hueco)
+                    block[pk] = np.arange(next_id, next_id + block_length(block), dtype=np.int64)
+                    next_id += block_length(block)
+                if validator is not None:
+                    with instrumentation.phase(table.name, "validate"):
+                        read = block_length(block)
+                        block = validator.filter_block(self.session, table, block, self.get_csv_name())
+                        self.rows_rejected += read - block_length(block)
+                with instrumentation.phase(table.name, "execute"):
+                    if tolerant:
+                        self.rows_loaded += self.write_tolerant(block, use_copy, rejects)
+                    elif merge:
+                        block = self.reject_unique_conflicts(block, rejects)
+                        counts = merge_block(self.session, table, block, self.natural_key, use_copy)
+                        self.rows_inserted += counts.inserted
+                        self.rows_updated += counts.updated
+                        self.rows_unchanged += counts.unchanged
+                        self.rows_duplicated += counts.duplicates
+                        self.rows_loaded += block_length(block)
+                    else:
+                        self.write_block(block, use_copy)
+                        self.rows_loaded += block_length(block)
+                if commit_every and batch_number % commit_every == 0:
+                    self._commit(skip_rows, on_commit)
+
+            self._commit(skip_rows, on_commit)
+        self.elapsed = time.perf_counter() - start
+        instrumentation.count(table.name, rows=self.rows_loaded, rows_rejected=self.rows_rejected)
+        return self.rows_loaded
+
+    def _commit(self, skip_rows: int, on_commit: Optional[Callable[[int], None]]):
+        with instrumentation.phase(self.get_model_class().__tablename__, "commit"):
+            if on_commit is not None:
+                on_commit(skip_rows + self.rows_loaded + self.rows_rejected)
+            self.session.commit()
+
+    @property
+    def rows_per_second(self) -> float:
+        """Throughput of the last load() call."""
+        return self.rows_loaded / self.elapsed if self.elapsed else 0.0
 
 
 
 class UsuarioLoader(CSVLoader):
+    natural_key = ("dni",)
+    columns = (
+        ColumnSpec("Nombre", "nombre"),
+        ColumnSpec("Apellido", "apellido"),
+        ColumnSpec("DNI", "dni"),
+        ColumnSpec("Email", "email"),
+        ColumnSpec("Contraseña", "contrasena"),
+    )
+
     def get_csv_name(self) -> str:
         return "2.Usuarios.csv"
 
     def get_model_class(self):
         return Usuario
 
-    def map_row(self, row):
-        return {
-            "nombre": row["Nombre"],
-            "apellido": row["Apellido"],
-            "dni": row["DNI"],
-            "email": row["Email"],
-            "contrasena": row["Contraseña"]  # <- bien escrito
-        }
-    
-
 class CategoriaLoader(CSVLoader):
+    natural_key = ("nombre",)
+    columns = (
+        ColumnSpec("Nombre", "nombre"),
+        ColumnSpec("Descripcion", "descripcion", nullable=True),
+    )
+
     def get_csv_name(self) -> str:
         return "3.Categorias.csv"
 
     def get_model_class(self):
         return Categoria
 
-    def map_row(self, row):
-        return {
-            "nombre": row["Nombre"],
-            "descripcion": row.get("Descripcion")  # puede ser null
-        }
 class ProductoLoader(CSVLoader):
+    natural_key = ("nombre",)
+    columns = (
+        ColumnSpec("Nombre", "nombre"),
+        ColumnSpec("Descripcion", "descripcion", nullable=True),
+        ColumnSpec("Precio", "precio", Decimal),
+        ColumnSpec("Stock", "stock", int),
+        ColumnSpec("CategoriaID", "categoria_id", int),
+    )
+
     def get_csv_name(self) -> str:
         return "4.Productos.csv"
 
     def get_model_class(self):
         return Producto
 
-    def map_row(self, row):
-        return {
-            "nombre": row["Nombre"],
-            "descripcion": row.get("Descripcion"),
-            "precio": float(row["Precio"]),
-            "stock": int(row["Stock"]),
-            "categoria_id": int(row["CategoriaID"])
-        }
-
 class OrdenLoader(CSVLoader):
+    columns = (
+        ColumnSpec("UsuarioID", "usuario_id", int),
+        ColumnSpec("Total", "total", Decimal),
+        ColumnSpec("Estado", "estado", default="Pendiente"),
+        ColumnSpec("FechaOrden", "fecha_orden", datetime, nullable=True),
+    )
+
     def get_csv_name(self) -> str:
         return "5.Ordenes.csv"
 
     def get_model_class(self):
         return Orden
 
-    def map_row(self, row):
-        return {
-            "usuario_id": int(row["UsuarioID"]),
-            "total": float(row["Total"]),
-            "estado": row.get("Estado", "Pendiente"),
-            "fecha_orden" : row.get("FechaOrden")  # puede ser null
-            # Si fecha_orden es null, se autocompleta con la fecha actual
-        }
-
 class DetalleOrdenLoader(CSVLoader):
+    columns = (
+        ColumnSpec("OrdenID", "orden_id", int),
+        ColumnSpec("ProductoID", "producto_id", int),
+        ColumnSpec("Cantidad", "cantidad", int),
+        ColumnSpec("PrecioUnitario", "precio_unitario", Decimal),
+    )
+
     def get_csv_name(self) -> str:
         return "6.detalle_ordenes.csv"
 
     def get_model_class(self):
         return DetalleOrden
 
-    def map_row(self, row):
-        return {
-            "orden_id": int(row["OrdenID"]),
-            "producto_id": int(row["ProductoID"]),
-            "cantidad": int(row["Cantidad"]),
-            "precio_unitario": float(row["PrecioUnitario"])
-        }
-
 class DireccionEnvioLoader(CSVLoader):
+    columns = (
+        ColumnSpec("UsuarioID", "usuario_id", int),
+        ColumnSpec("Calle", "calle"),
+        ColumnSpec("Ciudad", "ciudad"),
+        ColumnSpec("Departamento", "departamento", nullable=True),
+        ColumnSpec("Provincia", "provincia", nullable=True),
+        ColumnSpec("Distrito", "distrito", nullable=True),
+        ColumnSpec("Estado", "estado", nullable=True),
+        ColumnSpec("CodigoPostal", "codigo_postal", nullable=True),
+        ColumnSpec("Pais", "pais"),
+    )
+
     def get_csv_name(self) -> str:
         return "7.direcciones_envio.csv"
 
     def get_model_class(self):
         return DireccionEnvio
 
-    def map_row(self, row):
-        return {
-            "usuario_id": int(row["UsuarioID"]),
-            "calle": row["Calle"],
-            "ciudad": row["Ciudad"],
-            "departamento": row.get("Departamento"),
-            "provincia": row.get("Provincia"),
-            "distrito": row.get("Distrito"),
-            "estado": row.get("Estado"),
-            "codigo_postal": row.get("CodigoPostal"),
-            "pais": row["Pais"]
-        }
-
 class CarritoLoader(CSVLoader):
+    columns = (
+        ColumnSpec("UsuarioID", "usuario_id", int),
+        ColumnSpec("ProductoID", "producto_id", int),
+        ColumnSpec("Cantidad", "cantidad", int),
+        ColumnSpec("FechaAgregado", "fecha_agregado", datetime, nullable=True),
+    )
+
     def get_csv_name(self) -> str:
         return "8.carrito.csv"
 
     def get_model_class(self):
         return Carrito
 
-    def map_row(self, row):
-        return {
-            "usuario_id": int(row["UsuarioID"]),
-            "producto_id": int(row["ProductoID"]),
-            "cantidad": int(row["Cantidad"]),
-            "fecha_agregado": row.get("FechaAgregado")   # puede ser null
-                            }
-
 class MetodoPagoLoader(CSVLoader):
+    natural_key = ("nombre",)
+    columns = (
+        ColumnSpec("Nombre", "nombre"),
+        ColumnSpec("Descripcion", "descripcion", nullable=True),
+    )
+
     def get_csv_name(self) -> str:
         return "9.metodos_pago.csv"
 
     def get_model_class(self):
         return MetodoPago
 
-    def map_row(self, row):
-        return {
-            "nombre": row["Nombre"],
-            "descripcion": row.get("Descripcion")
-        }
-
 class OrdenMetodoPagoLoader(CSVLoader):
+    natural_key = ("orden_id", "metodo_pago_id")
+    columns = (
+        ColumnSpec("OrdenID", "orden_id", int),
+        ColumnSpec("MetodoPagoID", "metodo_pago_id", int),
+        ColumnSpec("MontoPagado", "monto_pagado", Decimal),
+    )
+
     def get_csv_name(self) -> str:
         return "10.ordenes_metodospago.csv"
 
     def get_model_class(self):
         return OrdenMetodoPago
 
-    def map_row(self, row):
-        return {
-            "orden_id": int(row["OrdenID"]),
-            "metodo_pago_id": int(row["MetodoPagoID"]),
-            "monto_pagado": float(row["MontoPagado"])
-        }
-
 class ResenaProductoLoader(CSVLoader):
+    columns = (
+        ColumnSpec("UsuarioID", "usuario_id", int),
+        ColumnSpec("ProductoID", "producto_id", int),
+        ColumnSpec("Calificacion", "calificacion", int),
+        ColumnSpec("Comentario", "comentario", nullable=True),
+        ColumnSpec("Fecha", "fecha", datetime, nullable=True),
+    )
+
     def get_csv_name(self) -> str:
         return "11.resenas_productos.csv"
 
     def get_model_class(self):
         return ResenaProducto
 
-    def map_row(self, row):
-        return {
-            "usuario_id": int(row["UsuarioID"]),
-            "producto_id": int(row["ProductoID"]),
-            "calificacion": int(row["Calificacion"]),
-            "comentario": row.get("Comentario"),
-             "fecha": row.get("Fecha")  
-             }
-
 class HistorialPagoLoader(CSVLoader):
+    columns = (
+        ColumnSpec("OrdenID", "orden_id", int),
+        ColumnSpec("MetodoPagoID", "metodo_pago_id", int),
+        ColumnSpec("Monto", "monto", Decimal),
+        ColumnSpec("EstadoPago", "estado_pago", default="Procesando"),
+        ColumnSpec("FechaPago", "fecha_pago", datetime, nullable=True),
+    )
+
     def get_csv_name(self) -> str:
         return "12.historial_pagos.csv"
 
     def get_model_class(self):
         return HistorialPago
-
-    def map_row(self, row):
-        return {
-            "orden_id": int(row["OrdenID"]),
-            "metodo_pago_id": int(row["MetodoPagoID"]),
-            "monto": float(row["Monto"]),
-            "estado_pago": row.get("EstadoPago", "Procesando"),
-            "fecha_pago": row.get("FechaPago")  # puede ser null
-        }
\ No newline at end of file
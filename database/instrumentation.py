@@ -0,0 +1,223 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SLOW_STATEMENTS
+
+
+logger = logging.getLogger("ecommerce.metrics")
+
+# Fases de la carga de un CSV, en el orden en que ocurren
+PHASES = ("read", "convert", "validate", "execute", "commit")
+OUTSIDE_LOADS = "-"  # tabla a la que se asignan las sentencias que no son parte de una carga
+
+
+@dataclass
+class TableMetrics:
+    """Counters of one table: seconds per phase, volume and SQL statements."""
+    phases: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))
+    rows: int = 0
+    rows_rejected: int = 0
+    bytes_read: int = 0
+    statements: int = 0
+    statement_seconds: float = 0.0
+
+    @property
+    def load_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.load_seconds if self.load_seconds else 0.0
+
+    @property
+    def bottleneck(self) -> str:
+        return max(self.phases, key=self.phases.get)
+
+    def summary(self) -> str:
+        return " · ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases.items() if seconds)
+
+
+class Instrumentation:
+    """
+    Collects where the time of a load goes, per table and per phase.
+
+    CSVLoader times its phases with phase(): reading and tokenizing the CSV,
+    converting the rows, validating FKs, executing the SQL and committing.
+    Engines passed to attach() also report every statement they run, through
+    SQLAlchemy's cursor execute events, to the table being loaded by that
+    thread (see loading()), and keep the slowest ones. export() writes it
+    all as JSON lines and in Prometheus text format.
+    """
+    def __init__(self, slow_statements: int = SLOW_STATEMENTS):
+        self.slow_statements = slow_statements
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.engines = set()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.tables: Dict[str, TableMetrics] = {}
+            self.slowest: List[Tuple[float, int, str, str]] = []  # heap de (segundos, n, tabla, sentencia)
+            self.counter = itertools.count()
+
+    def table(self, name: str) -> TableMetrics:
+        metrics = self.tables.get(name)
+        if metrics is None:
+            with self.lock:
+                metrics = self.tables.setdefault(name, TableMetrics())
+        return metrics
+
+    @contextmanager
+    def loading(self, table: str) -> Iterator[None]:
+        """Attributes the statements run by this thread to table while the block runs."""
+        previous = getattr(self.local, "table", None)
+        self.local.table = table
+        try:
+            yield
+        finally:
+            self.local.table = previous
+
+    @contextmanager
+    def phase(self, table: str, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(table, name, time.perf_counter() - start)
+
+    def add_time(self, table: str, phase: str, seconds: float):
+        metrics = self.table(table)
+        with self.lock:
+            metrics.phases[phase] += seconds
+
+    def count(self, table: str, **counters: int):
+        """Adds to the rows, rows_rejected or bytes_read of a table."""
+        metrics = self.table(table)
+        with self.lock:
+            for name, value in counters.items():
+                setattr(metrics, name, getattr(metrics, name) + value)
+
+    def record_statement(self, statement: str, seconds: float, table: Optional[str] = None):
+        """Counts a statement and keeps it if it is among the slow_statements slowest."""
+        table = table or getattr(self.local, "table", None) or OUTSIDE_LOADS
+        metrics = self.table(table)
+        entry = (seconds, next(self.counter), table, " ".join(statement.split())[:500])
+        with self.lock:
+            metrics.statements += 1
+            metrics.statement_seconds += seconds
+            if len(self.slowest) < self.slow_statements:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def attach(self, engine: Engine):
+        """
+        Times every statement the engine executes, also the ones that fail
+        (the tolerant loader fails statements on purpose). Attaching the same
+        engine twice does nothing.
+        """
+        if engine in self.engines:
+            return
+        self.engines.add(engine)
+
+        # el inicio se guarda en el contexto de la ejecución, no en la conexión: si la sentencia falla
+        # no hay after_cursor_execute, y un inicio apilado en la conexión quedaría para la siguiente
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context.query_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            self.record_statement(statement, time.perf_counter() - context.query_start)
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            context = exception_context.execution_context
+            start = getattr(context, "query_start", None)
+            if start is not None:
+                self.record_statement(exception_context.statement or "", time.perf_counter() - start)
+
+    def slowest_statements(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            entries = sorted(self.slowest, reverse=True)
+        return [{"table": table, "seconds": round(seconds, 6), "statement": statement}
+                for seconds, _, table, statement in entries]
+
+    def records(self) -> List[Dict[str, Any]]:
+        """The metrics as structured records: one per table and one per slow statement."""
+        records = []
+        for name, metrics in sorted(self.tables.items()):
+            records.append({
+                "event": "table_metrics",
+                "table": name,
+                "phases": {phase: round(seconds, 6) for phase, seconds in metrics.phases.items()},
+                "bottleneck": metrics.bottleneck if metrics.load_seconds else None,
+                "rows": metrics.rows,
+                "rows_rejected": metrics.rows_rejected,
+                "bytes_read": metrics.bytes_read,
+                "rows_per_second": round(metrics.rows_per_second, 1),
+                "statements": metrics.statements,
+                "statement_seconds": round(metrics.statement_seconds, 6),
+            })
+        for entry in self.slowest_statements():
+            records.append({"event": "slow_statement", **entry})
+        return records
+
+    def prometheus(self) -> str:
+        """The per-table counters in Prometheus text exposition format."""
+        metrics = [
+            ("ecommerce_load_phase_seconds_total", "counter", "Seconds spent in each phase of a CSV load.",
+             lambda m: [({"phase": phase}, seconds) for phase, seconds in m.phases.items() if m.load_seconds]),
+            ("ecommerce_load_rows_total", "counter", "Rows inserted.", lambda m: [({}, m.rows)]),
+            ("ecommerce_load_rows_rejected_total", "counter", "Rows sent to the reject files.",
+             lambda m: [({}, m.rows_rejected)]),
+            ("ecommerce_load_bytes_read_total", "counter", "Bytes read from the CSV.", lambda m: [({}, m.bytes_read)]),
+            ("ecommerce_load_rows_per_second", "gauge", "Rows inserted per second of load.",
+             lambda m: [({}, m.rows_per_second)]),
+            ("ecommerce_sql_statements_total", "counter", "SQL statements executed.", lambda m: [({}, m.statements)]),
+            ("ecommerce_sql_statement_seconds_total", "counter", "Seconds spent executing SQL statements.",
+             lambda m: [({}, m.statement_seconds)]),
+        ]
+        lines = []
+        for name, kind, help_text, samples in metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for table, table_metrics in sorted(self.tables.items()):
+                for labels, value in samples(table_metrics):
+                    labels = ",".join(f'{key}="{label}"' for key, label in {"table": table, **labels}.items())
+                    lines.append(f"{name}{{{labels}}} {value:g}" if isinstance(value, float)
+                                 else f"{name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, metrics_dir: str) -> Tuple[str, str]:
+        """
+        Writes metrics.jsonl and metrics.prom to metrics_dir, logs every
+        record to the "ecommerce.metrics" logger and returns both paths.
+        """
+        os.makedirs(metrics_dir, exist_ok=True)
+        jsonl_path = os.path.join(metrics_dir, "metrics.jsonl")
+        prom_path = os.path.join(metrics_dir, "metrics.prom")
+        with open(jsonl_path, "w", encoding="utf-8") as file:
+            for record in self.records():
+                line = json.dumps(record, ensure_ascii=False)
+                file.write(line + "\n")
+                logger.info(line)
+        with open(prom_path, "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+        return jsonl_path, prom_path
+
+
+# Instancia compartida por los loaders y los engines
+instrumentation = Instrumentation()
@@ -0,0 +1,153 @@
+import os
+
+from typing import Dict, Iterable, Optional, Set, Type
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session
+
+from database.csv_cache import file_hash
+from database.insertion_helper import CSVLoader
+from database.models import Base, LoadManifest
+
+
+COMPLETED = "completed"
+IN_PROGRESS = "in_progress"
+FAILED = "failed"
+DROPPED = "dropped"  # las tablas se borraron con drop_tables, la entrada queda para que la versión siga subiendo
+
+
+def is_unchanged(entry: LoadManifest, path: str) -> bool:
+    """
+    Compares the CSV with the one recorded in the manifest.
+    The hash is only computed when the size matches but the mtime does not.
+    """
+    stat = os.stat(path)
+    if stat.st_size != entry.file_size:
+        return False
+    if stat.st_mtime == entry.file_mtime:
+        return True
+    if file_hash(path) != entry.content_hash:
+        return False
+    entry.file_mtime = stat.st_mtime
+    return True
+
+
+def plan_reload(session: Session, loaders: Dict[str, Type[CSVLoader]],
+                dependencies: Dict[str, Set[str]]) -> Dict[str, int]:
+    """
+    Decides which tables must be loaded and from which CSV row.
+
+    Returns {table: start_row} only for the tables that need work: 0 for
+    tables that must be emptied and reloaded (no manifest entry, the CSV
+    changed, or a referenced table is reloaded and its ids change), and the
+    committed row count for loads that did not finish. Tables whose CSV is
+    unchanged and completely loaded are left out.
+    """
+    plan: Dict[str, int] = {}
+    for table in Base.metadata.sorted_tables:
+        if table.name not in loaders:
+            continue
+        loader = loaders[table.name](session)
+        entry = session.get(LoadManifest, type(loader).__name__)
+        if (entry is None
+                or any(plan.get(parent) == 0 for parent in dependencies.get(table.name, ()))
+                or not is_unchanged(entry, loader.get_csv_path())):
+            plan[table.name] = 0
+        elif entry.status != COMPLETED:
+            plan[table.name] = entry.rows_loaded
+    return plan
+
+
+def plan_merge(session: Session, loaders: Dict[str, Type[CSVLoader]]) -> Set[str]:
+    """
+    Tables a merge load has to go through: those whose CSV changed since
+    its last completed load, or that were never loaded through the manifest.
+    Unlike plan_reload, the tables that reference them are not included,
+    since a merge keeps the ids of existing rows.
+    """
+    tables = set()
+    for table, loader_class in loaders.items():
+        loader = loader_class(session)
+        entry = session.get(LoadManifest, type(loader).__name__)
+        if entry is None or entry.status != COMPLETED or not is_unchanged(entry, loader.get_csv_path()):
+            tables.add(table)
+    return tables
+
+
+def reset_tables(session: Session, tables: Iterable[str]):
+    """Empties the given tables and restarts their ids, children first."""
+    names = set(tables)
+    to_reset = [table for table in Base.metadata.sorted_tables if table.name in names]
+    if not to_reset:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        preparer = session.get_bind().dialect.identifier_preparer
+        session.execute(text("TRUNCATE TABLE {} RESTART IDENTITY".format(
+            ", ".join(preparer.format_table(table) for table in to_reset))))
+    else:
+        for table in reversed(to_reset):
+            session.execute(delete(table))
+    bump_versions(session, [table.name for table in to_reset])
+
+
+def bump_versions(session: Session, tables: Iterable[str]):
+    """Marks the data of the given tables as changed, so cached query results that read them are dropped."""
+    session.execute(update(LoadManifest).where(LoadManifest.table_name.in_(list(tables)))
+                    .values(data_version=LoadManifest.data_version + 1))
+
+
+def mark_dropped(session: Session):
+    """
+    Marks every entry as not loaded after drop_tables, so the next load
+    (incremental or not) starts from scratch. The data versions are bumped
+    instead of starting over at 0, a reloaded table never gets a version a
+    cached query result already saw.
+    """
+    session.execute(update(LoadManifest).values(status=DROPPED, rows_loaded=0,
+                                                data_version=LoadManifest.data_version + 1))
+
+
+def data_versions(session: Session, tables: Iterable[str]) -> Dict[str, Optional[int]]:
+    """Current data version of each table, None for tables never loaded through the manifest."""
+    tables = list(tables)
+    versions = dict(session.execute(select(LoadManifest.table_name, LoadManifest.data_version)
+                                    .where(LoadManifest.table_name.in_(tables))).all())
+    return {table: versions.get(table) for table in tables}
+
+
+def sync_identity(session: Session, table_name: str):
+    """
+    Moves the id sequence of a partially loaded table back to MAX(id) + 1.
+    Sequence values consumed by a rolled back batch would otherwise leave
+    gaps, and the ids of the resumed rows would no longer match the CSV
+    row numbers that child tables reference.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    table = Base.metadata.tables[table_name]
+    pk = table.primary_key.columns[0]
+    session.execute(
+        select(func.setval(func.pg_get_serial_sequence(table.name, pk.name),
+                           func.coalesce(func.max(pk), 0) + 1, False))
+    )
+
+
+def start_entry(session: Session, loader: CSVLoader, start_row: int, bump: bool = True) -> LoadManifest:
+    """
+    Creates or updates the manifest entry of a loader before it starts
+    loading. bump=False keeps the data version, for merges that may not
+    change anything.
+    """
+    path = loader.get_csv_path()
+    stat = os.stat(path)
+    entry = session.get(LoadManifest, type(loader).__name__) or LoadManifest(loader=type(loader).__name__, data_version=0)
+    entry.table_name = loader.get_model_class().__tablename__
+    entry.data_version += 1 if bump else 0
+    entry.csv_path = path
+    entry.file_size = stat.st_size
+    entry.file_mtime = stat.st_mtime
+    entry.content_hash = file_hash(path)
+    entry.rows_loaded = start_row
+    entry.status = IN_PROGRESS
+    session.add(entry)
+    return entry
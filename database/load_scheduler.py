@@ -0,0 +1,112 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from sqlalchemy import MetaData
+
+from database.models import Base
+
+
+def table_dependencies(metadata: MetaData = Base.metadata) -> Dict[str, Set[str]]:
+    """Returns, for each table, the set of tables its foreign keys point to."""
+    return {
+        name: {fk.column.table.name for fk in table.foreign_keys} - {name}
+        for name, table in metadata.tables.items()
+    }
+
+
+def run_in_dependency_order(
+    tasks: Dict[str, Callable[[], Any]],
+    dependencies: Optional[Dict[str, Set[str]]] = None,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Runs one task per table on a thread pool, starting each task as soon as
+    the tasks of all its parent tables have finished.
+
+    Parents without a task are considered already loaded. If a task fails no
+    new tasks are started and the exception is raised once the running ones
+    finish. Returns the result of every task keyed by table name.
+    """
+    if dependencies is None:
+        dependencies = table_dependencies()
+
+    pending = {name: dependencies.get(name, set()) & tasks.keys() for name in tasks}
+    cycle = [name for name in pending if name in pending[name]]
+    if cycle:
+        raise ValueError(f"Tables depend on themselves: {cycle}")
+
+    results: Dict[str, Any] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        running = {}
+
+        def submit_ready():
+            for name in [name for name, parents in pending.items() if not parents]:
+                del pending[name]
+                running[executor.submit(tasks[name])] = name
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    wait(running)
+                    raise error
+                results[name] = future.result()
+                for parents in pending.values():
+                    parents.discard(name)
+            submit_ready()
+
+    if pending:
+        raise ValueError(f"Circular foreign keys between tables: {sorted(pending)}")
+    return results
+
+
+async def run_async_in_dependency_order(
+    tasks: Dict[str, Callable[[], Awaitable[Any]]],
+    dependencies: Optional[Dict[str, Set[str]]] = None,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Same as run_in_dependency_order for coroutines: at most workers tasks
+    run at the same time on the event loop, each one as soon as its parent
+    tables are loaded.
+    """
+    if dependencies is None:
+        dependencies = table_dependencies()
+
+    pending = {name: dependencies.get(name, set()) & tasks.keys() for name in tasks}
+    cycle = [name for name in pending if name in pending[name]]
+    if cycle:
+        raise ValueError(f"Tables depend on themselves: {cycle}")
+
+    results: Dict[str, Any] = {}
+    running: Dict[asyncio.Task, str] = {}
+
+    def submit_ready():
+        ready = [name for name, parents in pending.items() if not parents]
+        for name in ready[:max(1, workers) - len(running)]:
+            del pending[name]
+            running[asyncio.create_task(tasks[name]())] = name
+
+    submit_ready()
+    while running:
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name = running.pop(task)
+            error = task.exception()
+            if error is not None:
+                if running:
+                    await asyncio.wait(running)
+                raise error
+            results[name] = task.result()
+            for parents in pending.values():
+                parents.discard(name)
+        submit_ready()
+
+    if pending:
+        raise ValueError(f"Circular foreign keys between tables: {sorted(pending)}")
+    return results
@@ -0,0 +1,156 @@
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from sqlalchemy import Column, MetaData, Table, Text, and_, cast, delete, exists, func, insert, literal, or_, select, true, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from database.column_spec import block_length, block_to_records
+from database.copy_engine import copy_block
+
+
+# insert() con ON CONFLICT de cada dialecto que lo soporta
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class MergeCounts(NamedTuple):
+    inserted: int
+    updated: int
+    unchanged: int
+    duplicates: int  # filas repetidas de una clave en el mismo bloque, solo cuenta la última
+
+
+def stage_table(table: Table, columns: Sequence[str]) -> Table:
+    """
+    Temporary table with the given columns of a table, where each block is
+    staged before being merged. It lives as long as the connection.
+    """
+    return Table(f"{table.name}_stage", MetaData(), *[Column(name, table.c[name].type) for name in columns],
+                 prefixes=["TEMPORARY"])
+
+
+def last_per_key(block: Dict[str, np.ndarray], key: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Keeps the last row of each key, as if the block had been merged row by
+    row: one ON CONFLICT statement cannot update the same row twice.
+    """
+    last = {row_key: row for row, row_key in enumerate(zip(*(block[column].tolist() for column in key)))}
+    if len(last) == block_length(block):
+        return block
+    rows = np.array(sorted(last.values()))
+    return {column: values[rows] for column, values in block.items()}
+
+
+def unique_conflicts(session: Session, table: Table, block: Dict[str, np.ndarray], key: Sequence[str]) -> np.ndarray:
+    """
+    Error of each row of the block ("" when none) whose value in another
+    unique column of the table, like usuarios.email, already belongs to a
+    stored row or an earlier row of the block with a different key. The
+    upsert only resolves conflicts on key, one of these would abort it.
+    """
+    n = block_length(block)
+    errors = np.full(n, "", dtype=object)
+    keys = list(zip(*(block[column].tolist() for column in key)))
+    for column in table.columns:
+        if not column.unique or column.name in key or column.name not in block:
+            continue
+        values = block[column.name].tolist()
+        present = list({value for value in values if value is not None})
+        owners = {row[0]: tuple(row[1:]) for row in session.execute(
+            select(column, *[table.c[name] for name in key]).where(column.in_(present)))} if present else {}
+        for row, value in enumerate(values):
+            if value is None or errors[row]:
+                continue
+            if owners.setdefault(value, keys[row]) != keys[row]:
+                errors[row] = f"{column.name} already belongs to another row of {table.name}"
+    return errors
+
+
+def content_changed(dialect: str, old: List[ColumnElement], new: List[ColumnElement]) -> ColumnElement:
+    """
+    True when the stored row differs from the incoming one. On PostgreSQL
+    each side is reduced to one md5 of the row's text, compared once; SQLite
+    has no md5 and compares the columns with IS NOT.
+    """
+    if dialect == "postgresql":
+        return func.md5(cast(tuple_(*old), Text)) != func.md5(cast(tuple_(*new), Text))
+    return or_(*[current.is_distinct_from(incoming) for current, incoming in zip(old, new)])
+
+
+def staged_value(table: Table, stage: Table, on_key: ColumnElement, name: str) -> ColumnElement:
+    """
+    What the merge writes for a staged column. A NULL in a NOT NULL column
+    with a server default (an empty date in the CSV) keeps the stored value
+    of an existing row and takes the default in a new one, like insert() does.
+    """
+    column = table.c[name]
+    if column.nullable or column.server_default is None:
+        return stage.c[name]
+    default = column.server_default.arg
+    return func.coalesce(stage.c[name], select(column).where(on_key).scalar_subquery(),
+                         literal(default) if isinstance(default, str) else default)
+
+
+def merge_block(session: Session, table: Table, block: Dict[str, np.ndarray], key: Sequence[str],
+                use_copy: bool = False) -> MergeCounts:
+    """
+    Merges a converted block into the table on its key columns, as one
+    set-based statement: the block is written to a temporary stage table
+    (with COPY when possible) and then
+
+        INSERT INTO table SELECT ... FROM stage
+        ON CONFLICT (key) DO UPDATE SET ... WHERE <content changed>
+
+    Rows with a new key are inserted, rows whose content changed are
+    updated, and identical rows are not written at all, so they cost no
+    new row version. Returns how many rows fell in each case, plus the
+    earlier rows of keys repeated in the block, which are not merged.
+    """
+    n = block_length(block)
+    if not n:
+        return MergeCounts(0, 0, 0, 0)
+    dialect = session.get_bind().dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise ValueError(f"Merge loads need INSERT ... ON CONFLICT, not available on {dialect!r}")
+    block = last_per_key(block, key)
+    columns = list(block)
+    stage = stage_table(table, columns)
+    connection = session.connection()
+    stage.create(connection, checkfirst=True)
+    session.execute(delete(stage))
+    if use_copy:
+        copy_block(session, stage, block)
+    else:
+        session.execute(insert(stage), block_to_records(block))
+
+    on_key = and_(*[table.c[column] == stage.c[column] for column in key])
+    matched = session.execute(select(func.count()).select_from(stage).where(exists().where(on_key))).scalar_one()
+
+    values = [staged_value(table, stage, on_key, column) for column in columns]
+    pk = table.primary_key.columns[0]
+    if dialect == "postgresql" and pk.name not in columns:
+        # el default serial tomaría un valor de la secuencia también por cada fila en conflicto,
+        # las filas existentes conservan su id y solo las nuevas piden uno
+        columns.append(pk.name)
+        values.append(func.coalesce(select(pk).where(on_key).scalar_subquery(),
+                                    func.nextval(func.pg_get_serial_sequence(table.name, pk.name))))
+    rows = select(*values).select_from(stage)
+    # WHERE true: sin él SQLite confunde el ON CONFLICT con un JOIN del SELECT
+    upsert = UPSERT_INSERTS[dialect](table).from_select(columns, rows.where(true()))
+    updated = [column for column in columns if column not in key and not table.c[column].primary_key]
+    if updated:
+        statement = upsert.on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: upsert.excluded[column] for column in updated},
+            where=content_changed(dialect, [table.c[column] for column in updated],
+                                  [upsert.excluded[column] for column in updated]),
+        )
+    else:
+        statement = upsert.on_conflict_do_nothing(index_elements=list(key))
+    written = session.execute(statement).rowcount
+
+    merged = block_length(block)
+    inserted = merged - matched
+    return MergeCounts(inserted, written - inserted, merged - written, n - merged)
@@ -1,7 +1,7 @@
 from typing import List, Optional
 from datetime import datetime
 from sqlalchemy import (
-    String, Integer, ForeignKey, DECIMAL, Text, TIMESTAMP, text
+    String, Integer, BigInteger, Float, ForeignKey, DECIMAL, Text, TIMESTAMP, UniqueConstraint, text
 )
 from sqlalchemy.orm import (
     DeclarativeBase, mapped_column, Mapped, relationship
@@ -36,7 +36,7 @@ class Categoria(Base):
     __tablename__ = "categorias"
 
     categoria_id: Mapped[int] = mapped_column("categoria_id", Integer, primary_key=True, autoincrement=True)
-    nombre: Mapped[str] = mapped_column("nombre", String(100), nullable=False)
+    nombre: Mapped[str] = mapped_column("nombre", String(100), unique=True, nullable=False)
     descripcion: Mapped[Optional[str]] = mapped_column("descripcion", String(255), nullable=True)
 
     productos: Mapped[List["Producto"]] = relationship(back_populates="categoria", cascade="all, delete-orphan")
@@ -49,11 +49,11 @@ class Producto(Base):
     __tablename__ = "productos"
 
     producto_id: Mapped[int] = mapped_column("producto_id", Integer, primary_key=True, autoincrement=True)
-    nombre: Mapped[str] = mapped_column("nombre", String(255), nullable=False)
+    nombre: Mapped[str] = mapped_column("nombre", String(255), unique=True, nullable=False)
     descripcion: Mapped[Optional[str]] = mapped_column("descripcion", Text, nullable=True)
     precio: Mapped[float] = mapped_column("precio", DECIMAL(10, 2), nullable=False)
     stock: Mapped[int] = mapped_column("stock", Integer, nullable=False)
-    categoria_id: Mapped[int] = mapped_column("categoria_id", ForeignKey("categorias.categoria_id"))
+    categoria_id: Mapped[int] = mapped_column("categoria_id", ForeignKey("categorias.categoria_id"), index=True)
 
     categoria: Mapped["Categoria"] = relationship(back_populates="productos")
     detalle_ordenes: Mapped[List["DetalleOrden"]] = relationship(back_populates="producto", cascade="all, delete-orphan")
@@ -66,9 +66,11 @@ class Producto(Base):
 
 class Orden(Base):
     __tablename__ = "ordenes"
+    # Con PARTITIONED_TABLES se crea particionada por mes de fecha_orden (ver partitioning.py)
+    __table_args__ = {"info": {"partition_by": "fecha_orden"}}
 
     orden_id: Mapped[int] = mapped_column("orden_id", Integer, primary_key=True, autoincrement=True)
-    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"))
+    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"), index=True)
     fecha_orden: Mapped[datetime] = mapped_column("fecha_orden", TIMESTAMP, nullable=False,server_default= text("CURRENT_TIMESTAMP"))
     total: Mapped[float] = mapped_column("total", DECIMAL(10, 2), nullable=False)
     estado: Mapped[str] = mapped_column("estado", String(50), nullable=False, server_default="Pendiente")
@@ -86,8 +88,8 @@ class DetalleOrden(Base):
     __tablename__ = "detalle_ordenes"
 
     detalle_id: Mapped[int] = mapped_column("detalle_id", Integer, primary_key=True, autoincrement=True)
-    orden_id: Mapped[int] = mapped_column("orden_id", ForeignKey("ordenes.orden_id"))
-    producto_id: Mapped[int] = mapped_column("producto_id", ForeignKey("productos.producto_id"))
+    orden_id: Mapped[int] = mapped_column("orden_id", ForeignKey("ordenes.orden_id"), index=True)
+    producto_id: Mapped[int] = mapped_column("producto_id", ForeignKey("productos.producto_id"), index=True)
     cantidad: Mapped[int] = mapped_column("cantidad", Integer, nullable=False)
     precio_unitario: Mapped[float] = mapped_column("precio_unitario", DECIMAL(10, 2), nullable=False)
 
@@ -102,7 +104,7 @@ class DireccionEnvio(Base):
     __tablename__ = "direcciones_envio"
 
     direccion_id: Mapped[int] = mapped_column("direccion_id", Integer, primary_key=True, autoincrement=True)
-    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"))
+    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"), index=True)
     calle: Mapped[str] = mapped_column("calle", String(255), nullable=False)
     ciudad: Mapped[str] = mapped_column("ciudad", String(100), nullable=False)
     departamento: Mapped[Optional[str]] = mapped_column("departamento", String(100))
@@ -122,8 +124,8 @@ class Carrito(Base):
     __tablename__ = "carrito"
 
     carrito_id: Mapped[int] = mapped_column("carrito_id", Integer, primary_key=True, autoincrement=True)
-    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"))
-    producto_id: Mapped[int] = mapped_column("producto_id", ForeignKey("productos.producto_id"))
+    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"), index=True)
+    producto_id: Mapped[int] = mapped_column("producto_id", ForeignKey("productos.producto_id"), index=True)
     cantidad: Mapped[int] = mapped_column("cantidad", Integer, nullable=False)
     fecha_agregado: Mapped[datetime] = mapped_column("fecha_agregado", TIMESTAMP, nullable=False,server_default= text("CURRENT_TIMESTAMP"))
 
@@ -138,7 +140,7 @@ class MetodoPago(Base):
     __tablename__ = "metodos_pago"
 
     metodo_pago_id: Mapped[int] = mapped_column("metodo_pago_id", Integer, primary_key=True, autoincrement=True)
-    nombre: Mapped[str] = mapped_column("nombre", String(100), nullable=False)
+    nombre: Mapped[str] = mapped_column("nombre", String(100), unique=True, nullable=False)
     descripcion: Mapped[Optional[str]] = mapped_column("descripcion", String(255), nullable=True)
 
     ordenes_metodos_pago: Mapped[List["OrdenMetodoPago"]] = relationship(back_populates="metodo_pago", cascade="all, delete-orphan")
@@ -150,10 +152,11 @@ class MetodoPago(Base):
 
 class OrdenMetodoPago(Base):
     __tablename__ = "ordenes_metodos_pago"
+    __table_args__ = (UniqueConstraint("orden_id", "metodo_pago_id"),)  # un pago por método en cada orden, la clave de los merges
 
     orden_metodo_id: Mapped[int] = mapped_column("orden_metodo_id", Integer, primary_key=True, autoincrement=True)
-    orden_id: Mapped[int] = mapped_column("orden_id", ForeignKey("ordenes.orden_id"))
-    metodo_pago_id: Mapped[int] = mapped_column("metodo_pago_id", ForeignKey("metodos_pago.metodo_pago_id"))
+    orden_id: Mapped[int] = mapped_column("orden_id", ForeignKey("ordenes.orden_id"), index=True)
+    metodo_pago_id: Mapped[int] = mapped_column("metodo_pago_id", ForeignKey("metodos_pago.metodo_pago_id"), index=True)
     monto_pagado: Mapped[float] = mapped_column("monto_pagado", DECIMAL(10, 2), nullable=False)
 
     orden: Mapped["Orden"] = relationship(back_populates="ordenes_metodos_pago")
@@ -167,8 +170,8 @@ class ResenaProducto(Base):
     __tablename__ = "resenas_productos"
 
     resena_id: Mapped[int] = mapped_column("resena_id", Integer, primary_key=True, autoincrement=True)
-    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"))
-    producto_id: Mapped[int] = mapped_column("producto_id", ForeignKey("productos.producto_id"))
+    usuario_id: Mapped[int] = mapped_column("usuario_id", ForeignKey("usuarios.usuario_id"), index=True)
+    producto_id: Mapped[int] = mapped_column("producto_id", ForeignKey("productos.producto_id"), index=True)
     calificacion: Mapped[int] = mapped_column("calificacion", Integer, nullable=False)
     comentario: Mapped[Optional[str]] = mapped_column("comentario", Text, nullable=True)
     fecha: Mapped[datetime] = mapped_column("fecha", TIMESTAMP, nullable=False,server_default= text("CURRENT_TIMESTAMP"))
@@ -182,10 +185,12 @@ class ResenaProducto(Base):
 
 class HistorialPago(Base):
     __tablename__ = "historial_pagos"
+    # Con PARTITIONED_TABLES se crea particionada por mes de fecha_pago (ver partitioning.py)
+    __table_args__ = {"info": {"partition_by": "fecha_pago"}}
 
     pago_id: Mapped[int] = mapped_column("pago_id", Integer, primary_key=True, autoincrement=True)
-    orden_id: Mapped[int] = mapped_column("orden_id", ForeignKey("ordenes.orden_id"))
-    metodo_pago_id: Mapped[int] = mapped_column("metodo_pago_id", ForeignKey("metodos_pago.metodo_pago_id"))
+    orden_id: Mapped[int] = mapped_column("orden_id", ForeignKey("ordenes.orden_id"), index=True)
+    metodo_pago_id: Mapped[int] = mapped_column("metodo_pago_id", ForeignKey("metodos_pago.metodo_pago_id"), index=True)
     monto: Mapped[float] = mapped_column("monto", DECIMAL(10, 2), nullable=False)
     fecha_pago: Mapped[datetime] = mapped_column("fecha_pago", TIMESTAMP, nullable=False,server_default= text("CURRENT_TIMESTAMP"))
     estado_pago: Mapped[str] = mapped_column("estado_pago", String(50), nullable=False, server_default="Procesando")
@@ -195,3 +200,22 @@ class HistorialPago(Base):
 
     def __repr__(self) -> str:
         return f"HistorialPago(pago_id={self.pago_id!r}, orden_id={self.orden_id!r}, monto={self.monto!r}, estado_pago={self.estado_pago!r})"
+
+
+class LoadManifest(Base):
+    """Estado de la última carga de cada CSV, usado para recargas incrementales."""
+    __tablename__ = "load_manifest"
+
+    loader: Mapped[str] = mapped_column("loader", String(100), primary_key=True)
+    table_name: Mapped[str] = mapped_column("table_name", String(100), nullable=False, index=True)
+    csv_path: Mapped[str] = mapped_column("csv_path", String(500), nullable=False)
+    file_size: Mapped[int] = mapped_column("file_size", BigInteger, nullable=False)
+    file_mtime: Mapped[float] = mapped_column("file_mtime", Float, nullable=False)
+    content_hash: Mapped[str] = mapped_column("content_hash", String(64), nullable=False)
+    rows_loaded: Mapped[int] = mapped_column("rows_loaded", BigInteger, nullable=False, default=0)
+    status: Mapped[str] = mapped_column("status", String(20), nullable=False)  # in_progress, completed, failed, dropped
+    data_version: Mapped[int] = mapped_column("data_version", BigInteger, nullable=False, default=0)  # sube con cada cambio de la tabla
+    updated_at: Mapped[datetime] = mapped_column("updated_at", TIMESTAMP, nullable=False, server_default=text("CURRENT_TIMESTAMP"), onupdate=text("CURRENT_TIMESTAMP"))
+
+    def __repr__(self) -> str:
+        return f"LoadManifest(loader={self.loader!r}, status={self.status!r}, rows_loaded={self.rows_loaded!r})"
@@ -0,0 +1,171 @@
+import csv
+import io
+import multiprocessing
+import os
+import time
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import PARSE_CHUNK_BYTES
+from database.column_spec import ColumnSpec, block_length, convert_block, slice_block
+from database.instrumentation import instrumentation
+
+
+SCAN_BYTES = 1 << 20  # tamaño de las lecturas al buscar los límites de los chunks
+
+
+def record_boundaries(path: str, chunk_bytes: int = PARSE_CHUNK_BYTES) -> List[int]:
+    """
+    Offsets where CSV records start, the first right after the header and
+    the next ones about chunk_bytes apart.
+
+    A newline only ends a record outside quotes. Quotes are counted from the
+    start of the file: inside a quoted field escaped quotes come in pairs,
+    so the parity of the count says whether a newline is quoted. UTF-8
+    multibyte characters never contain the quote or newline bytes. A stray
+    quote inside an unquoted field breaks the parity from there on; the
+    chunks cut after it are caught by aligned_records.
+    """
+    boundaries = []
+    target = 0  # el próximo límite es el primer fin de registro a partir de target
+    quoted = False
+    base = 0
+    with open(path, "rb") as file:
+        while block := file.read(SCAN_BYTES):
+            pos = 0
+            while pos < len(block):
+                if base + pos < target:
+                    stop = min(len(block), target - base)
+                    quoted ^= bool(block.count(b'"', pos, stop) & 1)
+                    pos = stop
+                    continue
+                newline = block.find(b"\n", pos)
+                if newline < 0:
+                    quoted ^= bool(block.count(b'"', pos) & 1)
+                    break
+                quoted ^= bool(block.count(b'"', pos, newline) & 1)
+                pos = newline + 1
+                if not quoted:
+                    boundaries.append(base + pos)
+                    target = base + pos + chunk_bytes
+            base += len(block)
+    return boundaries
+
+
+def read_records(path: str, start: int, end: int) -> Tuple[List[List[str]], int]:
+    """Parses the non-empty CSV records between two boundaries, returns them with the bytes read."""
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return list(filter(None, csv.reader(io.StringIO(data.decode("utf-8"), newline="")))), len(data)
+
+
+def aligned_records(rows: List[List[str]], width: int) -> bool:
+    """
+    Whether a chunk was cut on real record boundaries: every record has the
+    header's width and the last one does not end in the newline the chunk
+    was cut on, which csv keeps when the cut falls inside a quoted field.
+    """
+    return all(len(row) == width for row in rows) and not (rows and rows[-1][-1].endswith("\n"))
+
+
+def parse_chunk(columns: Sequence[ColumnSpec], header: List[str], path: str, start: int, end: int,
+                batch_size: int) -> Tuple[Optional[List[Dict[str, np.ndarray]]], int, float, float]:
+    """
+    Runs in a worker process: reads and converts one chunk into blocks of at
+    most batch_size rows. Returns the blocks, the bytes read and the seconds
+    spent reading and converting. The blocks are None when the chunk is not
+    aligned on records (see aligned_records).
+    """
+    start_time = time.perf_counter()
+    rows, size = read_records(path, start, end)
+    read_seconds = time.perf_counter() - start_time
+    if not aligned_records(rows, len(header)):
+        return None, size, read_seconds, 0.0
+    blocks = [convert_block(columns, header, rows[i:i + batch_size]) for i in range(0, len(rows), batch_size)]
+    return blocks, size, read_seconds, time.perf_counter() - start_time - read_seconds
+
+
+def iter_serial_blocks(columns: Sequence[ColumnSpec], header: List[str], path: str, table: str, start: int,
+                       batch_size: int) -> Iterator[Dict[str, np.ndarray]]:
+    """Reads and converts the CSV from the offset start to its end in this process, in blocks of at most batch_size rows."""
+    with open(path, "rb") as file:
+        file.seek(start)
+        text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        rows = filter(None, csv.reader(text))
+        while True:
+            with instrumentation.phase(table, "read"):
+                batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            with instrumentation.phase(table, "convert"):
+                block = convert_block(columns, header, batch)
+            yield block
+        instrumentation.count(table, bytes_read=file.tell() - start)
+
+
+def iter_parallel_blocks(columns: Sequence[ColumnSpec], path: str, table: str, batch_size: int,
+                         skip_rows: int, processes: int,
+                         chunk_bytes: int = PARSE_CHUNK_BYTES) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Parses and converts a CSV in a pool of processes, yielding its blocks in
+    file order so a single writer inserts them in that order.
+
+    At most 2 * processes chunks are parsed or waiting at any time, so
+    memory stays bounded when the writer is slower than the parsers.
+    The read and convert times of the workers are added to instrumentation.
+    If a chunk is not aligned on records, because of a stray quote before
+    it, the file is parsed from that chunk on in this process: the
+    boundaries after the stray quote cannot be trusted.
+    """
+    boundaries = record_boundaries(path, chunk_bytes)
+    if not boundaries:
+        return
+    header, _ = read_records(path, 0, boundaries[0])
+    header = header[0] if header else []
+    instrumentation.count(table, bytes_read=boundaries[0])
+    size = os.path.getsize(path)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    chunks = list(zip(boundaries, boundaries[1:]))
+
+    def skipped(blocks: Iterator[Dict[str, np.ndarray]]) -> Iterator[Dict[str, np.ndarray]]:
+        nonlocal skip_rows
+        for block in blocks:
+            rows = block_length(block)
+            if skip_rows >= rows:  # filas ya cargadas por una carga anterior
+                skip_rows -= rows
+                continue
+            yield slice_block(block, skip_rows, rows) if skip_rows else block
+            skip_rows = 0
+
+    # spawn: hacer fork de un proceso con varios hilos de carga activos puede bloquear a los hijos
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        pending: Deque[Tuple[int, Future]] = deque()
+        submitted = iter(chunks)
+        try:
+            while True:
+                for start, end in islice(submitted, 2 * processes - len(pending)):
+                    pending.append((start, pool.submit(parse_chunk, columns, header, path, start, end, batch_size)))
+                if not pending:
+                    return
+                start, future = pending.popleft()
+                blocks, bytes_read, read_seconds, convert_seconds = future.result()
+                instrumentation.add_time(table, "read", read_seconds)
+                instrumentation.add_time(table, "convert", convert_seconds)
+                if blocks is None:
+                    print(f"  ! {table}: chunk at byte {start} not aligned on records "
+                          "(stray quote?), parsing the rest of the file serially")
+                    break
+                instrumentation.count(table, bytes_read=bytes_read)
+                yield from skipped(iter(blocks))
+        finally:
+            for _, future in pending:
+                future.cancel()
+    yield from skipped(iter_serial_blocks(columns, header, path, table, start, batch_size))
@@ -0,0 +1,150 @@
+import os
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from sqlalchemy import Connection, ForeignKeyConstraint, MetaData, PrimaryKeyConstraint, Table, exists, func, select, text
+from sqlalchemy.orm import Session
+
+from database.column_spec import parse_datetimes
+from database.models import Base
+
+
+DEFAULT = "default"  # sufijo de la partición que recibe las fechas sin partición mensual
+
+
+def partition_key(table: Table) -> Optional[str]:
+    """Column a table is partitioned by, declared in the model with info={"partition_by": ...}."""
+    return table.info.get("partition_by")
+
+
+def partitioned_tables(metadata: MetaData = Base.metadata) -> List[Table]:
+    return [table for table in metadata.sorted_tables if partition_key(table)]
+
+
+def references_partitioned(constraint: ForeignKeyConstraint) -> bool:
+    """
+    PostgreSQL needs a unique constraint on the referenced columns, and the
+    unique constraints of a partitioned table must include its partition
+    key, so a FK to orden_id alone cannot point to a partitioned ordenes.
+    """
+    return partition_key(constraint.referred_table) is not None
+
+
+def unenforced_references(session: Session, metadata: MetaData = Base.metadata) -> List[ForeignKeyConstraint]:
+    """FKs that create_tables left out because the table they point to is partitioned in this database."""
+    return [constraint for table in metadata.sorted_tables for constraint in table.foreign_key_constraints
+            if references_partitioned(constraint) and leaf_partitions(session, constraint.referred_table) is not None]
+
+
+def check_partitioned_references(session: Session) -> Dict[str, int]:
+    """
+    The database does not enforce the FKs to partitioned tables, so after a
+    load their orphans are counted with one anti-join per FK. Raises
+    ValueError if any child row points to a missing parent, otherwise
+    returns the FKs checked with 0 orphans each.
+    """
+    orphans = {}
+    for constraint in unenforced_references(session):
+        child, parent = constraint.table, constraint.referred_table
+        pairs = [(element.parent, element.column) for element in constraint.elements]
+        missing = ~exists().where(*[parent_column == child_column for child_column, parent_column in pairs])
+        name = f"{child.name}.{'_'.join(constraint.column_keys)} -> {parent.name}"
+        orphans[name] = session.execute(select(func.count()).select_from(child).where(
+            *[child_column.is_not(None) for child_column, _ in pairs], missing)).scalar_one()
+    failed = {name: count for name, count in orphans.items() if count}
+    if failed:
+        raise ValueError(f"Orphan rows in FKs to partitioned tables, not enforced by the database: {failed}")
+    return orphans
+
+
+def partition_name(table_name: str, month: np.datetime64) -> str:
+    return f"{table_name}_{str(month).replace('-', '_')}"
+
+
+def prepare_partitioned(table: Table):
+    """
+    Turns a copy of a model table into the parent of monthly range
+    partitions: the partition key joins the primary key and the table is
+    declared PARTITION BY RANGE.
+    """
+    key = partition_key(table)
+    columns = list(table.primary_key.columns) + [table.c[key]]
+    table.c[key].primary_key = True
+    table.constraints.discard(table.primary_key)
+    table.append_constraint(PrimaryKeyConstraint(*columns))
+    table.dialect_options["postgresql"]["partition_by"] = f"RANGE ({key})"
+
+
+def csv_months(loader, batch_size: int = 100_000) -> Optional[Tuple[np.datetime64, np.datetime64]]:
+    """First and last month of the partition key column in a loader's CSV, None if it has no dates."""
+    key = partition_key(loader.get_model_class().__table__)
+    if not os.path.exists(loader.get_csv_path()):
+        return None
+    header = next(spec.header for spec in loader.columns if spec.column == key)
+    first = last = None
+    for names, rows in loader.iter_raw_blocks(batch_size):
+        if header not in names:
+            return None
+        position = names.index(header)
+        raw = np.array([row[position] for row in rows], dtype=object)
+        dates = parse_datetimes(raw[raw != ""])
+        if len(dates):
+            months = dates.astype("datetime64[M]")
+            first = months.min() if first is None else min(first, months.min())
+            last = months.max() if last is None else max(last, months.max())
+    return (first, last) if first is not None else None
+
+
+def month_range(first: np.datetime64, last: np.datetime64) -> np.ndarray:
+    return np.arange(first, last + 1, dtype="datetime64[M]")
+
+
+def create_partitions(conn: Connection, table: Table, months: Iterable[np.datetime64]):
+    """Creates the missing monthly partitions of a table, and its default partition."""
+    preparer = conn.dialect.identifier_preparer
+    parent = preparer.format_table(table)
+    for month in months:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {preparer.quote(partition_name(table.name, month))} PARTITION OF {parent} "
+            f"FOR VALUES FROM ('{month}-01') TO ('{month + 1}-01')"
+        ))
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {preparer.quote(f'{table.name}_{DEFAULT}')} "
+                      f"PARTITION OF {parent} DEFAULT"))
+
+
+def leaf_partitions(session: Session, table: Table) -> Optional[Dict[str, Table]]:
+    """
+    The partitions of a table as {month ("2024-05") or "default": Table},
+    or None if the table is not partitioned in the database.
+    """
+    if session.get_bind().dialect.name != "postgresql" or not partition_key(table):
+        return None
+    names = session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.oid = to_regclass(:table) AND p.relkind = 'p'"
+    ), {"table": table.name}).scalars().all()
+    if not names:
+        return None
+    partitions = {}
+    metadata = MetaData()
+    for name in names:
+        suffix = name[len(table.name) + 1:]
+        month = DEFAULT if suffix == DEFAULT else suffix.replace("_", "-")
+        partitions[month] = table.to_metadata(metadata, name=name)
+    return partitions
+
+
+def route_block(block: Dict[str, np.ndarray], key: str,
+                partitions: Dict[str, Table]) -> Iterator[Tuple[Table, Dict[str, np.ndarray]]]:
+    """
+    Splits a block by the month of its partition key, giving the partition
+    each group goes to. Months without their own partition go to the
+    default one.
+    """
+    months = block[key].astype("datetime64[M]").astype(str)
+    for month in np.unique(months):
+        rows = months == month
+        yield partitions.get(month, partitions[DEFAULT]), {name: values[rows] for name, values in block.items()}
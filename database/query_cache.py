@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from sqlalchemy import Table
+from sqlalchemy.sql import Executable, visitors
+
+from config import QUERY_CACHE_MAX_BYTES
+from database.analytics import AnalyticsBackend, get_backend
+
+
+class CacheEntry(NamedTuple):
+    versions: Dict[str, Any]  # versión de cada tabla leída cuando se calculó el resultado
+    frame: pd.DataFrame
+    size: int                 # bytes ocupados por frame
+
+
+def referenced_tables(statement: Executable) -> Tuple[str, ...]:
+    """Names of the tables a statement reads, including joins and subqueries."""
+    return tuple(sorted({element.name for element in visitors.iterate(statement) if isinstance(element, Table)}))
+
+
+class QueryCache:
+    """
+    LRU cache of analytics results in front of an AnalyticsBackend.
+
+    Entries are keyed on the SQL the backend runs and its parameters, and
+    remember the data version of every table the query reads. A hit needs
+    those versions to be unchanged, so reloading a table only invalidates
+    the queries that touch it. A query that reads a table without a version
+    (filled outside the loaders, like the dbt marts) is never cached, since
+    nothing would tell when it changes. When the cached frames take more than
+    max_bytes the least recently used ones are evicted.
+    """
+    def __init__(self, backend: Optional[AnalyticsBackend] = None, max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.backend = backend or get_backend()
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def execute(self, statement: Executable) -> pd.DataFrame:
+        """Returns the result of the statement as a DataFrame, from the cache when it is still valid."""
+        sql, params = self.backend.compile(statement)
+        key = (sql, repr(params))
+        versions = self.backend.data_versions(referenced_tables(statement))
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.versions == versions:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry.frame.copy()
+
+        self.misses += 1
+        frame = self.backend.execute(statement)
+        if None in versions.values():
+            self.discard(key)
+            return frame
+        self.store(key, CacheEntry(versions, frame, int(frame.memory_usage(deep=True).sum())))
+        return frame.copy()
+
+    def store(self, key: Tuple[str, str], entry: CacheEntry):
+        """Adds or replaces an entry and evicts the least recently used until the cache fits in max_bytes."""
+        self.discard(key)
+        if entry.size > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            self.discard(next(iter(self.entries)))
+
+    def discard(self, key: Tuple[str, str]):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def invalidate(self, table: Optional[str] = None):
+        """Drops the entries that read table, or every entry."""
+        for key in [key for key, entry in self.entries.items() if table is None or table in entry.versions]:
+            self.discard(key)
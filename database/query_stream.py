@@ -0,0 +1,153 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, Numeric, Select, case, func, select, true
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeEngine
+
+from config import QUERY_CHUNK_SIZE
+
+
+Bind = Union[Engine, Connection, Session]
+
+
+@contextmanager
+def connection(bind: Bind) -> Iterator[Connection]:
+    """The connection to run on: the session's own, the given one, or a new one of the engine."""
+    if isinstance(bind, Session):
+        yield bind.connection()
+    elif isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.connect() as conn:
+            yield conn
+
+
+def column_dtype(type_: TypeEngine) -> Optional[str]:
+    """
+    NumPy dtype for the values of a SQL column, None keeps them as objects.
+    NUMERIC columns become float64, which is what plots and pandas
+    aggregations use anyway; the exact Decimals stay in the database.
+    """
+    if isinstance(type_, Boolean):
+        return "bool"
+    if isinstance(type_, Integer):
+        return "int64"
+    if isinstance(type_, (Float, Numeric)):
+        return "float64"
+    if isinstance(type_, DateTime):
+        return "datetime64[us]"
+    return None
+
+
+def to_array(values: Sequence[Any], dtype: Optional[str]) -> Any:
+    """
+    One column of a chunk as a typed array. NULLs become NaN/NaT in float
+    and datetime columns, and make int columns pandas' nullable Int64.
+    """
+    if dtype is None or (dtype == "bool" and None in values):
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    if dtype == "int64" and None in values:
+        return pd.array(values, dtype="Int64")
+    if dtype == "datetime64[us]":
+        # pandas convierte los datetime de Python mucho más rápido que np.array
+        return pd.to_datetime(list(values), cache=False).as_unit("us").to_numpy()
+    return np.array(values, dtype=dtype)
+
+
+def iter_frames(bind: Bind, statement: Select, chunk_size: int = QUERY_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Runs a select with a server-side cursor (stream_results / yield_per)
+    and yields its result as DataFrames of at most chunk_size rows. Only
+    one chunk of Row objects exists at a time; each is turned into typed
+    column arrays right away.
+    """
+    names = [column.key for column in statement.selected_columns]
+    dtypes = [column_dtype(column.type) for column in statement.selected_columns]
+    with connection(bind) as conn:
+        # opciones solo de esta ejecución: conn.execution_options() cambiaría la conexión de la sesión
+        result = conn.execute(statement, execution_options={"stream_results": True, "yield_per": chunk_size})
+        for rows in result.partitions():
+            columns = zip(*rows)
+            yield pd.DataFrame({name: to_array(values, dtype) for name, values, dtype in zip(names, columns, dtypes)})
+
+
+def query_frame(bind: Bind, statement: Select, chunk_size: int = QUERY_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    The whole result of a select as one DataFrame, built from the typed
+    chunks of iter_frames instead of a list of every Row. Drop-in for
+    pd.DataFrame(session.execute(stmt).all(), columns=[...]).
+    """
+    frames: List[pd.DataFrame] = list(iter_frames(bind, statement, chunk_size))
+    if not frames:
+        return pd.DataFrame({column.key: to_array([], column_dtype(column.type)) for column in statement.selected_columns})
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def downsample(statement: Select, rows: int) -> Select:
+    """
+    At most rows random rows of a select, chosen by the database: it keeps
+    the top rows of ORDER BY random() LIMIT rows with a bounded heap, so only
+    the sample is sent. Enough for scatter and box plots of large tables.
+    """
+    sample = statement.subquery("sample")
+    return select(*sample.c).order_by(func.random()).limit(rows)
+
+
+def summarize(statement: Select, value: str, by: Sequence[str] = (), quartiles: bool = False) -> Select:
+    """
+    count, min, mean and max of the value column of a select per group of
+    the by columns, computed by the database. quartiles=True adds q1,
+    median and q3 with percentile_cont (PostgreSQL and DuckDB only), what a
+    box plot needs without reading the rows.
+    """
+    source = statement.subquery("source")
+    column = source.c[value]
+    stats = [func.count(column).label("count"), func.min(column).label("min"),
+             func.avg(column, type_=Float).label("mean"), func.max(column).label("max")]
+    if quartiles:
+        stats[2:2] = [func.percentile_cont(q).within_group(column).label(name)
+                      for q, name in ((0.25, "q1"), (0.5, "median"), (0.75, "q3"))]
+    groups = [source.c[name] for name in by]
+    return select(*groups, *stats).group_by(*groups).order_by(*groups)
+
+
+def histogram(statement: Select, value: str, by: Sequence[str] = (), bins: int = 50) -> Select:
+    """
+    Row counts of the value column of a select in bins equal-width bins
+    between its min and max, per group of the by columns: bin, bin_start,
+    bin_end and count of the non-empty bins, so at most groups * bins rows
+    leave the database. Uses floor(), in SQLite since 3.35.
+    """
+    source = statement.subquery("source")
+    column = source.c[value]
+    bounds = select(func.min(column).label("low"), func.max(column).label("high")).subquery("bounds")
+    width = (bounds.c.high - bounds.c.low) / bins
+    position = func.floor((column - bounds.c.low) / width)
+    bin_ = case(
+        (bounds.c.high == bounds.c.low, 0),
+        (position >= bins, bins - 1),  # el máximo cae en el último bin y no en uno propio
+        else_=position,
+    ).label("bin")
+    groups = [source.c[name] for name in by]
+    binned = (
+        select(*groups, bin_, bounds.c.low, width.label("width"))
+        .select_from(source.join(bounds, true()))
+        .where(column.isnot(None))
+        .subquery("binned")
+    )
+    keys = [binned.c[name] for name in by]
+    return (
+        select(*keys, binned.c.bin,
+               (binned.c.low + binned.c.bin * binned.c.width).label("bin_start"),
+               (binned.c.low + (binned.c.bin + 1) * binned.c.width).label("bin_end"),
+               func.count().label("count"))
+        .group_by(*keys, binned.c.bin, binned.c.low, binned.c.width)
+        .order_by(*keys, binned.c.bin)
+    )
@@ -0,0 +1,30 @@
+import csv
+import os
+import threading
+
+from typing import Dict, Iterable, Sequence
+
+from config import REJECT_DIR
+
+
+class RejectWriter:
+    """
+    Appends rejected rows, with the reason, to CSV files under REJECT_DIR.
+    Each file is overwritten the first time it is written in a run and then
+    appended to, so the files only hold the rejects of the last load.
+    """
+    def __init__(self, reject_dir: str = REJECT_DIR):
+        self.reject_dir = reject_dir
+        self.counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def write(self, file_name: str, columns: Sequence[str], rows: Iterable[Sequence], errors: Sequence[str]):
+        with self.lock:
+            first = file_name not in self.counts
+            self.counts[file_name] = self.counts.get(file_name, 0) + len(errors)
+            os.makedirs(self.reject_dir, exist_ok=True)
+            with open(os.path.join(self.reject_dir, file_name), "w" if first else "a", newline="", encoding="utf-8") as csvfile:
+                writer = csv.writer(csvfile)
+                if first:
+                    writer.writerow([*columns, "error"])
+                writer.writerows((*row, error) for row, error in zip(rows, errors))
@@ -1,12 +1,117 @@
-from database.models import Base
+from functools import partial
+from typing import List
+
+from database.models import Base, LoadManifest
+from database.load_scheduler import run_in_dependency_order
+from sqlalchemy import MetaData, Table, ForeignKeyConstraint, UniqueConstraint, inspect
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import AddConstraint, Constraint, CreateIndex, CreateTable
+
+from config import LOAD_WORKERS, PARTITIONED_TABLES
+from database.database_insertion import loaders_by_table
+from database.load_manifest import mark_dropped
+from database.partitioning import (
+    create_partitions, csv_months, month_range, partitioned_tables, prepare_partitioned, references_partitioned
+)
+
+
+def secondary_constraints(table: Table) -> List[Constraint]:
+    """FKs and unique constraints of a table, the ones a bulk load adds after the data."""
+    return [c for c in table.constraints if isinstance(c, (ForeignKeyConstraint, UniqueConstraint))]
+
+
+def create_tables(engine: Engine, deferred: bool = False, partitioned: bool = PARTITIONED_TABLES):
+    """
+    Creates tables in the database using SQLAlchemy.
+    With deferred=True (PostgreSQL only) the tables are created with just
+    their primary keys: FKs, unique constraints and indexes are left for
+    finalize_tables once the data is loaded.
+    With partitioned=True (PostgreSQL only) the tables whose model declares
+    a partition_by column are partitioned by month of that column, with a
+    partition for every month found in their CSV and a default partition.
+    """
+    if engine.dialect.name != "postgresql" or not (deferred or partitioned):
+        Base.metadata.create_all(engine)
+        return
+
+    bare_metadata = MetaData()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            bare_table = table.to_metadata(bare_metadata)
+            removed = secondary_constraints(bare_table) if deferred else []
+            if partitioned:
+                removed += [c for c in bare_table.foreign_key_constraints if references_partitioned(c)]
+                if table in partitioned_tables():
+                    prepare_partitioned(bare_table)
+            for constraint in removed:
+                bare_table.constraints.discard(constraint)
+            conn.execute(CreateTable(bare_table, include_foreign_key_constraints=[] if deferred else None,
+                                     if_not_exists=True))
+            if not deferred:
+                for index in bare_table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+        if partitioned:
+            create_csv_partitions(conn)
+
+
+def create_csv_partitions(conn):
+    """Creates the monthly partitions that cover the dates in the CSVs of the partitioned tables."""
+    loaders = loaders_by_table()
+    for table in partitioned_tables():
+        months = csv_months(loaders[table.name](None)) if table.name in loaders else None
+        create_partitions(conn, table, month_range(*months) if months else [])
+        print(f"{table.name}: partitioned by month, "
+              + (f"{months[0]} to {months[1]}" if months else "no dates found, only the default partition"))
+
+
+def build_indexes(engine: Engine, table: Table):
+    """Builds the indexes and unique constraints of one table."""
+    with engine.begin() as conn:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                conn.execute(AddConstraint(constraint))
+
+
+def add_foreign_key(engine: Engine, constraint: ForeignKeyConstraint):
+    """
+    Adds one FK in its own transaction. It locks the child table and then
+    the parent, so concurrent FKs never wait on each other in a cycle.
+    """
+    with engine.begin() as conn:
+        conn.execute(AddConstraint(constraint))
+
+
+def finalize_tables(engine: Engine, workers: int = LOAD_WORKERS, partitioned: bool = PARTITIONED_TABLES):
+    """
+    Adds what create_tables(deferred=True) left out, in parallel: first the
+    indexes and unique constraints of every table, then the FKs. Each
+    constraint is validated once over the loaded data instead of row by row
+    during the load. FKs to partitioned tables are skipped, as in create_tables.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    tables = Base.metadata.sorted_tables
+    run_in_dependency_order({table.name: partial(build_indexes, engine, table) for table in tables}, {}, workers)
 
+    foreign_keys = [c for table in tables for c in table.constraints if isinstance(c, ForeignKeyConstraint)
+                    and not (partitioned and references_partitioned(c))]
+    tasks = {f"{fk.table.name}.{'_'.join(fk.column_keys)}": partial(add_foreign_key, engine, fk) for fk in foreign_keys}
+    run_in_dependency_order(tasks, {}, workers)
 
-def create_tables(engine: Engine):
-    """Creates tables in the database using SQLAlchemy."""
-    Base.metadata.create_all(engine)
 
 def drop_tables(engine: Engine):
-    """Drops all tables in the database using SQLAlchemy."""
-    Base.metadata.drop_all(engine)
+    """
+    Drops all tables in the database using SQLAlchemy, except load_manifest:
+    its entries are marked as dropped (see mark_dropped) so the data versions
+    keep growing across reloads and a QueryCache never serves the old results.
+    """
+    manifest = LoadManifest.__table__
+    Base.metadata.drop_all(engine, tables=[table for table in Base.metadata.sorted_tables if table is not manifest])
+    if inspect(engine).has_table(manifest.name):
+        with Session(engine) as session:
+            mark_dropped(session)
+            session.commit()
     print("All tables dropped successfully.")
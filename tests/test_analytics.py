@@ -0,0 +1,114 @@
+import pytest
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from database import insertion_helper
+from database.analytics import get_backend
+from database.database_insertion import load_table
+from database.insertion_helper import CategoriaLoader, MetodoPagoLoader, OrdenMetodoPagoLoader, ProductoLoader
+from database.models import Base, Categoria, MetodoPago, OrdenMetodoPago, Producto
+from database.query_cache import QueryCache
+from database.table_creator import create_tables, drop_tables
+from tests.test_insertion_helper import write_csv
+
+pytest.importorskip("duckdb")
+
+
+def test_duckdb_backend_matches_the_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Hogar", ""], ["Libros", "Usados"]])
+    write_csv(tmp_path / "4.Productos.csv", ["Nombre", "Descripcion", "Precio", "Stock", "CategoriaID"],
+              [["P1", "", "1.50", "0", "1"], ["P2", "x", "2.25", "4", "2"], ["P3", "", "10.00", "0", "2"]])
+    write_csv(tmp_path / "9.metodos_pago.csv", ["Nombre", "Descripcion"], [["Tarjeta", ""], ["Efectivo", ""]])
+    write_csv(tmp_path / "10.ordenes_metodospago.csv", ["OrdenID", "MetodoPagoID", "MontoPagado"],
+              [["1", "1", "5.00"], ["2", "2", "6.00"], ["3", "1", "7.00"]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for loader_class in (CategoriaLoader, ProductoLoader, MetodoPagoLoader, OrdenMetodoPagoLoader):
+            loader_class(session).load()
+
+    stmt = (
+        select(MetodoPago.nombre, func.count().label("count"), func.sum(OrdenMetodoPago.monto_pagado).label("total"))
+        .select_from(OrdenMetodoPago)
+        .join(MetodoPago, OrdenMetodoPago.metodo_pago_id == MetodoPago.metodo_pago_id)
+        .group_by(MetodoPago.nombre)
+        .order_by(MetodoPago.nombre)
+    )
+    out_of_stock = select(Producto.producto_id, Producto.descripcion).where(Producto.stock == 0).order_by(Producto.producto_id)
+
+    for backend in (get_backend("database", bind=engine),
+                    get_backend("duckdb", source="csv"),
+                    get_backend("duckdb", source="cache"),
+                    get_backend("duckdb", source="database", bind=engine)):
+        payments = backend.execute(stmt)
+        assert payments["nombre"].tolist() == ["Efectivo", "Tarjeta"]
+        assert payments["count"].tolist() == [1, 2]
+        assert [float(total) for total in payments["total"]] == [6.0, 12.0]
+        assert backend.execute(out_of_stock).values.tolist() == [[1, ""], [3, ""]]
+
+
+def test_query_cache_invalidates_only_reloaded_tables(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Hogar", ""], ["Libros", "Usados"]])
+    write_csv(tmp_path / "9.metodos_pago.csv", ["Nombre", "Descripcion"], [["Tarjeta", ""], ["Efectivo", ""]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    load_table(CategoriaLoader, engine)
+    load_table(MetodoPagoLoader, engine)
+
+    cache = QueryCache(get_backend("database", bind=engine))
+    categories = select(func.count()).select_from(Categoria)
+    methods = select(MetodoPago.nombre).order_by(MetodoPago.nombre)
+    assert cache.execute(categories).iloc[0, 0] == 2
+    assert cache.execute(methods)["nombre"].tolist() == ["Efectivo", "Tarjeta"]
+    assert cache.execute(categories).iloc[0, 0] == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Ropa", ""], ["Cine", ""]])
+    load_table(CategoriaLoader, engine)  # agrega dos filas más
+    assert cache.execute(categories).iloc[0, 0] == 4
+    cache.execute(methods)
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    cache.execute(categories)
+    cache.max_bytes = cache.size
+    cache.execute(select(func.count()).select_from(MetodoPago))  # desaloja methods, la menos usada
+    assert len(cache.entries) == 2 and cache.size <= cache.max_bytes
+    cache.execute(categories)
+    assert (cache.hits, cache.misses) == (4, 4)
+
+    # productos se carga sin pasar por load_manifest: sin versión no hay nada que invalide, no se guarda
+    with Session(engine) as session:
+        session.execute(insert(Producto), [{"nombre": "P1", "descripcion": None, "precio": 1, "stock": 0, "categoria_id": 1}])
+        session.commit()
+    products = select(func.count()).select_from(Producto)
+    assert cache.execute(products).iloc[0, 0] == 1
+    with Session(engine) as session:
+        session.execute(insert(Producto), [{"nombre": "P2", "descripcion": None, "precio": 2, "stock": 0, "categoria_id": 1}])
+        session.commit()
+    assert cache.execute(products).iloc[0, 0] == 2
+    assert cache.misses == 6 and len(cache.entries) == 2
+
+
+def test_query_cache_misses_after_the_tables_are_dropped_and_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Hogar", ""], ["Libros", "Usados"]])
+    engine = create_engine("sqlite://")
+    create_tables(engine)
+    load_table(CategoriaLoader, engine)
+
+    cache = QueryCache(get_backend("database", bind=engine))
+    categories = select(func.count()).select_from(Categoria)
+    assert cache.execute(categories).iloc[0, 0] == 2
+
+    # la recarga completa vuelve a pasar por start_entry, pero la versión no vuelve a empezar desde 0
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Hogar", ""], ["Libros", ""], ["Ropa", ""], ["Cine", ""]])
+    drop_tables(engine)
+    create_tables(engine)
+    load_table(CategoriaLoader, engine)
+    assert cache.execute(categories).iloc[0, 0] == 4
+    assert (cache.hits, cache.misses) == (0, 2)
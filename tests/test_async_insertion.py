@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from benchmarks.synthetic_data import generate
+from database import insertion_helper
+from database.async_insertion import async_url, load_all_async, load_table_async
+from database.insertion_helper import OrdenLoader
+from database.models import Base, DetalleOrden, LoadManifest, Orden
+from tests.test_insertion_helper import write_csv
+
+pytest.importorskip("aiosqlite")
+
+
+def test_async_url_swaps_the_driver():
+    assert async_url("postgresql+psycopg2://u@host/db").drivername == "postgresql+asyncpg"
+    assert async_url("sqlite:///bench.db").drivername == "sqlite+aiosqlite"
+
+
+def test_load_all_async_loads_every_csv(tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    rows = generate(str(tmp_path), orders=300, chunk_size=128)
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    async def load():
+        async_engine = create_async_engine(async_url(url))
+        try:
+            return await load_all_async(batch_size=100, commit_every=2, workers=1, bind=async_engine, queue_size=2)
+        finally:
+            await async_engine.dispose()
+
+    loaded = asyncio.run(load())
+    assert {loader.get_csv_name(): loader.rows_loaded for loader in loaded.values()} == rows
+    with Session(engine) as session:
+        assert session.execute(select(func.count()).select_from(DetalleOrden)).scalar_one() == rows["6.detalle_ordenes.csv"]
+        assert set(session.execute(select(LoadManifest.status)).scalars()) == {"completed"}
+
+
+def test_load_table_async_leaves_empty_dates_to_the_server_default(tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"],
+              [["1", "5.00", "Enviado", "2024-01-15"], ["1", "7.00", "", ""]])
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    async def load():
+        async_engine = create_async_engine(async_url(url))
+        try:
+            return await load_table_async(OrdenLoader, async_engine)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(load()).rows_loaded == 2
+    with Session(engine) as session:
+        fechas = session.execute(select(Orden.fecha_orden, Orden.estado).order_by(Orden.orden_id)).all()
+    assert fechas[0][0].year == 2024 and fechas[1][0] is not None and fechas[1][1] == "Pendiente"
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from database import insertion_helper
+from database.csv_cache import CacheWriter, cache_root, file_hash, open_cache, read_frame
+from database.insertion_helper import OrdenLoader, ResenaProductoLoader
+from database.models import Base, Orden
+from tests.test_insertion_helper import write_csv
+
+
+def assert_same_blocks(first, second):
+    first, second = list(first), list(second)
+    assert len(first) == len(second)
+    for a, b in zip(first, second):
+        assert list(a) == list(b)
+        for column in a:
+            assert a[column].dtype == b[column].dtype
+            assert a[column].tolist() == b[column].tolist()
+
+
+def test_cached_blocks_match_the_parsed_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"],
+              [["1", "0.10", "", "2024-01-01"], ["2", "1234567.8", "Enviado", "2024-02-01 10:30:00"],
+               ["3", "5", "Cancelado", ""], ["4", "7.25", "", "2024-03-01"]])
+    write_csv(tmp_path / "11.resenas_productos.csv", ["UsuarioID", "ProductoID", "Calificacion", "Comentario", "Fecha"],
+              [["1", "1", "5", "Ñandú \"bueno\"", "2024-01-01"], ["2", "1", "4", "", "2024-01-02"]])
+
+    for loader_class in (OrdenLoader, ResenaProductoLoader):
+        loader = loader_class(None)
+        assert open_cache(loader.get_csv_path(), loader.columns) is None
+        assert_same_blocks(loader.iter_blocks(2, use_cache=True), loader.parse_blocks(2))  # escribe la caché
+        assert open_cache(loader.get_csv_path(), loader.columns) is not None
+        assert_same_blocks(loader.iter_blocks(2, use_cache=True), loader.parse_blocks(2))
+        assert_same_blocks(loader.iter_blocks(3, skip_rows=1, use_cache=True), loader.parse_blocks(3, skip_rows=1))
+
+    frame = read_frame(OrdenLoader(None))
+    assert frame["usuario_id"].dtype == np.int64
+    assert frame["estado"].tolist() == ["Pendiente", "Enviado", "Cancelado", "Pendiente"]
+
+
+def test_cache_is_rebuilt_when_the_csv_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    header = ["UsuarioID", "Total", "Estado", "FechaOrden"]
+    write_csv(tmp_path / "5.Ordenes.csv", header, [["1", "1.00", "", "2024-01-01"]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert OrdenLoader(session).load(use_cache=True) == 1
+        write_csv(tmp_path / "5.Ordenes.csv", header, [["1", "2.00", "", "2024-01-01"], ["2", "3.00", "", ""]])
+        assert OrdenLoader(session).load(use_cache=True) == 2
+        assert session.execute(select(func.count()).select_from(Orden)).scalar_one() == 3
+
+    assert len(os.listdir(cache_root(str(tmp_path / "5.Ordenes.csv")))) == 1  # la versión vieja se borró
+    assert read_frame(OrdenLoader(None))["total"].tolist()[1] == 3
+
+
+def test_a_writer_only_removes_its_own_temporary_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"],
+              [["1", "1.00", "", "2024-01-01"], ["2", "2.50", "pagado", ""]])
+    loader = OrdenLoader(None)
+    path = loader.get_csv_path()
+    blocks = list(loader.parse_blocks())
+
+    # dos cargas escriben la caché del mismo CSV a la vez
+    first, second = (CacheWriter(path, loader.columns, file_hash(path)) for _ in range(2))
+    assert first.path != second.path
+    for writer in (first, second):
+        for block in blocks:
+            writer.append(block)
+    first.close()
+    assert os.path.isdir(second.path)
+    assert_same_blocks(second.close().iter_blocks(1000), blocks)
+    assert os.listdir(cache_root(path)) == [file_hash(path)]
+    assert_same_blocks(open_cache(path, loader.columns).iter_blocks(1000), blocks)
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from data_quality import AllowedValues, Matches, NotNull, Range, run_rules
+from database.models import Categoria, DetalleOrden, Orden, Producto
+from tests.test_eda_helper import make_session
+
+
+def add_rows(session):
+    session.execute(insert(Categoria), [{"nombre": "Hogar", "descripcion": None}])
+    session.execute(insert(Producto), [
+        {"nombre": "Silla", "descripcion": None, "precio": Decimal("10.00"), "stock": 0, "categoria_id": 1},
+        {"nombre": "Mesa", "descripcion": "Roble", "precio": Decimal("99.00"), "stock": 4, "categoria_id": 1},
+    ])
+    session.execute(insert(Orden), [
+        {"usuario_id": 1, "total": Decimal(total), "estado": estado, "fecha_orden": None}
+        for total, estado in [("5.00", "Pendiente"), ("-1.00", "Enviado"), ("7.00", "Perdido"), ("8.00", "Pendiente")]
+    ])
+    session.execute(insert(DetalleOrden), [
+        {"orden_id": 1, "producto_id": 1, "cantidad": 1, "precio_unitario": Decimal("10.00")},
+        {"orden_id": 2, "producto_id": 2, "cantidad": 0, "precio_unitario": Decimal("90.00")},
+        {"orden_id": 3, "producto_id": 9, "cantidad": 2, "precio_unitario": Decimal("1.00")},
+    ])
+
+
+def test_rules_run_one_pass_per_table():
+    rules = [
+        NotNull(Producto.descripcion),
+        Range(Producto.stock, minimum=1, name="sin stock"),
+        AllowedValues(Orden.estado, ["Pendiente", "Enviado"]),
+        Range(Orden.total, minimum=0),
+        Matches(DetalleOrden.precio_unitario, Producto.precio, DetalleOrden.producto),
+        Range(DetalleOrden.cantidad, minimum=1, maximum=10),
+    ]
+    with make_session() as session:
+        add_rows(session)
+        report = run_rules(session, rules, sample_size=1)
+
+    assert list(report) == ["productos", "ordenes", "detalle_ordenes"]
+    assert report["ordenes"]["rows"] == 4 and report["ordenes"]["seconds"] >= 0
+    assert report["productos"]["rules"]["sin stock"] == {"violations": 1, "sample": [(1, 0)]}
+
+    estados = report["ordenes"]["rules"]["ordenes.estado in allowed values"]
+    assert estados == {"violations": 1, "sample": [(3, "Perdido")], "counts": {"Pendiente": 2, "Enviado": 1}}
+    assert report["ordenes"]["rules"]["ordenes.total >= 0"]["violations"] == 1
+
+    detalle = report["detalle_ordenes"]["rules"]
+    # la línea con un producto inexistente no cuenta como precio distinto
+    assert detalle["detalle_ordenes.precio_unitario = productos.precio"] == {
+        "violations": 1, "sample": [(2, Decimal("90.00"), Decimal("99.00"))]}
+    assert detalle["detalle_ordenes.cantidad >= 1 <= 10"] == {"violations": 1, "sample": [(2, 0)]}
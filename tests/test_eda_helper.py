@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from EDA_helper import export_orphans, find_duplicates, scan_referential_integrity
+from database.models import Base, DetalleOrden, DireccionEnvio, Orden, Usuario
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return Session(engine)
+
+
+def test_find_duplicates_ignores_primary_key():
+    with make_session() as session:
+        # categorias.nombre es única, las direcciones pueden repetirse
+        casa = {"usuario_id": 1, "calle": "Av. 1", "ciudad": "Lima", "pais": "Perú"}
+        session.execute(insert(DireccionEnvio), [casa, casa, casa, {**casa, "calle": "Av. 2"}])
+
+        result = find_duplicates(session, DireccionEnvio)
+        assert result["duplicate_groups"] == 1
+        assert result["duplicate_rows"] == 2
+        assert result["sample"] == [(1, "Av. 1", "Lima", None, None, None, None, None, "Perú", 3)]
+
+
+def test_find_duplicates_on_natural_key():
+    with make_session() as session:
+        session.execute(insert(DetalleOrden), [
+            {"orden_id": 1, "producto_id": 7, "cantidad": 1, "precio_unitario": Decimal("10.00")},
+            {"orden_id": 1, "producto_id": 7, "cantidad": 2, "precio_unitario": Decimal("10.00")},
+            {"orden_id": 2, "producto_id": 7, "cantidad": 1, "precio_unitario": Decimal("10.00")},
+        ])
+
+        assert find_duplicates(session, DetalleOrden)["duplicate_rows"] == 0
+        result = find_duplicates(session, DetalleOrden, ["orden_id", "producto_id"], sample_size=5)
+        assert result["duplicate_rows"] == 1
+        assert result["sample"] == [(1, 7, 2)]
+
+
+def test_scan_referential_integrity_counts_and_samples_orphans(tmp_path):
+    with make_session() as session:
+        session.execute(insert(Usuario), [{"nombre": "Ana", "apellido": "Paz", "dni": "1", "email": "a@x.com", "contrasena": "x"}])
+        session.execute(insert(Orden), [
+            {"usuario_id": usuario_id, "total": Decimal("5.00"), "estado": "Pendiente", "fecha_orden": None}
+            for usuario_id in (1, 7, 8, 9)
+        ])
+
+        result = scan_referential_integrity(session, sample_size=2)
+        assert result["ordenes.usuario_id -> usuarios"]["orphans"] == 3
+        assert len(result["ordenes.usuario_id -> usuarios"]["sample"]) == 2
+        assert result["carrito.usuario_id -> usuarios"] == {"orphans": 0, "sample": []}
+
+        path = tmp_path / "huerfanos.csv"
+        assert export_orphans(session, path, chunk_size=2) == 3
+        assert path.read_text().splitlines()[1] == "ordenes.usuario_id -> usuarios,2,7"
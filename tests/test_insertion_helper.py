@@ -0,0 +1,148 @@
+import csv
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from database import insertion_helper
+from database.column_spec import convert_block
+from database.fk_validation import ForeignKeyValidator
+from database.insertion_helper import (
+    CategoriaLoader, DetalleOrdenLoader, DireccionEnvioLoader, OrdenLoader, ProductoLoader, UsuarioLoader
+)
+from database.rejects import RejectWriter
+from database.models import Base, Categoria, DetalleOrden, Orden, Producto, Usuario
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_load_streams_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"],
+              [[f"Categoria {i}", f"Descripcion {i}"] for i in range(5)])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        loader = CategoriaLoader(session)
+        assert [len(batch) for batch in loader.iter_batches(2)] == [2, 2, 1]
+
+        assert loader.load(batch_size=2, commit_every=1) == 5
+        assert session.execute(select(func.count()).select_from(Categoria)).scalar_one() == 5
+        assert loader.rows_per_second > 0
+
+
+def test_copy_method_falls_back_to_insert_on_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Hogar", ""], ["Libros", "Usados"]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert CategoriaLoader(session).load(method="copy") == 2
+        assert session.execute(select(Categoria.descripcion).order_by(Categoria.nombre)).scalars().all() == ["", "Usados"]
+
+
+def test_column_specs_keep_decimals_exact_and_apply_defaults(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"],
+              [["1", "0.10", "", "2024-01-01"], ["2", "1234567.8", "Enviado", ""], ["3", "2.675", "", ""]])
+
+    batch, = OrdenLoader(None).iter_batches()
+    assert batch == [
+        {"usuario_id": 1, "total": Decimal("0.10"), "estado": "Pendiente", "fecha_orden": datetime(2024, 1, 1)},
+        {"usuario_id": 2, "total": Decimal("1234567.80"), "estado": "Enviado", "fecha_orden": None},
+        # más decimales que la escala: se redondea mitad hacia arriba, sin pasar por float (round(2.675, 2) da 2.67)
+        {"usuario_id": 3, "total": Decimal("2.68"), "estado": "Pendiente", "fecha_orden": None},
+    ]
+    assert str(batch[2]["total"]) == "2.68"
+
+
+def test_empty_text_stays_empty_and_missing_columns_are_null():
+    specs = DireccionEnvioLoader.columns
+    header = [spec.header for spec in specs if spec.header != "Provincia"]
+    row = ["1", "Av. 1", "Lima", "", "", "", "", "Perú"]
+    block = convert_block(specs, header, [row])
+    # un texto vacío se carga como "", como lo hacían los loaders fila a fila; una columna ausente es NULL
+    assert block["departamento"].tolist() == [""] and block["codigo_postal"].tolist() == [""]
+    assert block["provincia"].tolist() == [None]
+
+
+def test_validator_rejects_orphan_rows_before_insert(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"],
+              [["1", "10.00", "Enviado", ""], ["42", "20.00", "Enviado", ""], ["2", "30.00", "", ""]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(Usuario), [
+            {"nombre": n, "apellido": "X", "dni": n, "email": f"{n}@x.com", "contrasena": "x"} for n in ("a", "b")
+        ])
+        validator = ForeignKeyValidator(RejectWriter(str(tmp_path / "rejects")))
+        loader = OrdenLoader(session)
+
+        assert loader.load(validator=validator) == 2
+        assert loader.rows_rejected == 1
+        assert session.execute(select(Orden.total).order_by(Orden.orden_id)).scalars().all() == [Decimal("10.00"), Decimal("30.00")]
+        rejects = (tmp_path / "rejects" / "5.Ordenes.rejects.csv").read_text().splitlines()
+        # el id del rechazo es su número de fila en el CSV
+        assert rejects[0].startswith("usuario_id,total,estado,fecha_orden,orden_id,")
+        assert rejects[1] == "42,20.00,Enviado,,2,usuario_id not found in usuarios"
+
+
+def test_rejected_parent_keeps_the_ids_of_the_rows_after_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"],
+              [["1", "10.00", "", ""], ["42", "20.00", "", ""], ["1", "30.00", "", ""]])
+    write_csv(tmp_path / "6.detalle_ordenes.csv", ["OrdenID", "ProductoID", "Cantidad", "PrecioUnitario"],
+              [["3", "1", "1", "30.00"], ["2", "1", "1", "20.00"]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(Usuario), [{"nombre": "a", "apellido": "X", "dni": "a", "email": "a@x.com", "contrasena": "x"}])
+        session.execute(insert(Categoria), [{"nombre": "Hogar", "descripcion": None}])
+        session.execute(insert(Producto), [{"nombre": "Silla", "descripcion": None, "precio": Decimal("1.00"),
+                                            "stock": 1, "categoria_id": 1}])
+        validator = ForeignKeyValidator(RejectWriter(str(tmp_path / "rejects")))
+
+        assert OrdenLoader(session).load(batch_size=2, validator=validator) == 2
+        assert session.execute(select(Orden.orden_id, Orden.total).order_by(Orden.orden_id)).all() == [
+            (1, Decimal("10.00")), (3, Decimal("30.00"))]
+        # la línea de la orden 3 sigue apuntando a ella, la de la orden rechazada se rechaza también
+        assert DetalleOrdenLoader(session).load(validator=validator) == 1
+        assert session.execute(select(Orden.total).join(DetalleOrden.orden)).scalars().all() == [Decimal("30.00")]
+
+
+def test_tolerant_load_isolates_failing_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    users = [[f"N{i}", "A", f"dni{i}", f"u{i}@x.com", "x"] for i in range(10)]
+    users[7][2] = "dni2"  # DNI repetido
+    write_csv(tmp_path / "2.Usuarios.csv", ["Nombre", "Apellido", "DNI", "Email", "Contraseña"], users)
+    write_csv(tmp_path / "4.Productos.csv", ["Nombre", "Descripcion", "Precio", "Stock", "CategoriaID"],
+              [["P1", "", "1.50", "3", "1"], ["P2", "", "abc", "3", "1"], ["P3", "", "2.00", "1", "1"]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        rejects = RejectWriter(str(tmp_path / "rejects"))
+        loader = UsuarioLoader(session)
+        assert loader.load(batch_size=4, tolerant=True, rejects=rejects) == 9
+        assert loader.rows_rejected == 1
+        assert session.execute(select(func.count()).select_from(Usuario)).scalar_one() == 9
+        failed = (tmp_path / "rejects" / "2.Usuarios.rejects.csv").read_text().splitlines()
+        assert failed[1].startswith("N7,A,dni2,u7@x.com,x,") and "UNIQUE" in failed[1]
+
+        loader = ProductoLoader(session)
+        assert loader.load(tolerant=True, rejects=rejects) == 2
+        assert session.execute(select(Producto.nombre)).scalars().all() == ["P1", "P3"]
+        unparsed = (tmp_path / "rejects" / "4.Productos.parse_errors.csv").read_text().splitlines()
+        assert unparsed[1].startswith("P2,,abc,3,1,")
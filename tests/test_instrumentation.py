@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database import insertion_helper
+from database.insertion_helper import CategoriaLoader
+from database.instrumentation import OUTSIDE_LOADS, Instrumentation, instrumentation
+from database.models import Base
+from tests.test_insertion_helper import write_csv
+
+
+def test_load_records_phases_statements_and_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"],
+              [[f"Categoria {i}", f"Descripcion {i}"] for i in range(5)])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    instrumentation.reset()
+    instrumentation.attach(engine)
+    with Session(engine) as session:
+        CategoriaLoader(session).load(batch_size=2, commit_every=None)
+
+    metrics = instrumentation.table("categorias")
+    assert metrics.rows == 5
+    assert metrics.bytes_read == os.path.getsize(tmp_path / "3.Categorias.csv")
+    assert metrics.statements == 3  # un insert por bloque
+    assert all(metrics.phases[phase] > 0 for phase in ("read", "convert", "execute", "commit"))
+    assert instrumentation.slowest_statements()[0]["statement"].startswith("INSERT INTO categorias")
+
+
+def test_failed_statements_are_timed_and_leave_nothing_on_the_connection():
+    engine = create_engine("sqlite://")
+    metrics = Instrumentation()
+    metrics.attach(engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_existe"))
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+
+    assert metrics.table(OUTSIDE_LOADS).statements == 2
+    assert sorted(entry["statement"] for entry in metrics.slowest_statements()) == ["SELECT * FROM no_existe", "SELECT 1"]
+
+
+def test_export_writes_json_lines_and_prometheus(tmp_path):
+    metrics = Instrumentation(slow_statements=2)
+    metrics.add_time("ordenes", "execute", 1.5)
+    metrics.count("ordenes", rows=300)
+    for seconds in (0.1, 0.3, 0.2):
+        metrics.record_statement(f"SELECT {seconds}", seconds, table="ordenes")
+
+    jsonl_path, prom_path = metrics.export(str(tmp_path))
+    with open(jsonl_path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert records[0]["bottleneck"] == "execute" and records[0]["rows_per_second"] == 200
+    assert [record["seconds"] for record in records[1:]] == [0.3, 0.2]
+
+    with open(prom_path, encoding="utf-8") as file:
+        prom = file.read()
+    assert 'ecommerce_load_phase_seconds_total{table="ordenes",phase="execute"} 1.5' in prom
+    assert 'ecommerce_sql_statements_total{table="ordenes"} 3' in prom
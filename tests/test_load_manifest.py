@@ -0,0 +1,66 @@
+import pytest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from database import insertion_helper
+from database.database_insertion import load_table
+from database.insertion_helper import CategoriaLoader, ProductoLoader
+from database.load_manifest import COMPLETED, FAILED, plan_reload
+from database.load_scheduler import table_dependencies
+from database.models import Base, Categoria, LoadManifest
+from tests.test_insertion_helper import write_csv
+
+
+def test_plan_reload_skips_unchanged_and_reloads_children(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Hogar", "Casa"]])
+    write_csv(tmp_path / "4.Productos.csv", ["Nombre", "Descripcion", "Precio", "Stock", "CategoriaID"],
+              [["Silla", "", "10.50", "3", "1"]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    loaders = {"categorias": CategoriaLoader, "productos": ProductoLoader}
+    for loader_class in loaders.values():
+        load_table(loader_class, engine)
+
+    with Session(engine) as session:
+        assert plan_reload(session, loaders, table_dependencies()) == {}
+
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [["Hogar", "Casa"], ["Libros", ""]])
+    with Session(engine) as session:
+        assert plan_reload(session, loaders, table_dependencies()) == {"categorias": 0, "productos": 0}
+
+
+def test_failed_load_resumes_after_its_last_commit(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    names = [f"Categoria {i}" for i in range(1, 6)]
+    write_csv(tmp_path / "3.Categorias.csv", ["Nombre", "Descripcion"], [[name, ""] for name in names])
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    # el tercer bloque falla: los dos primeros ya se confirmaron (commit_every=1)
+    write_block = CategoriaLoader.write_block
+
+    def failing_write_block(loader, block, use_copy=False):
+        if loader.rows_loaded == 4:
+            raise RuntimeError("conexión perdida")
+        write_block(loader, block, use_copy)
+    monkeypatch.setattr(CategoriaLoader, "write_block", failing_write_block)
+    with pytest.raises(RuntimeError):
+        load_table(CategoriaLoader, engine, batch_size=2, commit_every=1)
+
+    loaders = {"categorias": CategoriaLoader}
+    with Session(engine) as session:
+        entry = session.get(LoadManifest, "CategoriaLoader")
+        assert (entry.status, entry.rows_loaded) == (FAILED, 4)
+        assert plan_reload(session, loaders, table_dependencies()) == {"categorias": 4}
+
+    monkeypatch.setattr(CategoriaLoader, "write_block", write_block)
+    assert load_table(CategoriaLoader, engine, start_row=4, batch_size=2, commit_every=1).rows_loaded == 1
+    with Session(engine) as session:
+        assert session.execute(select(Categoria.categoria_id, Categoria.nombre).order_by(Categoria.categoria_id)).all() == list(
+            enumerate(names, start=1))
+        entry = session.get(LoadManifest, "CategoriaLoader")
+        assert (entry.status, entry.rows_loaded) == (COMPLETED, 5)
+        assert plan_reload(session, loaders, table_dependencies()) == {}
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import pytest
+
+from database.load_scheduler import run_async_in_dependency_order, run_in_dependency_order, table_dependencies
+
+
+def test_dependencies_come_from_foreign_keys():
+    dependencies = table_dependencies()
+    assert dependencies["usuarios"] == set()
+    assert dependencies["detalle_ordenes"] == {"ordenes", "productos"}
+    assert dependencies["historial_pagos"] == {"ordenes", "metodos_pago"}
+
+
+def test_tables_start_after_their_parents():
+    finished = []
+    lock = threading.Lock()
+
+    def task(name):
+        def run():
+            with lock:
+                finished.append(name)
+            return name
+        return run
+
+    dependencies = table_dependencies()
+    tasks = {name: task(name) for name in dependencies}
+    results = run_in_dependency_order(tasks, dependencies, workers=4)
+
+    assert set(results) == set(dependencies)
+    for name, parents in dependencies.items():
+        assert all(finished.index(parent) < finished.index(name) for parent in parents)
+
+
+def test_failed_table_stops_its_children():
+    started = []
+
+    def fail():
+        raise RuntimeError("bad csv")
+
+    tasks = {"usuarios": fail, "ordenes": lambda: started.append("ordenes")}
+    with pytest.raises(RuntimeError):
+        run_in_dependency_order(tasks, {"ordenes": {"usuarios"}}, workers=2)
+    assert started == []
+
+
+def test_async_tables_start_after_their_parents_with_bounded_concurrency():
+    finished = []
+    running = set()
+    peak = []
+
+    def task(name):
+        async def run():
+            running.add(name)
+            peak.append(len(running))
+            await asyncio.sleep(0.001)
+            running.discard(name)
+            finished.append(name)
+            return name
+        return run
+
+    dependencies = table_dependencies()
+    results = asyncio.run(run_async_in_dependency_order({name: task(name) for name in dependencies},
+                                                        dependencies, workers=2))
+    assert set(results) == set(dependencies)
+    assert max(peak) <= 2
+    for name, parents in dependencies.items():
+        assert all(finished.index(parent) < finished.index(name) for parent in parents)
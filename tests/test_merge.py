@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+import pytest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from database import insertion_helper
+from database.database_insertion import load_table
+from database.insertion_helper import OrdenLoader, OrdenMetodoPagoLoader, ProductoLoader, UsuarioLoader
+from database.load_manifest import data_versions
+from database.models import Base, Orden, OrdenMetodoPago, Producto, Usuario
+from database.rejects import RejectWriter
+from tests.test_insertion_helper import write_csv
+
+USER_HEADER = ["Nombre", "Apellido", "DNI", "Email", "Contraseña"]
+PRODUCT_HEADER = ["Nombre", "Descripcion", "Precio", "Stock", "CategoriaID"]
+ORDER_HEADER = ["UsuarioID", "Total", "Estado", "FechaOrden"]
+PAYMENT_HEADER = ["OrdenID", "MetodoPagoID", "MontoPagado"]
+
+
+def counts(loader):
+    return loader.rows_inserted, loader.rows_updated, loader.rows_unchanged
+
+
+def test_merge_applies_only_the_delta(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    users = [["Ana", "Díaz", "1", "ana@mail.com", "x"], ["Luis", "Paz", "2", "luis@mail.com", "y"]]
+    write_csv(tmp_path / "2.Usuarios.csv", USER_HEADER, users)
+    write_csv(tmp_path / "4.Productos.csv", PRODUCT_HEADER, [["Silla", "", "10.50", "3", "1"], ["Mesa", "", "99.00", "1", "1"]])
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    load_table(UsuarioLoader, engine)
+    load_table(ProductoLoader, engine)
+    with Session(engine) as session:
+        versions = data_versions(session, ["usuarios", "productos"])
+
+    # el delta: Luis cambia de email, llega un usuario nuevo (también repetido en el mismo archivo)
+    write_csv(tmp_path / "2.Usuarios.csv", USER_HEADER,
+              [users[0], ["Luis", "Paz", "2", "luis@nuevo.com", "y"],
+               ["Eva", "Sol", "3", "eva@mail.com", "z"], ["Eva", "Sol", "3", "eva@mail.com", "w"]])
+    write_csv(tmp_path / "4.Productos.csv", PRODUCT_HEADER, [["Silla", "", "12.00", "3", "1"], ["Mesa", "", "99.00", "1", "1"]])
+    usuarios = load_table(UsuarioLoader, engine, merge=True, batch_size=10)
+    assert counts(usuarios) == (1, 1, 1) and usuarios.rows_duplicated == 1
+    assert counts(load_table(ProductoLoader, engine, merge=True)) == (0, 1, 1)
+
+    with Session(engine) as session:
+        assert session.execute(select(Usuario.usuario_id, Usuario.email, Usuario.contrasena).order_by(Usuario.usuario_id)).all() == [
+            (1, "ana@mail.com", "x"), (2, "luis@nuevo.com", "y"), (3, "eva@mail.com", "w")]
+        assert session.execute(select(Producto.precio).order_by(Producto.producto_id)).scalars().all() == [
+            Decimal("12.00"), Decimal("99.00")]
+        changed = data_versions(session, ["usuarios", "productos"])
+        assert all(changed[table] > versions[table] for table in changed)
+
+    # sin cambios no se escribe nada y la versión de los datos no se mueve
+    assert counts(load_table(ProductoLoader, engine, merge=True)) == (0, 0, 2)
+    with Session(engine) as session:
+        assert data_versions(session, ["productos"]) == {"productos": changed["productos"]}
+
+
+def test_merge_rejects_an_email_taken_by_another_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    users = [["Ana", "Díaz", "1", "ana@mail.com", "x"], ["Luis", "Paz", "2", "luis@mail.com", "y"]]
+    write_csv(tmp_path / "2.Usuarios.csv", USER_HEADER, users)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    load_table(UsuarioLoader, engine)
+
+    # Eva llega con el email de Ana; Luis cambia el suyo y sí entra
+    write_csv(tmp_path / "2.Usuarios.csv", USER_HEADER,
+              [["Eva", "Sol", "3", "ana@mail.com", "z"], ["Luis", "Paz", "2", "luis@nuevo.com", "y"]])
+    rejects = RejectWriter(str(tmp_path / "rejects"))
+    loader = load_table(UsuarioLoader, engine, merge=True, rejects=rejects)
+    assert counts(loader) == (0, 1, 0)
+    assert loader.rows_rejected == 1
+
+    with Session(engine) as session:
+        assert session.execute(select(Usuario.dni, Usuario.email).order_by(Usuario.usuario_id)).all() == [
+            ("1", "ana@mail.com"), ("2", "luis@nuevo.com")]
+    lines = (tmp_path / "rejects" / "2.Usuarios.rejects.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[1] == "Eva,Sol,3,ana@mail.com,z,email already belongs to another row of usuarios"
+
+
+def test_merge_applies_a_delta_on_natural_keys(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "4.Productos.csv", PRODUCT_HEADER, [["Silla", "", "10.50", "3", "1"], ["Mesa", "", "99.00", "1", "1"]])
+    write_csv(tmp_path / "10.ordenes_metodospago.csv", PAYMENT_HEADER, [["1", "1", "5.00"], ["1", "2", "6.00"]])
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    load_table(ProductoLoader, engine)
+    load_table(OrdenMetodoPagoLoader, engine)
+
+    # el delta trae solo lo que cambió: la mesa baja de precio, llega una lámpara; la silla no se toca
+    write_csv(tmp_path / "4.Productos.csv", PRODUCT_HEADER, [["Mesa", "", "89.00", "1", "1"], ["Lámpara", "", "15.00", "2", "1"]])
+    write_csv(tmp_path / "10.ordenes_metodospago.csv", PAYMENT_HEADER, [["1", "2", "7.00"]])
+    assert counts(load_table(ProductoLoader, engine, merge=True)) == (1, 1, 0)
+    assert counts(load_table(OrdenMetodoPagoLoader, engine, merge=True)) == (0, 1, 0)
+
+    with Session(engine) as session:
+        assert session.execute(select(Producto.producto_id, Producto.nombre, Producto.precio).order_by(Producto.producto_id)).all() == [
+            (1, "Silla", Decimal("10.50")), (2, "Mesa", Decimal("89.00")), (3, "Lámpara", Decimal("15.00"))]
+        assert session.execute(select(OrdenMetodoPago.metodo_pago_id, OrdenMetodoPago.monto_pagado)
+                               .order_by(OrdenMetodoPago.metodo_pago_id)).all() == [(1, Decimal("5.00")), (2, Decimal("7.00"))]
+
+
+def test_merge_refuses_tables_without_natural_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "2.Usuarios.csv", USER_HEADER, [["Ana", "Díaz", "1", "ana@mail.com", "x"]])
+    write_csv(tmp_path / "5.Ordenes.csv", ORDER_HEADER, [["1", "1.00", "", ""], ["1", "2.00", "", ""]])
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    load_table(UsuarioLoader, engine)
+    load_table(OrdenLoader, engine)
+
+    # una orden no tiene clave natural: el número de fila del delta no dice qué orden cambió
+    write_csv(tmp_path / "5.Ordenes.csv", ORDER_HEADER, [["1", "3.00", "", ""]])
+    with pytest.raises(ValueError, match="no natural_key"):
+        load_table(OrdenLoader, engine, merge=True)
+    with Session(engine) as session:
+        assert session.execute(select(Orden.total).order_by(Orden.orden_id)).scalars().all() == [Decimal("1.00"), Decimal("2.00")]
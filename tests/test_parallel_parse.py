@@ -0,0 +1,71 @@
+import csv
+
+from functools import reduce
+
+import numpy as np
+
+from database import insertion_helper
+from database.column_spec import concat_blocks
+from database.insertion_helper import ResenaProductoLoader
+from database.parallel_parse import iter_parallel_blocks, read_records, record_boundaries
+
+
+def write_reviews(path, n):
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["UsuarioID", "ProductoID", "Calificacion", "Comentario", "Fecha"])
+        for i in range(n):
+            # comentarios con saltos de línea y comillas dentro de campos entre comillas
+            comment = f'Línea 1\nLínea "{i}"\r\nfin' if i % 3 == 0 else f"Muy bueno {i}"
+            writer.writerow([i + 1, i % 7 + 1, i % 5 + 1, comment, "2024-01-01 10:00:00"])
+
+
+def test_boundaries_skip_quoted_newlines(tmp_path):
+    path = tmp_path / "11.resenas_productos.csv"
+    write_reviews(path, 100)
+
+    boundaries = record_boundaries(str(path), chunk_bytes=50)
+    assert len(boundaries) > 10
+    rows = []
+    for start, end in zip(boundaries, boundaries[1:] + [path.stat().st_size]):
+        chunk, _ = read_records(str(path), start, end)
+        rows += chunk
+    with open(path, newline="", encoding="utf-8") as csvfile:
+        assert rows == list(csv.reader(csvfile))[1:]
+
+
+def test_parallel_blocks_match_the_serial_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_reviews(tmp_path / "11.resenas_productos.csv", 1000)
+    loader = ResenaProductoLoader(None)
+
+    serial = reduce(concat_blocks, loader.iter_blocks(batch_size=64, skip_rows=10))
+    parallel = list(iter_parallel_blocks(loader.columns, loader.get_csv_path(), "resenas_productos",
+                                         batch_size=64, skip_rows=10, processes=2, chunk_bytes=4096))
+    assert max(len(block["comentario"]) for block in parallel) <= 64
+    parallel = reduce(concat_blocks, parallel)
+    assert list(parallel) == list(serial)
+    for column in serial:
+        assert np.array_equal(parallel[column], serial[column])
+
+
+def test_a_stray_quote_falls_back_to_a_serial_parse(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    path = tmp_path / "11.resenas_productos.csv"
+    write_reviews(path, 1000)
+    with open(path, "a", newline="", encoding="utf-8") as csvfile:
+        csvfile.write('1001,1,5,Muy "bueno,2024-01-01 10:00:00\r\n')  # comilla suelta en un campo sin comillas
+    write_reviews(tmp_path / "rest.csv", 1000)
+    with open(tmp_path / "rest.csv", newline="", encoding="utf-8") as rest, \
+            open(path, "a", newline="", encoding="utf-8") as csvfile:
+        csvfile.write(rest.read().split("\r\n", 1)[1])
+    loader = ResenaProductoLoader(None)
+
+    serial = reduce(concat_blocks, loader.iter_blocks(batch_size=64))
+    parallel = reduce(concat_blocks, iter_parallel_blocks(loader.columns, loader.get_csv_path(), "resenas_productos",
+                                                          batch_size=64, skip_rows=0, processes=2,
+                                                          chunk_bytes=4096))
+    assert "not aligned on records" in capsys.readouterr().out
+    assert len(serial["comentario"]) == 2001
+    for column in serial:
+        assert np.array_equal(parallel[column], serial[column])
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from config import DATABASE_URL
+from database import insertion_helper
+from database.insertion_helper import MetodoPagoLoader, OrdenLoader, OrdenMetodoPagoLoader, UsuarioLoader
+from database.models import Base, Orden, OrdenMetodoPago
+from database.partitioning import check_partitioned_references, route_block
+from database.table_creator import create_tables
+from tests.test_insertion_helper import write_csv
+
+SCHEMA = "test_partitioning"
+
+
+def test_route_block_groups_rows_by_month():
+    partitions = {"2024-01": "enero", "2024-02": "febrero", "default": "default"}
+    block = {
+        "orden_id": np.array([1, 2, 3, 4]),
+        "fecha_orden": np.array(["2024-01-31T23:59", "2024-02-01", "2023-12-01", "2024-01-01"], dtype="datetime64[us]"),
+    }
+    routed = {partition: rows["orden_id"].tolist() for partition, rows in route_block(block, "fecha_orden", partitions)}
+    assert routed == {"default": [3], "enero": [1, 4], "febrero": [2]}
+
+
+@pytest.fixture
+def scratch_engine():
+    """Engine on an empty schema of the configured PostgreSQL database."""
+    engine = create_engine(DATABASE_URL)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    except OperationalError:
+        pytest.skip("PostgreSQL is not available")
+    scratch = create_engine(DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    yield scratch
+    scratch.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+def test_partitions_follow_the_csv_dates_and_prune_queries(scratch_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "2.Usuarios.csv", ["Nombre", "Apellido", "DNI", "Email", "Contraseña"],
+              [["Ana", "Díaz", "1", "ana@mail.com", "x"]])
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"],
+              [["1", "2.00", "", "2024-03-01 08:00:00"], ["1", "1.00", "", "2024-01-15"],
+               ["1", "3.00", "", "2024-03-31"], ["1", "4.00", "", ""]])
+
+    create_tables(scratch_engine, partitioned=True)
+    with Session(scratch_engine) as session:
+        UsuarioLoader(session).load()
+        # el primer bloque va por COPY a cada partición, el segundo (sin fecha) por insert()
+        assert OrdenLoader(session).load(method="copy", batch_size=3) == 4
+        # los ids siguen el orden del CSV aunque las filas se repartan por mes
+        assert session.execute(select(Orden.orden_id, Orden.total).order_by(Orden.orden_id)).all() == [
+            (1, 2), (2, 1), (3, 3), (4, 4)]
+
+        counts = dict(session.execute(text(
+            "SELECT tableoid::regclass::text, count(*) FROM ordenes GROUP BY 1")).all())
+        # la orden sin fecha toma CURRENT_TIMESTAMP y cae en la partición por defecto
+        assert counts == {"ordenes_2024_01": 1, "ordenes_2024_03": 2, "ordenes_default": 1}
+
+        march = select(func.sum(Orden.total)).where(Orden.fecha_orden >= "2024-03-01", Orden.fecha_orden < "2024-04-01")
+        assert session.execute(march).scalar_one() == 5
+        plan = "\n".join(session.execute(text("EXPLAIN " + str(march.compile(
+            scratch_engine, compile_kwargs={"literal_binds": True})))).scalars())
+        assert "ordenes_2024_03" in plan and "ordenes_2024_01" not in plan and "ordenes_default" not in plan
+
+
+def test_orphans_of_fks_to_partitioned_tables_fail_the_check(scratch_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    write_csv(tmp_path / "2.Usuarios.csv", ["Nombre", "Apellido", "DNI", "Email", "Contraseña"],
+              [["Ana", "Díaz", "1", "ana@mail.com", "x"]])
+    write_csv(tmp_path / "5.Ordenes.csv", ["UsuarioID", "Total", "Estado", "FechaOrden"], [["1", "2.00", "", "2024-03-01"]])
+    write_csv(tmp_path / "10.ordenes_metodospago.csv", ["OrdenID", "MetodoPagoID", "MontoPagado"], [["1", "1", "2.00"]])
+    write_csv(tmp_path / "9.metodos_pago.csv", ["Nombre", "Descripcion"], [["Tarjeta", ""]])
+
+    create_tables(scratch_engine, partitioned=True)
+    with Session(scratch_engine) as session:
+        for loader_class in (UsuarioLoader, OrdenLoader, MetodoPagoLoader, OrdenMetodoPagoLoader):
+            loader_class(session).load()
+        session.commit()
+        checked = check_partitioned_references(session)
+        assert checked["ordenes_metodos_pago.orden_id -> ordenes"] == 0
+        assert set(checked) == {"detalle_ordenes.orden_id -> ordenes", "ordenes_metodos_pago.orden_id -> ordenes",
+                                "historial_pagos.orden_id -> ordenes"}
+
+        # sin la FK la base acepta un pago de una orden que no existe, el chequeo no
+        session.execute(insert(OrdenMetodoPago), [{"orden_id": 99, "metodo_pago_id": 1, "monto_pagado": 1}])
+        with pytest.raises(ValueError, match=r"'ordenes_metodos_pago.orden_id -> ordenes': 1"):
+            check_partitioned_references(session)
+
+
+def test_nothing_to_check_without_partitioned_tables():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert check_partitioned_references(session) == {}
@@ -0,0 +1,57 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import create_engine, insert, text
+
+from benchmarks.query_plans import capture, compare, registry, sqlite_nodes
+from database.models import Base, Orden, Usuario
+
+
+def node(name, relation=None, estimated=None, actual=None):
+    return {"depth": 0, "node": name, "relation": relation, "index": None,
+            "estimated_rows": estimated, "actual_rows": actual, "loops": 1}
+
+
+def entry(plan, ms, estimated=None, actual=None):
+    return {"source": "notebook", "plan": plan, "execution_ms": ms, "estimated_rows": estimated, "actual_rows": actual}
+
+
+def test_sqlite_plan_rows_become_nodes():
+    nodes = sqlite_nodes([(2, 0, 0, "SCAN usuarios"), (4, 0, 0, "SEARCH ordenes USING INDEX ix_ordenes_usuario_id (usuario_id=?)"),
+                          (6, 4, 0, "USE TEMP B-TREE FOR ORDER BY")])
+    assert [(n["depth"], n["node"], n["relation"], n["index"]) for n in nodes] == [
+        (0, "SCAN", "usuarios", None), (0, "SEARCH", "ordenes", "ix_ordenes_usuario_id"),
+        (1, "USE TEMP B-TREE FOR ORDER BY", None, None)]
+
+
+def test_compare_flags_slower_and_misestimated_queries():
+    baseline = {"q": entry([node("Seq Scan", "ordenes", 100, 90)], 20.0, 100, 90),
+                "fast": entry([node("Seq Scan", "productos")], 1.0), "gone": entry([], 1.0)}
+    current = {"q": entry([node("Seq Scan", "ordenes", 10, 5000)], 45.0, 10, 5000),
+               "fast": entry([node("Seq Scan", "productos")], 8.0), "extra": entry([], 1.0)}
+    flags = {(flag.query, flag.kind): flag.regression for flag in compare(baseline, current, tolerance=1.0, floor_ms=10.0)}
+    assert flags == {("q", "slower"): True, ("q", "misestimate"): True, ("extra", "new"): False, ("gone", "missing"): False}
+
+
+def test_dropped_index_is_flagged_on_sqlite(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Usuario), [{"nombre": "Ana", "apellido": "Paz", "dni": str(i), "email": f"{i}@x.com",
+                                        "contrasena": "x"} for i in range(20)])
+        conn.execute(insert(Orden), [{"usuario_id": i % 20 + 1, "total": Decimal("5.00"), "estado": "Pendiente",
+                                      "fecha_orden": datetime(2024, 1, 1)} for i in range(200)])
+    with engine.connect() as conn:
+        queries = registry(conn)
+        assert "EDA_helper:referential_integrity" in queries and not any(name.startswith("dbt:") for name in queries)
+        baseline = capture(conn, queries, repeat=1)
+        assert baseline["notebook:top_usuarios_por_gasto"]["actual_rows"] == 10
+        assert not any(flag.regression for flag in compare(baseline, capture(conn, queries, repeat=1), tolerance=100, floor_ms=1000))
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_ordenes_usuario_id"))
+    # conexión nueva: sqlite3 reutiliza el resultado de un EXPLAIN ya preparado aunque cambie el esquema
+    engine.dispose()
+    with engine.connect() as conn:
+        flags = compare(baseline, capture(conn, queries, repeat=1), tolerance=100, floor_ms=1000)
+    assert ("notebook:top_usuarios_por_gasto", "seq_scan") in {(flag.query, flag.kind) for flag in flags if flag.regression}
@@ -0,0 +1,55 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+
+from sqlalchemy import insert, select
+
+from database.models import Orden
+from database.query_stream import downsample, histogram, iter_frames, query_frame, summarize
+from tests.test_eda_helper import make_session
+
+
+def add_orders(session):
+    session.execute(insert(Orden), [
+        {"usuario_id": i % 3 + 1, "total": Decimal(f"{i}.50"), "estado": "Pendiente" if i % 2 else "Enviado",
+         "fecha_orden": datetime(2024, 1, i + 1, 10)}
+        for i in range(10)
+    ])
+
+
+def test_query_frame_streams_typed_chunks():
+    with make_session() as session:
+        add_orders(session)
+        stmt = select(Orden.orden_id, Orden.total, Orden.fecha_orden, Orden.estado).order_by(Orden.orden_id)
+
+        chunks = list(iter_frames(session, stmt, chunk_size=4))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        # el streaming no queda puesto en la conexión de la sesión
+        assert "stream_results" not in session.connection().get_execution_options()
+        frame = query_frame(session, stmt, chunk_size=4)
+        assert frame.dtypes.astype(str).tolist()[:3] == ["int64", "float64", "datetime64[us]"]
+        assert frame["orden_id"].tolist() == list(range(1, 11))
+        assert frame["total"].sum() == 50.0
+        expected = pd.DataFrame(session.execute(stmt).all(), columns=["orden_id", "total", "fecha_orden", "estado"])
+        assert frame["estado"].tolist() == expected["estado"].tolist()
+
+        empty = query_frame(session, stmt.where(Orden.total < 0))
+        assert len(empty) == 0 and empty.dtypes["fecha_orden"] == "datetime64[us]"
+
+
+def test_server_side_sample_and_aggregates():
+    with make_session() as session:
+        add_orders(session)
+        stmt = select(Orden.usuario_id, Orden.total)
+
+        sample = query_frame(session, downsample(stmt, 4))
+        assert len(sample) == 4 and set(sample["total"]) <= {i + 0.5 for i in range(10)}
+
+        stats = query_frame(session, summarize(stmt, "total", ["usuario_id"]))
+        assert stats["count"].tolist() == [4, 3, 3]
+        assert stats[["min", "max"]].values.tolist() == [[0.5, 9.5], [1.5, 7.5], [2.5, 8.5]]
+
+        bins = query_frame(session, histogram(stmt, "total", bins=3))
+        assert bins["count"].tolist() == [3, 3, 4]  # el máximo cuenta en el último bin
+        assert bins["bin_start"].iloc[0] == 0.5 and bins["bin_end"].iloc[-1] == 9.5
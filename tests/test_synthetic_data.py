@@ -0,0 +1,32 @@
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from EDA_helper import scan_referential_integrity
+from benchmarks.synthetic_data import generate
+from database import database_insertion, insertion_helper
+from database.database_insertion import load_all
+from database.models import Base, DetalleOrden, HistorialPago, Orden
+
+
+def test_generated_csvs_load_with_consistent_keys(tmp_path, monkeypatch):
+    rows = generate(str(tmp_path), orders=300, chunk_size=128)
+    assert rows["5.Ordenes.csv"] == 300 and rows["12.historial_pagos.csv"] == 300
+
+    monkeypatch.setattr(insertion_helper, "CSV_DIR", str(tmp_path))
+    monkeypatch.setattr(database_insertion, "METRICS_ENABLED", True)
+    monkeypatch.setattr(database_insertion, "METRICS_DIR", str(tmp_path / "metrics"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    Base.metadata.create_all(engine)
+    loaded = load_all(bind=engine, workers=1)
+    assert {loader.get_csv_name(): loader.rows_loaded for loader in loaded.values()} == rows
+    assert (tmp_path / "metrics" / "metrics.prom").exists()
+
+    with Session(engine) as session:
+        assert all(result["orphans"] == 0 for result in scan_referential_integrity(session).values())
+        # SQLite guarda NUMERIC como float, se compara con tolerancia
+        lines = (select(DetalleOrden.orden_id, func.sum(DetalleOrden.cantidad * DetalleOrden.precio_unitario).label("total"))
+                 .group_by(DetalleOrden.orden_id).subquery())
+        mismatches = select(func.count()).select_from(Orden).join(lines, lines.c.orden_id == Orden.orden_id).where(func.abs(lines.c.total - Orden.total) > 0.001)
+        assert session.execute(mismatches).scalar_one() == 0
+        assert session.execute(select(func.count()).select_from(HistorialPago).join(Orden, Orden.orden_id == HistorialPago.orden_id)
+                               .where(HistorialPago.fecha_pago < Orden.fecha_orden)).scalar_one() == 0